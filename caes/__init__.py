@@ -1,22 +1,61 @@
 import os
+import importlib
+from .version import __version__
+
+# functions and classes, imported from their module when first used (PEP 562) so that importing caes only loads the
+# dependencies of what is used, e.g. simulations do not load the plotting or sizing libraries
+_attributes = {
+    'remove_ext': 'help_functions',
+    'create_dir': 'help_functions',
+    'CAES': 'caes',
+    'ICAES': 'icaes',
+    'ICAES2': 'icaes2',
+    'ICAES2Batch': 'batch',
+    'size_system': 'sizing',
+    'size_sites': 'sizing',
+    'locality_order': 'sizing',
+    'PolynomialSurrogate': 'surrogate',
+    'train_surrogate': 'surrogate',
+    'ResultCache': 'result_cache',
+    'cached_performance': 'result_cache',
+    'size_caes_cmp': 'compressor_sizing',
+    'size_caes_trb': 'turbine_sizing',
+    'plot_series': 'plot_functions',
+    'aquifer_dp': 'pressure_drop',
+    'pipe_fric_dp': 'pressure_drop',
+    'pipe_grav_dp': 'pressure_drop',
+    'pipe_fric_dp_scalar': 'pressure_drop',
+    'pipe_grav_dp_scalar': 'pressure_drop',
+    'friction_coeff': 'pressure_drop',
+    'friction_coeff_array': 'pressure_drop',
+    'monteCarloInputs': 'monte_carlo_inputs',
+    'monteCarloSamples': 'monte_carlo_inputs',
+    'baselineInputs': 'monte_carlo_inputs',
+    'pipe_heat_transfer_subsurface': 'heat_transfer',
+    'pipe_heat_transfer_ocean': 'heat_transfer',
+    'WellboreThermalModel': 'heat_transfer',
+}
+
+# modules
+_modules = ['sweep', 'sensitivity']
+
+__all__ = list(_attributes) + _modules
+
+
+def __getattr__(name):
+    if name in _attributes:
+        value = getattr(importlib.import_module('.' + _attributes[name], __name__), name)
+    elif name in _modules:
+        value = importlib.import_module('.' + name, __name__)
+    else:
+        raise AttributeError('module ' + repr(__name__) + ' has no attribute ' + repr(name))
+    globals()[name] = value  # later uses do not call __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
 
-# functions
-from .help_functions import remove_ext
-from .help_functions import create_dir
-from .caes import CAES
-from .icaes import ICAES
-from .icaes2 import ICAES2
-from .compressor_sizing import size_caes_cmp
-from .turbine_sizing import size_caes_trb
-from .plot_functions import plot_series
-from .pressure_drop import aquifer_dp
-from .pressure_drop import pipe_fric_dp
-from .pressure_drop import pipe_grav_dp
-from .pressure_drop import friction_coeff
-from .monte_carlo_inputs import monteCarloInputs
-from .monte_carlo_inputs import baselineInputs
-from .heat_transfer import pipe_heat_transfer_subsurface
-from .heat_transfer import pipe_heat_transfer_ocean
 
 # storing where resources folder is
-resource_path = os.path.join(os.path.split(__file__)[0], "resources")
\ No newline at end of file
+resource_path = os.path.join(os.path.split(__file__)[0], "resources")
@@ -0,0 +1,529 @@
+import numpy as np
+import pandas as pd
+from math import pi
+from .icaes2 import ICAES2
+from .fluid_properties import air_property_backend
+from .pressure_drop import aquifer_dp, pipe_fric_dp, pipe_grav_dp
+from .stages import free_pressure_ratios, polytropic_stages
+from .heat_transfer import WellboreThermalModel
+
+# inputs that select the model structure, these must be the same for every system in a batch
+UNIFORM_INPUTS = ['steps', 'PR_type',
+                  'include_air_leakage', 'include_aquifer_dp', 'include_thermal_gradient', 'include_pipe_dp_gravity',
+                  'include_pipe_dp_friction', 'include_pipe_heat_transfer', 'include_interstage_dp']
+
+
+class ICAES2Batch:
+    """
+    Simulates many ICAES2 systems at once
+
+    Each row of inputs is one system. All systems are advanced in lockstep through a single cycle, with every state
+    variable (pressures, temperatures, pressure drops, mass stored) held as a NumPy array over the systems. Follows
+    ICAES2.single_cycle and ICAES2.analyze_performance, keeping only the running sums that analyze_performance
+    requires (equivalent to record = 'summary').
+    """
+
+    def __init__(self, inputs, property_backend=None, property_table_tol=None):
+        """
+        :param inputs: DataFrame, one row per system. Columns use the names of ICAES2.get_default_inputs(), missing
+                       columns take the default value. UNIFORM_INPUTS, PR_cmp, PR_exp, the number of stages and the
+                       array inputs n_cmp, n_exp, delta_p_cmp and delta_p_exp must be the same for every system
+        :param property_backend: air property backend, see fluid_properties.air_property_backend. None - from inputs
+                                 (the same for every system), as in ICAES2. 'table' is evaluated for all systems with
+                                 NumPy
+        :param property_table_tol: allowable relative error of the property table [-], None - from inputs
+        """
+        self.inputs = inputs
+        self.n = len(inputs)
+        self.defaults = ICAES2.get_default_inputs()
+        if property_backend is None:
+            property_backend = self.uniform('property_backend')
+        if property_table_tol is None:
+            property_table_tol = self.uniform('property_table_tol')
+        self.air_props = air_property_backend(property_backend, tol=property_table_tol)
+
+        # model structure
+        self.steps = self.uniform('steps')
+        self.PR_type = self.uniform('PR_type')
+        if not (self.PR_type == 'fixed' or self.PR_type == 'free'):
+            self.PR_type = 'fixed'
+        self.include_air_leakage = self.uniform('include_air_leakage')
+        self.include_aquifer_dp = self.uniform('include_aquifer_dp')
+        self.include_thermal_gradient = self.uniform('include_thermal_gradient')
+        self.include_pipe_dp_gravity = self.uniform('include_pipe_dp_gravity')
+        self.include_pipe_dp_friction = self.uniform('include_pipe_dp_friction')
+        self.include_pipe_heat_transfer = self.uniform('include_pipe_heat_transfer')
+        self.include_interstage_dp = self.uniform('include_interstage_dp')
+
+        # constants
+        self.g = 9.81  # gravitational constant [m/s^2]
+        self.R = 8.314  # universal gas constant [kJ/kmol-K]
+        self.speed_of_sound = 343.0  # speed of sound in air [m/s]
+        self.M = 28.97  # molecular weight [kg/kmol]
+        self.buffer = 1e-6  # to prevent warnings when limits are exceeded due to numerical rounding
+
+        # atmosphere, fuel and efficiencies
+        self.T_atm = self.column('T_atm') + 273.15  # [K]
+        self.p_atm = self.column('p_atm')  # [MPa]
+        self.fuel_HHV = self.column('fuel_HHV')  # [kWh/kg]
+        self.fuel_CO2 = self.column('fuel_CO2')  # [kg CO2/kg fuel]
+        self.eta_mech = 1.0 - self.column('loss_mech')  # [fr]
+        self.eta_gen = 1.0 - self.column('loss_gen')  # [fr]
+
+        # wellbore
+        self.r_w = self.column('r_w')  # [m]
+        self.epsilon = self.column('epsilon')  # [m]
+        self.depth = self.column('depth')  # [m]
+
+        # aquifer operating pressure range [MPa]
+        self.p_store_min = self.column('p_hydro_grad') * self.depth * 1e-3
+        self.p_store_range = self.column('safety_factor') * (
+                self.column('p_frac_grad') - self.column('p_hydro_grad')) * self.depth * 1e-3
+        self.p_store_max = self.p_store_min + self.p_store_range
+
+        # aquifer thermal gradient
+        if self.include_thermal_gradient:
+            self.T_grad_m = self.column('T_grad_m')  # [deg C/m]
+            self.T_grad_b = self.column('T_grad_b')  # [deg C]
+        else:
+            self.T_grad_m = np.zeros(self.n)
+            self.T_grad_b = self.T_atm - 273.15
+        self.T_store_init = 273.15 + self.T_grad_m * self.depth + self.T_grad_b  # [K]
+
+        # storage geomechanical properties
+        self.r_f = np.maximum(self.column('r_f'), self.r_w)  # radius, at least r_w [m]
+        self.h = self.column('h')  # [m]
+        self.h_plume = np.minimum(self.r_f, self.h)  # [m]
+        self.phi = self.column('phi')  # [-]
+        self.Slr = self.column('Slr')  # [-]
+        self.k = self.column('k')  # [mD]
+
+        # heat transfer properties in wellbore
+        self.t_pipe = self.column('t_pipe')
+        self.t_cement = self.column('t_cement')
+        self.t_insul = self.column('t_insul')
+        self.r_rock = self.column('r_rock')
+        self.k_cement = self.column('k_cement')
+        self.k_pipe = self.column('k_pipe')
+        self.k_insul = self.column('k_insul')
+        self.k_rock = self.column('k_rock')
+        self.depth_ocean = self.column('depth_ocean')
+        self.h_ocean = self.column('h_ocean')
+        self.T_ocean = self.column('T_ocean')
+        T_pipe_sub = 273.15 + self.T_grad_m * self.depth / 2.0 + self.T_grad_b  # [K]
+        self.wellbore = WellboreThermalModel(r_pipe=self.r_w, t_pipe=self.t_pipe, t_cement=self.t_cement,
+                                             r_rock=self.r_rock, depth=self.depth, T_sub=T_pipe_sub,
+                                             depth_ocean=self.depth_ocean, t_insul=self.t_insul, T_ocean=self.T_ocean,
+                                             k_pipe=self.k_pipe, k_cement=self.k_cement, k_rock=self.k_rock,
+                                             k_insul=self.k_insul, h_ocean=self.h_ocean)
+
+        # aquifer mass losses
+        if self.include_air_leakage:
+            self.loss_m_air = self.column('loss_m_air')
+        else:
+            self.loss_m_air = np.zeros(self.n)
+
+        # operational
+        self.m_dot = self.column('m_dot')  # [kg/s]
+
+        # storage volume and mass
+        self.V_res = self.h_plume * pi * self.r_f ** 2  # [m^3]
+        self.V = self.V_res * self.phi * (1.0 - self.Slr)  # [m^3]
+        self.m_store_min = self.p_store_min * 1e3 * self.V * self.M / (self.R * self.T_store_init)  # [kg]
+        self.m_store_max = self.p_store_max * 1e3 * self.V * self.M / (self.R * self.T_store_init)  # [kg]
+
+        # storage - initialize state
+        self.time = np.zeros(self.n)  # [hr]
+        self.T_store = self.T_store_init.copy()  # [K]
+        self.p_store = self.p_store_min.copy()  # [MPa]
+        self.m_store = self.m_store_min.copy()  # [kg]
+
+        # pressure states [MPa]
+        self.p0 = self.p_atm.copy()
+        self.p1 = self.p_store.copy()
+        self.p2 = self.p_store.copy()
+        self.p3 = self.p_store.copy()
+
+        # temperature states [K]
+        self.T0 = self.T_atm.copy()
+        self.T1 = self.T_atm.copy()
+        self.T2 = self.T_store.copy()
+        self.T3 = self.T_store.copy()
+
+        # flow pressure drops and heat transfer
+        self.dp_pipe_f = np.zeros(self.n)
+        self.dp_pipe_g = np.zeros(self.n)
+        self.dT_pipe_ocean = np.zeros(self.n)
+        self.dT_pipe_sub = np.zeros(self.n)
+        self.dp_aquifer = np.zeros(self.n)
+
+        # initialize at design flow rate to calculate machine design outlet pressure
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.calc_pipe_dp(self.m_dot, 1.0)
+            self.calc_pipe_dT(self.m_dot, 1.0)
+            self.calc_aquifer_dp(self.m_dot, 1.0)
+        self.p_machine_design = self.p_store_max + self.dp_pipe_f + self.dp_pipe_g + self.dp_aquifer
+        self.p_well_design_min = self.p_store_min + self.dp_pipe_g
+
+        # check if flow rate exceeds Mach limit, error is carried by the first time step (as in CAES)
+        rho, = self.air_props.props_array(('D',), self.T0, self.p_well_design_min)
+        self.m_dot_max = rho * self.speed_of_sound * self.column('mach_limit') * pi * self.r_w ** 2.0
+        self.error = self.m_dot > self.m_dot_max
+
+        # machinery, stage constants as in ICAES2.stage_constants (systems x stages)
+        self.n_cmp, self.delta_p_cmp, self.PR_cmp = self.stages('cmp')
+        self.n_exp, self.delta_p_exp, self.PR_exp = self.stages('exp')
+        self.PR_cmp_cum = np.cumprod(self.PR_cmp, axis=-1)
+        self.PR_exp_cum = np.cumprod(self.PR_exp, axis=-1)
+        self.exponent_cmp = (self.n_cmp - 1.0) / self.n_cmp
+        self.exponent_exp = (self.n_exp - 1.0) / self.n_exp
+        self.work_factor_cmp = self.R / self.M / self.exponent_cmp  # [kJ/kg-K]
+        self.work_factor_exp = self.R / self.M / self.exponent_exp  # [kJ/kg-K]
+
+        # running sums for analyze_performance
+        self.n_rows = np.zeros(self.n, dtype=int)
+        self.energy_in = np.zeros(self.n)  # [kWh]
+        self.energy_out = np.zeros(self.n)  # [kWh]
+        self.m_water = np.zeros(self.n)  # [kg]
+        self.m_fuel = np.zeros(self.n)  # [kg]
+        self.n_charge = np.zeros(self.n)
+        self.n_discharge = np.zeros(self.n)
+        self.pwr_charge = np.zeros(self.n)  # [kW]
+        self.pwr_discharge = np.zeros(self.n)  # [kW]
+        self.T1_charge = np.zeros(self.n)  # [K]
+        self.T1_discharge = np.zeros(self.n)  # [K]
+        self.dp_well_flow = np.zeros(self.n)  # [MPa]
+        self.dp_pipe_f_flow = np.zeros(self.n)  # [MPa]
+
+    def column(self, key):
+        # per-system values of an input, as a float array
+        if key in self.inputs.columns:
+            return self.inputs[key].to_numpy(dtype=float)
+        else:
+            return np.full(self.n, float(self.defaults[key]))
+
+    def uniform(self, key):
+        # value of an input that must be shared by all systems
+        if key in self.inputs.columns:
+            values = self.inputs[key].tolist()
+            if any(value != values[0] for value in values):
+                raise ValueError('ICAES2Batch requires the same ' + key + ' for every system')
+            return values[0]
+        else:
+            return self.defaults[key]
+
+    def stages(self, machine):
+        """
+        polytropic index, interstage pressure drop and design pressure ratio of each stage, as in ICAES2.__init__
+        :param machine: 'cmp' or 'exp'
+        :return: NumPy arrays, systems x stages
+        """
+        # number of stages, from n_cmp/n_exp (any number of stages, same for every system) if not empty, otherwise stops
+        # at the first negative polytropic index
+        n_array = self.uniform('n_' + machine)
+        if np.size(n_array) > 0:
+            n_stages = [np.full(self.n, float(n)) for n in np.ravel(n_array)]
+        else:
+            n_values = [self.column('n_' + machine + str(i)) for i in range(1, 6)]
+            n_stages = []
+            for values in n_values:
+                if (values < 0.0).any():
+                    if not (values < 0.0).all():
+                        raise ValueError('ICAES2Batch requires the same number of stages for every system')
+                    break
+                n_stages.append(values)
+            if len(n_stages) == 0:
+                n_stages = [np.ones(self.n)]
+
+        # interstage pressure drop
+        delta_p_array = self.uniform('delta_p_' + machine)
+        delta_p = []
+        for i, key in enumerate(['12', '23', '34', '45'] + [''] * len(n_stages)):
+            if i == len(n_stages):
+                break
+            if not self.include_interstage_dp:
+                delta_p.append(np.zeros(self.n))
+            elif np.size(delta_p_array) > 0:
+                values = np.ravel(delta_p_array)
+                delta_p.append(np.full(self.n, max(float(values[i]), 0.0) if i < len(values) else 0.0))
+            elif key != '':
+                values = self.column('delta_p_' + machine + key)
+                delta_p.append(np.where(values > 0.0, values, 0.0))
+            else:
+                delta_p.append(np.zeros(self.n))
+
+        # equally divide pressure ratio for each stage, if pressure ratios are unspecified
+        PR = self.uniform('PR_' + machine)
+        if len(PR) == len(n_stages):
+            PR = [np.full(self.n, float(PR_stg)) for PR_stg in PR]
+        else:
+            PR_delta_p = np.prod(1.0 + np.array(delta_p), axis=0)
+            PR_equal = (self.p_machine_design / self.p_atm * PR_delta_p) ** (1. / len(n_stages))
+            PR = [PR_equal for n in n_stages]
+
+        return np.stack(n_stages, axis=-1), np.stack(delta_p, axis=-1), np.stack(PR, axis=-1)
+
+    def single_cycle(self):
+        """
+        runs a single cycle for every system, charging and discharging in the number of steps specified in self.steps
+        """
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            # calculate aquifer pressure loss based on m_dot
+            self.calc_aquifer_dp(self.m_dot, 1.0)
+
+            # update m_store_max_actual based on aquifer pressure losses
+            self.p_store_max_actual = self.p_store_max - self.dp_aquifer
+            self.m_store_max_actual = self.p_store_max_actual * 1e3 * self.V * self.M / (self.R * self.T_store_init)
+
+            # mass injection/release per timestep (mass leakage compensated for during injection)
+            m_air_in = (self.m_store_max_actual - self.m_store_min) / self.steps / (1 - self.loss_m_air)
+            m_air_out = (self.m_store_max_actual - self.m_store_min) / self.steps
+
+            # timestep duration [hr]
+            delta_t_in = m_air_in / (self.m_dot * 3600)
+            delta_t_out = m_air_out / (self.m_dot * 3600)
+
+            # save initial state
+            self.update(np.zeros(self.n), np.full(self.n, 1e-6), np.ones(self.n, dtype=bool))
+
+            # systems without flow, or where aquifer pressure losses are greater than well range, are not simulated
+            # further
+            active = (m_air_in > 0.0) & (self.m_dot > 0.0)
+            for i in range(int(self.steps)):
+                self.update(self.m_dot, delta_t_in, active)
+            for i in range(int(self.steps)):
+                self.update(-1.0 * self.m_dot, delta_t_out, active)
+
+    def update(self, m_dot, delta_t, active):
+        """
+        advances every active system by one time step, as in CAES.update
+        :param m_dot: mass flow rate, injection (+) or release (-) [kg/s], same sign for every system
+        :param delta_t: time step [hr]
+        :param active: systems to update
+        """
+        sign = np.sign(m_dot[0]) if self.n > 0 else 0.0
+        m_air = m_dot * 3600 * delta_t  # [kg]
+        self.time = np.where(active, self.time + delta_t, self.time)
+
+        # update flow pressure losses
+        self.calc_pipe_dp(m_dot, sign, active)
+        self.calc_pipe_dT(m_dot, sign, active)
+        self.calc_aquifer_dp(m_dot, sign, active)
+        dp_well = self.dp_aquifer
+
+        if sign > 0.0:  # charge
+            m_air_leakage = m_air * self.loss_m_air
+            p0 = self.p_atm
+            p1 = self.p_store + self.dp_aquifer + self.dp_pipe_f + self.dp_pipe_g
+            p2 = self.p_store + self.dp_aquifer
+            p3 = self.p_store
+            T0 = self.T_atm
+            T3 = self.T_store
+            work_per_kg, T1 = self.charge_perf(p0, p1, T0)
+            T2 = T1 - self.dT_pipe_ocean - self.dT_pipe_sub
+            total_work_per_kg = work_per_kg / self.eta_mech / self.eta_gen
+        elif sign < 0.0:  # discharge
+            m_air_leakage = np.zeros(self.n)
+            p3 = self.p_store
+            p2 = self.p_store - self.dp_aquifer
+            p1 = self.p_store - self.dp_aquifer - self.dp_pipe_f - self.dp_pipe_g
+            p0 = self.p_atm
+            T3 = self.T_store
+            T2 = self.T_store
+            T1 = self.T_store - self.dT_pipe_sub - self.dT_pipe_ocean
+            work_per_kg, T0 = self.discharge_perf(p0, p1, T1)
+            total_work_per_kg = work_per_kg * self.eta_mech * self.eta_gen
+        else:  # no flow
+            m_air_leakage = np.zeros(self.n)
+            p0 = self.p_atm
+            p1 = self.p_store + self.dp_pipe_g
+            p2 = self.p_store
+            p3 = self.p_store
+            T0 = self.T_atm
+            T1 = self.T_atm
+            T2 = self.T_store
+            T3 = self.T_store
+            total_work_per_kg = np.zeros(self.n)
+
+        # store pressure and temperature states
+        self.p0 = np.where(active, p0, self.p0)
+        self.p1 = np.where(active, p1, self.p1)
+        self.p2 = np.where(active, p2, self.p2)
+        self.p3 = np.where(active, p3, self.p3)
+        self.T0 = np.where(active, T0, self.T0)
+        self.T1 = np.where(active, T1, self.T1)
+        self.T2 = np.where(active, T2, self.T2)
+        self.T3 = np.where(active, T3, self.T3)
+
+        # power and energy (ICAES2 uses no water or fuel)
+        pwr = -1.0 * m_air * total_work_per_kg / (3600 * delta_t)
+        energy = -1.0 * m_air * total_work_per_kg / 3600  # [kWh]
+
+        # update storage pressure
+        m_store = self.m_store + m_air - m_air_leakage
+        p_store = m_store * self.R * self.T_store / (self.V * self.M) * 1e-3
+        self.m_store = np.where(active, m_store, self.m_store)
+        self.p_store = np.where(active, p_store, self.p_store)
+
+        # check pressures against limits
+        error = (p2 > self.p_store_max + self.buffer) | (p3 < self.p_store_min - self.buffer) | (
+                p3 > self.p_store_max + self.buffer)
+        self.error = self.error | (active & error)
+
+        # running sums
+        self.n_rows = self.n_rows + active
+        if sign > 0.0:
+            self.energy_in = self.energy_in + np.where(active, energy, 0.0)
+            self.n_charge = self.n_charge + active
+            self.pwr_charge = self.pwr_charge + np.where(active, pwr, 0.0)
+            self.T1_charge = self.T1_charge + np.where(active, T1, 0.0)
+        elif sign < 0.0:
+            self.energy_out = self.energy_out + np.where(active, energy, 0.0)
+            self.n_discharge = self.n_discharge + active
+            self.pwr_discharge = self.pwr_discharge + np.where(active, pwr, 0.0)
+            self.T1_discharge = self.T1_discharge + np.where(active, T1, 0.0)
+        if sign != 0.0:
+            self.dp_well_flow = self.dp_well_flow + np.where(active, dp_well, 0.0)
+            self.dp_pipe_f_flow = self.dp_pipe_f_flow + np.where(active, self.dp_pipe_f, 0.0)
+
+    def charge_perf(self, p0, p1, T0):
+        """
+        performance of the compressors, as in ICAES2.charge_perf
+        :return: work_per_kg [kJ/kg], T1 - outlet temperature [K]
+        """
+        # stage pressure ratios
+        if self.PR_type == 'fixed':
+            PRs = self.PR_cmp
+        else:  # 'free'
+            PRs = free_pressure_ratios(p0, p1, self.PR_cmp, self.PR_cmp_cum)
+
+        # performance of each stage (systems x stages)
+        p_in, T_in, p_out, T_out = polytropic_stages(p0, T0, PRs, self.delta_p_cmp, self.exponent_cmp)
+        work_per_kg = np.sum(self.work_factor_cmp * (T_in - T_out), axis=-1)  # [kJ/kg]
+
+        return work_per_kg, T_out[:, -1]
+
+    def discharge_perf(self, p0, p1, T1):
+        """
+        performance of the expanders, as in ICAES2.discharge_perf
+        :return: work_per_kg [kJ/kg], T0 - outlet temperature [K]
+        """
+        # stage pressure ratios
+        if self.PR_type == 'fixed':
+            PRs = self.PR_exp
+            p_in = p0 * self.PR_exp_cum[:, -1]  # back-calculate throttle pressure
+        else:  # 'free'
+            PRs = free_pressure_ratios(p1, p0, self.PR_exp, self.PR_exp_cum, expansion=True)
+            p_in = p1
+
+        # performance of each stage (systems x stages)
+        p_in, T_in, p_out, T_out = polytropic_stages(p_in, T1, PRs, self.delta_p_exp, self.exponent_exp,
+                                                     expansion=True)
+        work_per_kg = np.sum(self.work_factor_exp * (T_in - T_out), axis=-1)  # [kJ/kg]
+
+        return work_per_kg, T_out[:, -1]
+
+    def calc_aquifer_dp(self, m_dot, sign, active=None):
+        # aquifer pressure drop [MPa], as in CAES.calc_aquifer_dp, only for the active systems (others are 0.0)
+        self.dp_aquifer = np.zeros(self.n)
+        if self.include_aquifer_dp and sign != 0.0:
+            if active is None:
+                active = np.ones(self.n, dtype=bool)
+            if sign > 0.0:  # injection
+                T = self.T2[active]
+                p = self.p2[active]
+            else:  # withdrawl
+                T = self.T3[active]
+                p = self.p3[active]
+            rho, mu, Z = self.air_props.props_array(('D', 'V', 'Z'), T, p)
+            Q = m_dot[active] / rho  # radial flow rate [m3/s]
+            self.dp_aquifer[active] = np.abs(aquifer_dp(Q=Q, r_f=self.r_f[active], r_w=self.r_w[active],
+                                                        k=self.k[active], mu=mu * 1000, h=self.h_plume[active],
+                                                        p_f=p, T=T, Z=Z))
+
+    def calc_pipe_dp(self, m_dot, sign, active=None):
+        # pipe friction and gravitational pressure drop [MPa], as in CAES.calc_pipe_dp, only for the active systems
+        # (others are 0.0)
+        if active is None:
+            active = np.ones(self.n, dtype=bool)
+        self.dp_pipe_f = np.zeros(self.n)
+        self.dp_pipe_g = np.zeros(self.n)
+        if sign > 0.0:  # injection
+            T = self.T1[active]
+            p = self.p1[active]
+        else:  # withdrawl / no movement
+            T = self.T2[active]
+            p = self.p2[active]
+        rho, mu = self.air_props.props_array(('D', 'V'), T, p)
+
+        if self.include_pipe_dp_friction and sign != 0.0:
+            self.dp_pipe_f[active], f = pipe_fric_dp(epsilon=self.epsilon[active], d=2 * self.r_w[active],
+                                                     depth=self.depth[active], m_dot=m_dot[active], rho=rho, mu=mu)
+
+        if self.include_pipe_dp_gravity:
+            self.dp_pipe_g[active] = pipe_grav_dp(m_dot=m_dot[active], rho=rho, z=self.depth[active])
+
+    def calc_pipe_dT(self, m_dot, sign, active=None):
+        # air temperature change due to pipe heat transfer [K], as in CAES.calc_pipe_dT, only for the active systems
+        # (others are 0.0)
+        self.dT_pipe_ocean = np.zeros(self.n)
+        self.dT_pipe_sub = np.zeros(self.n)
+        if self.include_pipe_heat_transfer and sign != 0.0:
+            if active is None:
+                active = np.ones(self.n, dtype=bool)
+            if sign > 0.0:  # injection
+                T = self.T1[active]
+                p = self.p1[active]
+            else:  # withdrawl
+                T = self.T2[active]
+                p = self.p2[active]
+            rho, mu, Pr, k, cp = self.air_props.props_array(('D', 'V', 'PRANDTL', 'CONDUCTIVITY', 'CPMASS'), T, p)
+
+            self.dT_pipe_ocean[active], self.dT_pipe_sub[active] = self.wellbore.delta_T_array(
+                T, m_dot[active], k, rho, mu, Pr, cp, injection=sign > 0.0, systems=active)
+
+    def analyze_performance(self):
+        """
+        analyzes the performance of every system, as in CAES.analyze_performance
+        :return: DataFrame with the entries of CAES.analyze_performance, one row per system (same index as inputs)
+        """
+        entries = ['RTE', 'kWh_in', 'kWh_out', 'kW_in_avg', 'kW_out_avg',
+                   'kg_water_per_kWh', 'kg_CO2_per_kWh', 'kg_fuel_per_kWh',
+                   'dp_well_avg', 'dp_pipe_f_avg',
+                   'T_aquifer', 'T_cmp_out',
+                   'errors', 'MWh_cushion_gas', 'T_store_init', 'T_cmp_out_avg', 'T_exp_out_avg',
+                   'p_store_min', 'p_store_max', 'steps_used']
+        results = pd.DataFrame(index=self.inputs.index, columns=entries, dtype=float)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            CO2_fuel = self.m_fuel * self.fuel_CO2
+            heat_input_total = self.m_fuel * self.fuel_HHV
+            RTE = self.energy_out / (self.energy_in + heat_input_total)
+            n_flow = self.n_charge + self.n_discharge
+
+            results['RTE'] = RTE
+            results['kWh_in'] = self.energy_in
+            results['kWh_out'] = self.energy_out
+            results['kW_in_avg'] = self.pwr_charge / self.n_charge
+            results['kW_out_avg'] = self.pwr_discharge / self.n_discharge
+            results['kg_water_per_kWh'] = self.m_water / self.energy_out
+            results['kg_CO2_per_kWh'] = CO2_fuel / self.energy_out
+            results['kg_fuel_per_kWh'] = self.m_fuel / self.energy_out
+            results['MWh_cushion_gas'] = self.m_store_min / self.m_dot / 3600 * results['kW_in_avg'].to_numpy() / 1000.0
+            results['dp_well_avg'] = self.dp_well_flow / n_flow
+            results['dp_pipe_f_avg'] = self.dp_pipe_f_flow / n_flow
+            results['T_store_init'] = self.T_store_init
+            results['T_cmp_out_avg'] = self.T1_charge / self.n_charge
+            results['T_exp_out_avg'] = self.T1_discharge / self.n_discharge
+            results['p_store_min'] = self.p_store_min
+            results['p_store_max'] = self.p_store_max
+            results['steps_used'] = n_flow
+
+            # check for errors
+            errors = self.error | (self.energy_in == 0) | (self.energy_out == 0) | ~(RTE > 0)
+
+        # insufficient data - only the initial state was recorded
+        results.loc[self.n_rows <= 1, :] = np.nan
+        results['errors'] = np.where(errors | (self.n_rows <= 1), 'true', 'false')
+        return results
+
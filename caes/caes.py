@@ -1,10 +1,10 @@
+import numpy as np
 import pandas as pd
-import CoolProp.CoolProp as CP  # http://www.coolprop.org/coolprop/HighLevelAPI.html#propssi-function
 from math import log, pi
-from .pressure_drop import aquifer_dp, pipe_fric_dp, pipe_grav_dp
-from .plot_functions import plot_series
-import matplotlib.pyplot as plt
-from .heat_transfer import pipe_heat_transfer_subsurface, pipe_heat_transfer_ocean
+from .pressure_drop import aquifer_dp, pipe_fric_dp_scalar, pipe_grav_dp, pipe_grav_dp_scalar
+from .heat_transfer import WellboreThermalModel
+from .recorder import TimeSeriesRecorder, SummaryRecorder
+from .fluid_properties import air_property_backend, AbstractStateProps
 
 
 # references
@@ -24,7 +24,40 @@ from .heat_transfer import pipe_heat_transfer_subsurface, pipe_heat_transfer_oce
 #
 
 
+class SystemConstants:
+    """
+    invariants of a CAES system that are used in every time step, computed once by CAES.compile
+    """
+    __slots__ = ['R_M', 'p_store_per_kg_K', 'eta', 'd_pipe', 'A_pipe']
+
+
+def compiled_attribute(name):
+    """
+    attribute that precompiled constants depend on, setting it (also after initialization) clears self.constants so
+    that the next time step recompiles them, see CAES.recompile
+    :param name: attribute name, the value is stored as '_' + name
+    :return: property
+    """
+    private = '_' + name
+
+    def get(self):
+        return self.__dict__[private]
+
+    def set(self, value):
+        self.__dict__[private] = value
+        self.__dict__['constants'] = None
+
+    return property(get, set)
+
+
 class CAES:
+    # attributes that self.constants depend on
+    R = compiled_attribute('R')
+    M = compiled_attribute('M')
+    V = compiled_attribute('V')
+    eta_mech = compiled_attribute('eta_mech')
+    eta_gen = compiled_attribute('eta_gen')
+    r_w = compiled_attribute('r_w')
 
     def get_default_inputs():
         attributes = ['debug', 'steps',
@@ -38,10 +71,20 @@ class CAES:
                       'p_hydro_grad', 'p_frac_grad', 'safety_factor',
                       'T_grad_m', 'T_grad_b',
                       'r_f', 'h', 'phi', 'Slr', 'k', 'loss_m_air', 'm_dot', 'mach_limit']
-        inputs = pd.Series(index=attributes)
+        inputs = pd.Series(index=attributes, dtype=object)
 
         inputs['debug'] = False  # debug
         inputs['steps'] = 100.0  # number of steps to use in single cycle simulation
+        inputs['record'] = 'timeseries'  # 'timeseries' (store every step in data) or 'summary' (running sums only)
+        # 'steps' (time stepping), 'adaptive' (time stepping with step sizes from step_tol, see adaptive_steps) or
+        # 'analytic' (closed form if available, otherwise time stepping, see analytic_cycle)
+        inputs['solver'] = 'steps'
+        inputs['step_tol'] = 5e-4  # allowable relative error of RTE and kWh_out of solver 'adaptive' [-]
+
+        # air property calculations, CoolProp AbstractState backend ('HEOS', or tabular 'TTSE&HEOS' and 'BICUBIC&HEOS'),
+        # 'PropsSI' (CoolProp high-level interface) or 'table' (bicubic table, HEOS outside of the table)
+        inputs['property_backend'] = 'HEOS'
+        inputs['property_table_tol'] = 1e-3  # allowable relative error of table [-]
 
         # options to include/exclude various loss mechanisms
         inputs['include_air_leakage'] = True
@@ -124,6 +167,25 @@ class CAES:
         # number of timesteps to use in single cycle simulations
         self.steps = inputs['steps']  # (-)
 
+        # results to record, 'summary' only keeps what analyze_performance requires
+        if inputs['record'] == 'timeseries' or inputs['record'] == 'summary':
+            self.record = inputs['record']
+        else:
+            print('Warning - record must be timeseries or summary, timeseries used')
+            self.record = 'timeseries'
+
+        # solution method of single_cycle
+        if inputs['solver'] in ['steps', 'adaptive', 'analytic']:
+            self.solver = inputs['solver']
+        else:
+            print('Warning - solver must be steps, adaptive or analytic, steps used')
+            self.solver = 'steps'
+        self.step_tol = inputs['step_tol']  # [-]
+        self.steps_used = 0  # number of charge and discharge steps of the last single cycle [-]
+        self.step_error = 0.0  # estimated relative error of the energy of the last cycle, solver 'adaptive' [-]
+        self.work_per_kg = 0.0  # total work per kg of the last time step [kJ/kg]
+        self.analytic_results = None  # results of analytic_cycle, used by analyze_performance
+
         # options to include/exclude various loss mechanisms
         self.include_air_leakage = inputs['include_air_leakage']
         self.include_aquifer_dp = inputs['include_aquifer_dp']
@@ -141,6 +203,7 @@ class CAES:
 
         # atmospheric air properties
         self.air = "Air"  # CoolProp fluid name [-]
+        self.air_props = air_property_backend(inputs['property_backend'], tol=inputs['property_table_tol'])
         self.M = 28.97  # molecular weight [kg/kmol]
         self.T_atm = inputs['T_atm'] + 273.15  # K
         self.p_atm = inputs['p_atm']  # [MPa]
@@ -149,10 +212,10 @@ class CAES:
         self.water = 'Water'  # CoolProp fluid name [-]
         self.T_water = inputs['T_water'] + 273.15  # [K]
         self.p_water = inputs['p_water']  # [MPa]
-        self.c_water = CP.PropsSI('CPMASS', 'T', self.T_water, 'P', self.p_water * 1e6,
-                                  self.water) / 1000.0  # constant pressure specific heat [kJ/kg-K]
-        self.v_water = 1.0 / CP.PropsSI('D', 'T', self.T_water, 'P', self.p_water * 1e6,
-                                        self.water)  # specific volume (1/density) [m^3/kg]
+        self.water_props = AbstractStateProps('HEOS', self.water)  # only used here, tabular backends not worthwhile
+        cp_water, rho_water = self.water_props.props(('CPMASS', 'D'), self.T_water, self.p_water)
+        self.c_water = cp_water / 1000.0  # constant pressure specific heat [kJ/kg-K]
+        self.v_water = 1.0 / rho_water  # specific volume (1/density) [m^3/kg]
 
         # fuel properties (default values are for natural gas)
         self.fuel_HHV = inputs['fuel_HHV']  # [kWh/kg]
@@ -215,6 +278,14 @@ class CAES:
         self.h_ocean = inputs['h_ocean']  # [W/m^2-K]
         self.T_ocean = inputs['T_ocean']  # [K]
 
+        # wellbore heat transfer, surface temperature of the subsurface pipe is the formation temperature at mid-depth
+        T_pipe_sub = 273.15 + self.T_grad_m * self.depth / 2.0 + self.T_grad_b  # [K]
+        self.wellbore = WellboreThermalModel(r_pipe=self.r_w, t_pipe=self.t_pipe, t_cement=self.t_cement,
+                                             r_rock=self.r_rock, depth=self.depth, T_sub=T_pipe_sub,
+                                             depth_ocean=self.depth_ocean, t_insul=self.t_insul, T_ocean=self.T_ocean,
+                                             k_pipe=self.k_pipe, k_cement=self.k_cement, k_rock=self.k_rock,
+                                             k_insul=self.k_insul, h_ocean=self.h_ocean)
+
         # aquifer mass losses
         if self.include_air_leakage:
             self.loss_m_air = inputs['loss_m_air']  # fraction of air lost in aquifer [-] #
@@ -231,6 +302,9 @@ class CAES:
         self.m_store_max = self.p_store_max * 1e3 * self.V * self.M / (self.R * self.T_store_init)  # maximum [kg]
         self.m_store_max_actual = self.m_store_max  # actual maximum varies based on mass flow rate
 
+        # invariants used in every time step
+        self.compile()
+
         # storage  - initialize state
         self.time = 0.0  # [hr]
         self.T_store = self.T_store_init  # storage temperature [K]
@@ -269,7 +343,7 @@ class CAES:
 
         # check if flow rate exceeds Mach limit
         self.mach_limit = inputs['mach_limit']
-        rho = CP.PropsSI('D', 'T', self.T0, 'P', self.p_well_design_min * 1e6, self.air)  # density [kg/m3]
+        rho, = self.air_props.props(('D',), self.T0, self.p_well_design_min)  # density [kg/m3]
         U_max = self.speed_of_sound * inputs['mach_limit']  # max velocity [m/s]
         self.m_dot_max = rho * U_max * pi * self.r_w ** 2.0  # max flow rate [kg/s]
         if inputs['m_dot'] > self.m_dot_max:
@@ -281,7 +355,7 @@ class CAES:
             print("U_max             m/s   : " + str(U_max))
             print("m_dot_max         kg/s  : " + str(self.m_dot_max))
 
-        # dataframe to store data
+        # time series to store data
         self.attributes_time_series = ['time', 'm_dot', 'delta_t', 'm_air', 'm_air_leakage',
                                        'pwr', 'energy_in', 'energy_out',
                                        'work_per_kg', 'total_work_per_kg', 'water_per_kg',
@@ -291,8 +365,53 @@ class CAES:
                                        'p0', 'p1', 'p2', 'p3',
                                        'T0', 'T1', 'T2', 'T3',
                                        'dp_pipe_f', 'dp_pipe_g', 'dp_well',
+                                       'dT_pipe_ocean', 'dT_pipe_sub', 'dT_pipe',
                                        'error_msg']
-        self.data = pd.DataFrame(columns=self.attributes_time_series)
+        self.init_data()
+
+    def init_data(self):
+        """
+        (re)creates the store for results from self.attributes_time_series
+
+        for record = 'timeseries', rows are preallocated for a single cycle (initial state, charge and discharge) and
+        the store grows as needed. for record = 'summary', only running sums are kept and data is unavailable
+        """
+        if self.record == 'summary':
+            # steps of the adaptive solver differ in mass, averages are weighted by it (see analyze_performance)
+            weights = ('m_air',) if self.solver == 'adaptive' else ()
+            self.recorder = SummaryRecorder(self.attributes_time_series, weights=weights)
+        else:
+            capacity = 2 * int(self.steps) + 1
+            self.recorder = TimeSeriesRecorder(self.attributes_time_series, capacity=capacity)
+
+    @property
+    def data(self):
+        """
+        time series of all time steps, built as a DataFrame from the recorder when accessed
+        """
+        return self.recorder.to_dataframe()
+
+    def compile(self):
+        """
+        computes the invariants used in every time step (self.constants, a SystemConstants). setting any attribute
+        they depend on (see compiled_attribute) clears self.constants, update then calls recompile
+        :return: self.constants
+        """
+        c = SystemConstants()
+        c.R_M = self.R / self.M  # specific gas constant [kJ/kg-K]
+        c.p_store_per_kg_K = self.R / (self.V * self.M) * 1e-3  # storage pressure per mass and temperature [MPa/kg-K]
+        c.eta = self.eta_mech * self.eta_gen  # mechanical and generator efficiency [fr]
+        c.d_pipe = 2 * self.r_w  # pipe diameter [m]
+        c.A_pipe = pi / 4.0 * c.d_pipe ** 2.0  # pipe cross-sectional area [m^2]
+        self.constants = c
+        return c
+
+    def recompile(self):
+        """
+        recomputes all precompiled constants, architectures with constants of their own extend this
+        :return: self.constants
+        """
+        return self.compile()
 
     def update(self, m_dot=50.0, delta_t=1.0):
         """
@@ -303,14 +422,19 @@ class CAES:
 
         :param m_dot: mass flow rate, injection (+) or release (-) [kg/s]
         :param delta_t: time step [hr]
-        :return:
+        :return: s - row of this time step (dict, see TimeSeriesRecorder.new_row and SummaryRecorder.new_row)
         """
 
-        # create series to hold results from this time step
-        s = pd.Series(data=0.0, index=self.attributes_time_series)
+        # invariants, recompiled after an attribute they depend on was changed
+        if self.constants is None:
+            self.recompile()
+        seconds = 3600 * delta_t  # [s]
+
+        # create row to hold results from this time step
+        s = self.recorder.new_row()
         s['m_dot'] = m_dot
         s['delta_t'] = delta_t
-        s['m_air'] = m_dot * 3600 * delta_t  # mass injection/release [kg]
+        s['m_air'] = m_dot * seconds  # mass injection/release [kg]
         s['error_msg'] = self.error_msg
 
         # update time
@@ -352,7 +476,7 @@ class CAES:
             s['T2'] = s['T1'] - self.dT_pipe_ocean - self.dT_pipe_sub  # pipe outlet
 
             # apply mechanical, generator and storage efficienies
-            s['total_work_per_kg'] = s['work_per_kg'] / self.eta_mech / self.eta_gen
+            s['total_work_per_kg'] = s['work_per_kg'] / self.constants.eta
 
         elif s['m_air'] < 0.0:  # (discharge)
 
@@ -377,7 +501,7 @@ class CAES:
             # s['T0'] - expander outlet, calculated by discharge_perf
 
             # apply mechanical, generator and storage efficienies
-            s['total_work_per_kg'] = s['work_per_kg'] * self.eta_mech * self.eta_gen
+            s['total_work_per_kg'] = s['work_per_kg'] * self.constants.eta
 
         else:  # no flow
             # pressure states
@@ -402,9 +526,10 @@ class CAES:
         self.T1 = s['T1']
         self.T2 = s['T2']
         self.T3 = s['T3']
+        self.work_per_kg = s['total_work_per_kg']
 
         # calculate the power per time step
-        s['pwr'] = -1.0 * s['m_air'] * s['total_work_per_kg'] / (3600 * delta_t)  # 3600 converts from hr to s
+        s['pwr'] = -1.0 * s['m_air'] * s['total_work_per_kg'] / seconds
 
         # calculate water and fuel use
         s['m_water'] = s['water_per_kg'] * abs(s['m_air'])
@@ -416,17 +541,14 @@ class CAES:
         elif s['m_air'] < 0.0:  # (discharge)
             s['energy_out'] = -1.0 * s['m_air'] * s['total_work_per_kg'] / 3600  # [kWh]
 
-        # update storage pressure
+        # update storage pressure (results are written into the row)
         s = self.update_storage_pressure(s)
 
-        # -----------------------
-        # finish storing results from current time step
-        # -----------------------
-        self.data = self.data.append(s, ignore_index=True)
-
         # clear warning messages for subsequent time step
         self.error_msg = ''
 
+        return s
+
     def single_cycle(self):
         """
         runs a single cycle, charging and discharge in the number of steps specified in self.steps
@@ -434,6 +556,9 @@ class CAES:
         m_dot [kg/s]
         :return:
         """
+        self.analytic_results = None
+        self.steps_used = 0
+        self.step_error = 0.0
 
         # calculate aquifer pressure loss based on m_dot
         self.calc_aquifer_dp(self.m_dot)  # aquifer pressure losses
@@ -443,6 +568,12 @@ class CAES:
         self.m_store_max_actual = self.p_store_max_actual * 1e3 * self.V * self.M / (
                 self.R * self.T_store_init)  # maximum [kg]
 
+        # closed form solution, if available
+        if self.solver == 'analytic':
+            if self.analytic_available():
+                self.analytic_cycle()
+                return
+
         # mass injection/release per timestep (mass leakage compensated for during injection)
         m_air_in = (self.m_store_max_actual - self.m_store_min) / self.steps / (1 - self.loss_m_air)
         m_air_out = (self.m_store_max_actual - self.m_store_min) / self.steps
@@ -471,11 +602,15 @@ class CAES:
             if self.debug:
                 print("Charging")
 
-            for i in range(int(self.steps)):
-                # charge
-                self.update(m_dot=self.m_dot, delta_t=delta_t_in)
-                if self.debug:
-                    print('/t' + str(i) + ' of ' + str(self.steps))
+            if self.solver == 'adaptive':
+                steps_in = self.adaptive_steps(self.m_dot, m_air_in * self.steps)
+            else:
+                steps_in = int(self.steps)
+                for i in range(steps_in):
+                    # charge
+                    self.update(m_dot=self.m_dot, delta_t=delta_t_in)
+                    if self.debug:
+                        print('/t' + str(i) + ' of ' + str(self.steps))
 
             # ========================
             # discharging
@@ -483,11 +618,189 @@ class CAES:
             if self.debug:
                 print("Discharging")
 
-            for i in range(int(self.steps)):
-                # discharge
-                self.update(m_dot=-1.0 * self.m_dot, delta_t=delta_t_out)
-                if self.debug:
-                    print('/t' + str(i) + ' of ' + str(self.steps))
+            if self.solver == 'adaptive':
+                steps_out = self.adaptive_steps(-1.0 * self.m_dot, m_air_out * self.steps)
+            else:
+                steps_out = int(self.steps)
+                for i in range(steps_out):
+                    # discharge
+                    self.update(m_dot=-1.0 * self.m_dot, delta_t=delta_t_out)
+                    if self.debug:
+                        print('/t' + str(i) + ' of ' + str(self.steps))
+
+            self.steps_used = steps_in + steps_out
+
+    def adaptive_steps(self, m_dot, m_total):
+        """
+        charges or discharges m_total in time steps sized to keep the estimated relative error of the energy within
+        self.step_tol
+
+        the energy of a step is its mass times the work per kg at the start of the step (left-point rule). the
+        trapezoidal rule, from the work per kg at the start of the next step, is one order more accurate, and their
+        difference (half the change in work per kg, times the mass) estimates the error of the step (an embedded
+        pair). the errors of the mass weighted averages of analyze_performance (dp_well, dp_pipe_f and T1) are
+        estimated the same way, and the largest relative error sizes the steps. the error per kg grows in proportion
+        to the step, so each step is sized from the estimate of the step before it. steps are not repeated, the
+        estimate is available only once the next step has been taken. the first step starts from the state before the
+        flow, so it is the smaller of m_total / self.steps and m_total * self.step_tol. the estimated error of the
+        energy, relative to the energy, is stored in self.step_error
+        :param m_dot: mass flow rate, injection (+) or release (-) [kg/s]
+        :param m_total: mass injected/released [kg]
+        :return: number of time steps [-]
+        """
+        m_step = m_total * min(1.0 / self.steps, self.step_tol)  # [kg]
+        m_done = 0.0  # [kg]
+        n = 0
+        work_prev = None  # work per kg at the start of the previous step [kJ/kg]
+        averaged_prev = None  # dp_well, dp_pipe_f and T1 at the start of the previous step [MPa, MPa, K]
+        m_prev = 0.0  # mass of the previous step [kg]
+        error = 0.0  # estimated error of the energy [kJ]
+        energy = 0.0  # [kJ]
+        while m_done < m_total * (1.0 - 1e-12):
+            # last step ends exactly at m_total, without leaving a small step behind
+            m_step = min(m_step, m_total - m_done)
+            if m_total - m_done - m_step < 0.2 * m_step:
+                m_step = m_total - m_done
+
+            self.update(m_dot=m_dot, delta_t=m_step / (abs(m_dot) * 3600))
+            m_done = m_done + m_step
+            m_taken = m_step
+            n = n + 1
+            energy = energy + abs(self.work_per_kg) * m_step
+            if self.debug:
+                print('/t' + str(n) + ' : ' + str(round(m_done / m_total * 100.0, 2)) + ' %')
+
+            # error of the previous step, left-point minus trapezoidal rule
+            if work_prev is not None:
+                step_error = 0.5 * abs(self.work_per_kg - work_prev) * m_prev  # [kJ]
+                error = error + step_error
+                # relative error of the previous step, errors of charge and discharge add up in RTE, so each is kept
+                # to half of step_tol. limit growth/reduction of the step size
+                relative = step_error / max(abs(work_prev) * m_prev, 1e-12)
+                # analyze_performance averages dp_well, dp_pipe_f and T1 over the steps weighted by mass, the same
+                # left-point rule, so their relative errors are kept within step_tol as well
+                averaged = (self.dp_aquifer, self.dp_pipe_f, self.T1)
+                for value, value_prev in zip(averaged, averaged_prev):
+                    relative = max(relative, 0.5 * abs(value - value_prev) / max(abs(value_prev), 1e-12))
+                if relative > 0.0:
+                    m_step = m_prev * min(max(0.5 * self.step_tol / relative, 0.2), 5.0)
+                else:
+                    m_step = m_prev * 5.0
+                m_step = max(m_step, m_total * 1e-6)
+            work_prev = self.work_per_kg
+            averaged_prev = (self.dp_aquifer, self.dp_pipe_f, self.T1)
+            m_prev = m_taken
+
+        self.step_error = max(self.step_error, error / max(energy, 1e-12))
+        return n
+
+    def analytic_available(self):
+        """
+        :return: True if single_cycle has a closed form - the isothermal machinery of CAES (not overridden) and no
+            losses other than the pipe gravitational pressure change and air leakage
+        """
+        cls = type(self)
+        return (cls.charge_perf is CAES.charge_perf and cls.discharge_perf is CAES.discharge_perf and
+                cls.update is CAES.update and cls.update_storage_pressure is CAES.update_storage_pressure and
+                not self.include_aquifer_dp and not self.include_pipe_dp_friction and
+                not self.include_pipe_heat_transfer)
+
+    def analytic_cycle(self, nodes=16):
+        """
+        single cycle in closed form, the limit of the time stepping of single_cycle as steps tends to infinity. Results
+        are stored for analyze_performance, time series are not recorded
+
+        With isothermal machinery the storage pressure is proportional to the mass stored (p = c m) and the work is
+        R/M T ln(p/p0) per kg, so without losses the energy is integrated exactly:
+            integral of ln(c m / p0) dm = m (ln(c m / p0) - 1)
+        With the pipe gravitational pressure change the machine pressure depends on the density of the air in the
+        well, and the energy is integrated by Gauss-Legendre quadrature over the mass stored
+
+        :param nodes: number of quadrature points (pipe gravity only) [-]
+        """
+        c = self.R * self.T_store / (self.V * self.M) * 1e-3  # storage pressure per mass stored [MPa/kg]
+        m_low = self.m_store_min  # [kg]
+        m_high = self.m_store_max_actual  # [kg]
+        eta = self.eta_mech * self.eta_gen  # [fr]
+
+        # work per mass stored, integrated over the mass stored [kJ]
+        if m_high <= m_low:
+            work_in = 0.0
+            work_out = 0.0
+        elif not self.include_pipe_dp_gravity:
+            def integral(m):
+                return m * (log(c * m / self.p_atm) - 1.0)
+
+            work_in = self.R / self.M * self.T_atm * (integral(m_high) - integral(m_low))
+            work_out = self.R / self.M * self.T_store * (integral(m_high) - integral(m_low))
+        else:
+            x, w = np.polynomial.legendre.leggauss(nodes)
+            m = 0.5 * (m_low + m_high) + 0.5 * (m_high - m_low) * x
+            w = 0.5 * (m_high - m_low) * w
+            p_store = c * m
+
+            # charge, compressor outlet pressure depends on the density at the compressor outlet (fixed point)
+            T = np.full(nodes, self.T_atm)
+            p1 = p_store.copy()
+            for i in range(50):
+                rho, = self.air_props.props_array(('D',), T, p1)
+                p1_new = p_store + pipe_grav_dp(m_dot=self.m_dot, rho=rho, z=self.depth)
+                converged = np.max(np.abs(p1_new - p1)) < 1e-12 * np.max(p_store)
+                p1 = p1_new
+                if converged:
+                    break
+            work_in = self.R / self.M * self.T_atm * np.sum(w * np.log(p1 / self.p_atm))
+
+            # discharge, density at the bottom of the well
+            rho, = self.air_props.props_array(('D',), np.full(nodes, self.T_store), p_store)
+            p1 = p_store - pipe_grav_dp(m_dot=-self.m_dot, rho=rho, z=self.depth)
+            work_out = self.R / self.M * self.T_store * np.sum(w * np.log(p1 / self.p_atm))
+
+        # energy (mass leakage compensated for during injection) and duration
+        energy_in = work_in / (1.0 - self.loss_m_air) / eta / 3600.0  # [kWh]
+        energy_out = work_out * eta / 3600.0  # [kWh]
+        delta_t_in = (m_high - m_low) / (1.0 - self.loss_m_air) / (self.m_dot * 3600)  # [hr]
+        delta_t_out = (m_high - m_low) / (self.m_dot * 3600)  # [hr]
+
+        # store results, as in analyze_performance
+        entries = ['RTE', 'kWh_in', 'kWh_out', 'kW_in_avg', 'kW_out_avg',
+                   'kg_water_per_kWh', 'kg_CO2_per_kWh', 'kg_fuel_per_kWh',
+                   'dp_well_avg', 'dp_pipe_f_avg',
+                   'T_aquifer', 'T_cmp_out',
+                   'errors']
+        results = pd.Series(index=entries, dtype=object)
+        if m_high > m_low:
+            RTE = energy_out / energy_in
+            results['RTE'] = RTE
+            results['kWh_in'] = energy_in
+            results['kWh_out'] = energy_out
+            results['kW_in_avg'] = energy_in / delta_t_in
+            results['kW_out_avg'] = energy_out / delta_t_out
+            results['kg_water_per_kWh'] = 0.0  # isothermal - no cooling water or fuel
+            results['kg_CO2_per_kWh'] = 0.0
+            results['kg_fuel_per_kWh'] = 0.0
+            results['MWh_cushion_gas'] = self.m_store_min / self.m_dot / 3600 * results['kW_in_avg'] / 1000.0
+            results['dp_well_avg'] = 0.0
+            results['dp_pipe_f_avg'] = 0.0
+            results['T_store_init'] = self.T_store_init
+            results['T_cmp_out_avg'] = self.T_atm
+            results['T_exp_out_avg'] = self.T_store
+            results['p_store_min'] = self.p_store_min
+            results['p_store_max'] = self.p_store_max
+            results['steps_used'] = 0  # no time steps
+            if self.error_msg != '' or energy_in == 0 or energy_out == 0 or RTE <= 0:
+                results['errors'] = 'true'
+            else:
+                results['errors'] = 'false'
+        else:  # no cycle
+            results['errors'] = 'true'
+        self.analytic_results = results.infer_objects()
+
+        # state at the end of the cycle
+        self.time = self.time + 1e-6 + delta_t_in + delta_t_out  # [hr]
+        self.m_store = self.m_store_min  # [kg]
+        self.p_store = self.p_store_min  # [MPa]
+        self.error_msg = ''
 
     def debug_perf(self, delta_t=1.0):
         """
@@ -507,6 +820,62 @@ class CAES:
         for i in range(n_steps):
             self.update(m_dot=m_dot_out, delta_t=delta_t)
 
+    def run_profile(self, m_dot_series, dt_series=1.0, limit=True):
+        """
+        runs a sequence of time steps, e.g. an hourly dispatch over a year or several days of cycling. starts from the
+        current state and leaves the state at the end of the profile, so profiles can follow each other
+
+        for long profiles, record = 'summary' avoids storing the history twice (data is then unavailable, use the
+        returned DataFrame)
+        :param m_dot_series: mass flow rate of each time step, injection (+), release (-) or none (0) [kg/s]
+        :param dt_series: duration of each time step, or a single duration for every time step [hr]
+        :param limit: reduce the mass flow rate of time steps that would fill the storage beyond its maximum (less the
+            aquifer pressure losses) or empty it below its minimum
+        :return: DataFrame, one row per time step (index of m_dot_series, if a Series) with entries
+            time [hr], m_dot [kg/s] (after limits), pwr [kW], energy_in [kWh], energy_out [kWh], p_store [MPa],
+            m_store [kg]
+        """
+        index = m_dot_series.index if isinstance(m_dot_series, pd.Series) else None
+        m_dot_series = np.asarray(m_dot_series, dtype=float)
+        dt_series = np.broadcast_to(np.asarray(dt_series, dtype=float), m_dot_series.shape)
+
+        # results are read from each row as it is written, as the summary recorder keeps no history
+        columns = ['time', 'm_dot', 'pwr', 'energy_in', 'energy_out', 'p_store', 'm_store']
+        values = np.zeros((len(m_dot_series), len(columns)))
+        self.analytic_results = None
+        for i in range(len(m_dot_series)):
+            m_dot = m_dot_series[i]
+            delta_t = dt_series[i]
+            if limit:
+                m_dot = self.limit_m_dot(m_dot, delta_t)
+            s = self.update(m_dot=m_dot, delta_t=delta_t)
+            for j, column in enumerate(columns):
+                values[i, j] = s[column]
+        self.steps_used = self.steps_used + len(m_dot_series)
+
+        return pd.DataFrame(values, index=index, columns=columns)
+
+    def limit_m_dot(self, m_dot, delta_t):
+        """
+        mass flow rate of a time step, reduced if needed to keep the storage between its minimum and its maximum (less
+        the aquifer pressure losses at m_dot, as in single_cycle)
+        :param m_dot: requested mass flow rate, injection (+) or release (-) [kg/s]
+        :param delta_t: time step [hr]
+        :return: m_dot [kg/s]
+        """
+        if m_dot > 0.0:  # (charge)
+            self.calc_aquifer_dp(m_dot)
+            m_store_max = (self.p_store_max - self.dp_aquifer) * 1e3 * self.V * self.M / (self.R * self.T_store)  # [kg]
+            m_air_max = max(m_store_max - self.m_store, 0.0) / (1 - self.loss_m_air)  # [kg]
+        elif m_dot < 0.0:  # (discharge)
+            m_air_max = max(self.m_store - self.m_store_min, 0.0)  # [kg]
+        else:
+            return m_dot
+
+        if abs(m_dot) * 3600 * delta_t > m_air_max:
+            m_dot = m_dot / abs(m_dot) * m_air_max / (3600 * delta_t)
+        return m_dot
+
     def analyze_performance(self):
         """
 
@@ -526,44 +895,60 @@ class CAES:
                    'dp_well_avg', 'dp_pipe_f_avg',
                    'T_aquifer', 'T_cmp_out',
                    'errors']
-        results = pd.Series(index=entries)
+        results = pd.Series(index=entries, dtype=object)
+
+        # single cycle solved in closed form
+        if self.analytic_results is not None:
+            return self.analytic_results.copy()
 
-        if len(self.data) > 1:
+        if len(self.recorder) > 1:
 
             # compute performance
-            energy_input_total = self.data.loc[:, 'energy_in'].sum()  # [kWh]
-            energy_output_total = self.data.loc[:, 'energy_out'].sum()  # [kWh]
-            water_input_total = self.data.loc[:, 'm_water'].sum()  # [kg]
-            fuel_input_total = self.data.loc[:, 'm_fuel'].sum()  # [kg]
+            energy_input_total = self.recorder.total('energy_in')  # [kWh]
+            energy_output_total = self.recorder.total('energy_out')  # [kWh]
+            water_input_total = self.recorder.total('m_water')  # [kg]
+            fuel_input_total = self.recorder.total('m_fuel')  # [kg]
             CO2_fuel = fuel_input_total * self.fuel_CO2  # [ton]
             heat_input_total = fuel_input_total * self.fuel_HHV  # [kWh]
             RTE = energy_output_total / (energy_input_total + heat_input_total)
 
-            # power in/out indices
-            ind_pwr_in = self.data.loc[:, 'm_air'] > 0.0
-            ind_pwr_out = self.data.loc[:, 'm_air'] < 0.0
-            ind_pwr = self.data.loc[:, 'm_air'] != 0.0
-
-            # store results
+            # store results (averages are taken over charging, discharging or all time steps with flow)
             results['RTE'] = RTE
             results['kWh_in'] = energy_input_total
             results['kWh_out'] = energy_output_total
-            results['kW_in_avg'] = self.data.loc[ind_pwr_in, 'pwr'].mean()
-            results['kW_out_avg'] = self.data.loc[ind_pwr_out, 'pwr'].mean()
+            results['kW_in_avg'] = self.recorder.mean('pwr', 'charge')
+            results['kW_out_avg'] = self.recorder.mean('pwr', 'discharge')
             results['kg_water_per_kWh'] = water_input_total / energy_output_total
             results['kg_CO2_per_kWh'] = CO2_fuel / energy_output_total
             results['kg_fuel_per_kWh'] = fuel_input_total / energy_output_total
             results['MWh_cushion_gas'] = self.m_store_min / self.m_dot / 3600 * results['kW_in_avg'] / 1000.0
-            results['dp_well_avg'] = self.data.loc[ind_pwr, 'dp_well'].mean()
-            results['dp_pipe_f_avg'] = self.data.loc[ind_pwr, 'dp_pipe_f'].mean()
+            results['dp_well_avg'] = self.recorder.mean('dp_well', 'flow')
+            results['dp_pipe_f_avg'] = self.recorder.mean('dp_pipe_f', 'flow')
             results['T_store_init'] = self.T_store_init
-            results['T_cmp_out_avg'] = self.data.loc[ind_pwr_in, 'T1'].mean()
-            results['T_exp_out_avg'] = self.data.loc[ind_pwr_out, 'T1'].mean()
+            results['T_cmp_out_avg'] = self.recorder.mean('T1', 'charge')
+            results['T_exp_out_avg'] = self.recorder.mean('T1', 'discharge')
             results['p_store_min'] = self.p_store_min
             results['p_store_max'] = self.p_store_max
 
+            # steps of the adaptive solver differ in duration and mass, average power is energy over duration and
+            # the other averages are weighted by the mass of each step. fixed steps are as many in charge as in
+            # discharge, so averages over both weight the two equally
+            if self.solver == 'adaptive':
+                results['dp_well_avg'] = 0.5 * (self.recorder.mean('dp_well', 'charge', weights='m_air') +
+                                                self.recorder.mean('dp_well', 'discharge', weights='m_air'))
+                results['dp_pipe_f_avg'] = 0.5 * (self.recorder.mean('dp_pipe_f', 'charge', weights='m_air') +
+                                                  self.recorder.mean('dp_pipe_f', 'discharge', weights='m_air'))
+                results['T_cmp_out_avg'] = self.recorder.mean('T1', 'charge', weights='m_air')
+                results['T_exp_out_avg'] = self.recorder.mean('T1', 'discharge', weights='m_air')
+                results['kW_in_avg'] = self.recorder.mean('energy_in', 'charge') / self.recorder.mean('delta_t',
+                                                                                                       'charge')
+                results['kW_out_avg'] = self.recorder.mean('energy_out', 'discharge') / self.recorder.mean('delta_t',
+                                                                                                         'discharge')
+                results['MWh_cushion_gas'] = self.m_store_min / self.m_dot / 3600 * results['kW_in_avg'] / 1000.0
+            results['steps_used'] = self.steps_used
+
             # check for errors
-            if len(self.data.error_msg.unique()) > 1:  # errors
+            if len(self.recorder.unique('error_msg')) > 1:  # errors
                 results['errors'] = 'true'
             elif energy_input_total == 0 or energy_output_total == 0 or RTE <= 0:
                 results['errors'] = 'true'
@@ -583,13 +968,13 @@ class CAES:
         designed to be kept the same for each caes architecutre
 
         :param:
-            s - pandas series containing performance of current time step and error messages
+            s - row (dict) containing performance of current time step and error messages
         :return:
             s - updated
         """
         # update storage mass and pressure
         self.m_store = self.m_store + s['m_air'] - s['m_air_leakage']
-        self.p_store = self.m_store * self.R * self.T_store / (self.V * self.M) * 1e-3  # storage pressure
+        self.p_store = self.m_store * self.T_store * self.constants.p_store_per_kg_K  # storage pressure [MPa]
         if self.include_aquifer_heat_transfer:
             self.T_store = self.T_store
 
@@ -621,7 +1006,7 @@ class CAES:
         designed to be updated for each caes architecture
 
         :param:
-            s - pandas series containing performance of current time step and error messages
+            s - row (dict) containing performance of current time step and error messages
         :return:
             s - updated including (at a minimum) the following entries:
                 work_per_kg - compression work [kJ/kg air]
@@ -630,7 +1015,7 @@ class CAES:
         """
 
         # idealized isothermal process
-        s['work_per_kg'] = self.R / self.M * s['T0'] * log(s['p0'] / s['p1'])
+        s['work_per_kg'] = self.constants.R_M * s['T0'] * log(s['p0'] / s['p1'])
         s['water_per_kg'] = 0.0  # idealized process - no cooling water [kg/kg air]
         s['fuel_per_kg'] = 0.0  # isothermal - no heat input [kg/kg air]
         s['T1'] = s['T0']
@@ -643,7 +1028,7 @@ class CAES:
         designed to be updated for each caes architecture
 
         :param:
-            s - pandas series containing performance of current time step and error messages
+            s - row (dict) containing performance of current time step and error messages
         :return:
             s - updated including (at a minimum) the following entries:
                 work_per_kg - compression work [kJ/kg air]
@@ -652,7 +1037,7 @@ class CAES:
         """
 
         # idealized isothermal process
-        s['work_per_kg'] = self.R / self.M * s['T1'] * log(s['p1'] / s['p0'])  # [kJ/kg]
+        s['work_per_kg'] = self.constants.R_M * s['T1'] * log(s['p1'] / s['p0'])  # [kJ/kg]
         s['water_per_kg'] = 0.0  # idealized process - no cooling water [kg/kg air]
         s['fuel_per_kg'] = 0.0  # isothermal - no heat input [kg/kg air]
         s['T0'] = s['T1']
@@ -667,11 +1052,10 @@ class CAES:
                 T = self.T3
                 p = self.p3
 
-            # fluid properties, inputs are degrees K and Pa
-            rho = CP.PropsSI('D', 'T', T, 'P', p * 1e6, self.air)  # density, [kg/m3]
-            mu = CP.PropsSI('V', 'T', T, 'P', p * 1e6,
-                            self.air) * 1000  # Viscosity, convert Pa*s (output) to cP
-            Z = CP.PropsSI('Z', 'T', T, 'P', p * 1e6, self.air)  # gas deviation factor [-]
+            # fluid properties, inputs are degrees K and MPa
+            # density [kg/m3], viscosity [Pa*s] and gas deviation factor [-]
+            rho, mu, Z = self.air_props.props(('D', 'V', 'Z'), T, p)
+            mu = mu * 1000  # Viscosity, convert Pa*s (output) to cP
 
             Q = m_dot / rho  # radial flow rate [m3/s]
 
@@ -693,24 +1077,21 @@ class CAES:
             T = self.T2
             p = self.p2
 
-        # fluid properties, inputs are degrees K and Pa
-        rho = CP.PropsSI('D', 'T', T, 'P', p * 1e6, self.air)  # density [kg/m3]
-        mu = CP.PropsSI('V', 'T', T, 'P', p * 1e6, self.air)  # viscosity [Pa*s]
-
-        # pipe diameter
-        d = 2 * self.r_w
+        # fluid properties, inputs are degrees K and MPa
+        rho, mu = self.air_props.props(('D', 'V'), T, p)  # density [kg/m3] and viscosity [Pa*s]
 
-        # friction
+        # friction, pipe geometry from self.constants
         if self.include_pipe_dp_friction and abs(m_dot) > 0.0:
-            self.dp_pipe_f, self.f = pipe_fric_dp(epsilon=self.epsilon, d=d, depth=self.depth, m_dot=m_dot, rho=rho,
-                                                  mu=mu)  # [MPa]
+            self.dp_pipe_f, self.f = pipe_fric_dp_scalar(epsilon=self.epsilon, d=self.constants.d_pipe,
+                                                         A=self.constants.A_pipe, depth=self.depth, m_dot=m_dot,
+                                                         rho=rho, mu=mu)  # [MPa]
         else:
             self.dp_pipe_f = 0.0
             self.f = 0.0
 
         # gravity
         if self.include_pipe_dp_gravity:
-            self.dp_pipe_g = pipe_grav_dp(m_dot=m_dot, rho=rho, z=self.depth)  # [MPa]
+            self.dp_pipe_g = pipe_grav_dp_scalar(m_dot=m_dot, rho=rho, z=self.depth)  # [MPa]
         else:
             self.dp_pipe_g = 0.0
 
@@ -725,43 +1106,23 @@ class CAES:
                 T = self.T2
                 p = self.p2
 
-            # fluid properties, inputs are degrees K and Pa
-            rho = CP.PropsSI('D', 'T', T, 'P', p * 1e6, self.air)  # density [kg/m3]
-            mu = CP.PropsSI('V', 'T', T, 'P', p * 1e6, self.air)  # viscosity [Pa*s]
-            Pr = CP.PropsSI('PRANDTL', 'T', T, 'P', p * 1e6, self.air)  # viscosity [Pa*s]
-            k = CP.PropsSI('CONDUCTIVITY', 'T', T, 'P', p * 1e6, self.air)  # thermal conductivity [W/m/K]
-            cp = CP.PropsSI('CPMASS', 'T', T, 'P', p * 1e6, self.air)  # thermal conductivity [W/m/K]
-
-            # average pipe surface temperature
-            avg_depth = self.depth / 2.0
-            Ts = 273.15 + self.T_grad_m * avg_depth + self.T_grad_b
-
-            for i in range(2):
-                if (i == 0 and m_dot > 0.0) or (i == 1 and m_dot < 0.0):
-
-                    self.dT_pipe_ocean = pipe_heat_transfer_ocean(r_pipe=self.r_w, depth=self.depth_ocean,
-                                                                  t_pipe=self.t_pipe, t_insul=self.t_insul,
-                                                                  Tm=T, Ts=self.T_ocean, m_dot=m_dot,
-                                                                  k_pipe=self.k_pipe, k_air=k, k_insul=self.k_insul,
-                                                                  rho=rho, mu=mu, Pr=Pr, cp=cp,
-                                                                  h_ocean=self.h_ocean,
-                                                                  debug=False)
-                    T = T - self.dT_pipe_ocean
-                else:
-                    self.dT_pipe_sub = pipe_heat_transfer_subsurface(r_pipe=self.r_w, t_pipe=self.t_pipe,
-                                                                     t_cement=self.t_cement,
-                                                                     r_rock=self.r_rock, depth=self.depth,
-                                                                     Tm=T, Ts=Ts, m_dot=m_dot,
-                                                                     k_pipe=self.k_pipe, k_cement=self.k_cement,
-                                                                     k_rock=self.k_rock, k_air=k,
-                                                                     rho=rho, mu=mu, Pr=Pr, cp=cp, debug=False)
-                    T = T - self.dT_pipe_sub
+            # fluid properties, inputs are degrees K and MPa
+            # density [kg/m3], viscosity [Pa*s], Prandtl number [-], thermal conductivity [W/m/K],
+            # heat capacity [J/kg/K]
+            rho, mu, Pr, k, cp = self.air_props.props(('D', 'V', 'PRANDTL', 'CONDUCTIVITY', 'CPMASS'), T, p)
+
+            self.dT_pipe_ocean, self.dT_pipe_sub = self.wellbore.delta_T(Tm=T, m_dot=m_dot, k_air=k, rho=rho, mu=mu,
+                                                                         Pr=Pr, cp=cp)
 
         else:
             self.dT_pipe_ocean = 0.0
             self.dT_pipe_sub = 0.0
 
     def plot_overview(self, casename=''):
+        # plotting libraries are only imported when plotting, so that simulations do not load them
+        import matplotlib.pyplot as plt
+        from .plot_functions import plot_series
+
         df = self.data
         df.loc[:, 'step'] = df.index
 
@@ -778,6 +1139,9 @@ class CAES:
         plt.close()
 
     def plot_pressures(self, casename=''):
+        import matplotlib.pyplot as plt
+        from .plot_functions import plot_series
+
         df = self.data
         df.loc[:, 'step'] = df.index
 
@@ -795,6 +1159,9 @@ class CAES:
         plt.close()
 
     def plot_pressure_losses(self, casename=''):
+        import matplotlib.pyplot as plt
+        from .plot_functions import plot_series
+
         df = self.data
         df.loc[:, 'step'] = df.index
 
@@ -5,83 +5,112 @@ import pandas as pd
 import numpy as np
 import math
 
-
-# Specific Speed Chart Inputs
-def size_caes_cmp(p_in=1.01325, t_in=20.0, p_out=10.0, m_dot=2.2, RPM_low=10000, RPM_high=50000, RPM_cases=5,
-                  machine_type='radial-mixed-axial', debug=False):
-    Ns_conversion = 2 * math.pi / 60.0 / (
-            32.2 ** 0.5)  # converts between Balje specific speed maps and Barber-nichols maps
-    Ds_conversion = (32.2) ** 0.25
-    # Barber-nichols maps: https://barber-nichols.com/media/tools-resources/
-    # Balje: Balje, O.E., “Turbomachines”, John Wiley & Sons, 1981
-
-    if machine_type == 'piston':
-        # Sizing Rules
-        PR_stg_min = 1.5
-        PR_stg_max = 10.0
-        # Specific Speed Chart Inputs
-        Ns_ideal = Ns_conversion * np.array(
+# converts between Balje specific speed maps and Barber-nichols maps
+Ns_conversion = 2 * math.pi / 60.0 / (32.2 ** 0.5)
+Ds_conversion = (32.2) ** 0.25
+# Barber-nichols maps: https://barber-nichols.com/media/tools-resources/
+# Balje: Balje, O.E., “Turbomachines”, John Wiley & Sons, 1981
+
+# sizing rules and specific speed chart inputs of each machine type
+CMP_MAPS = {
+    'piston': {
+        'PR_stg_min': 1.5,
+        'PR_stg_max': 10.0,
+        'Ns': Ns_conversion * np.array(
             [0.002872329, 0.00590389, 0.008295814, 0.014572054, 0.035995733, 0.10316148, 0.300691974, 0.608738487,
-             1.01146603, 1.617291568, 2.25500884])
-        Ds_ideal = Ds_conversion * np.array(
+             1.01146603, 1.617291568, 2.25500884]),
+        'Ds': Ds_conversion * np.array(
             [31.41541905, 24.14666422, 20.08432049, 16.48704628, 12.50670359, 10.2323066, 7.77903859, 6.237728314,
-             5.078561789, 3.92018785, 2.980295035])
-        eff_ideal = np.array([0.4, 0.5, 0.6, 0.7, 0.8, 0.8, 0.8, 0.8, 0.8, 0.8, 0.8, ])
-
-    elif machine_type == 'rotary-piston':
-        # Sizing Rules
-        PR_stg_min = 1.5
-        PR_stg_max = 10.0
-        # Specific Speed Chart Inputs
-        Ns_ideal = Ns_conversion * np.array(
+             5.078561789, 3.92018785, 2.980295035]),
+        'eff': np.array([0.4, 0.5, 0.6, 0.7, 0.8, 0.8, 0.8, 0.8, 0.8, 0.8, 0.8, ]),
+    },
+    'rotary-piston': {
+        'PR_stg_min': 1.5,
+        'PR_stg_max': 10.0,
+        'Ns': Ns_conversion * np.array(
             [2.109891057, 2.57455404, 3.267744356, 4.425670872, 5.998756468, 10.18117455, 28.15197286, 65.54821372,
-             127.0142239, 143.1603893, 174.6004778])
-        Ds_ideal = Ds_conversion * np.array(
+             127.0142239, 143.1603893, 174.6004778]),
+        'Ds': Ds_conversion * np.array(
             [2.485830474, 2.519073184, 2.420655319, 1.931324482, 1.713687991, 1.404082411, 0.814427152, 0.504845249,
-             0.408178234, 0.424773753, 0.402791749])
-        eff_ideal = np.array([0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.8, 0.7, 0.6, 0.5])
-
-    elif machine_type == 'radial-mixed-axial':  # radial/mixed/axial
-        # Sizing Rules
-        PR_stg_min = 1.5
-        PR_stg_max = 3.6
-        # Specific Speed Chart Inputs
-        Ns_ideal = Ns_conversion * np.array(
+             0.408178234, 0.424773753, 0.402791749]),
+        'eff': np.array([0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.8, 0.7, 0.6, 0.5]),
+    },
+    'radial-mixed-axial': {
+        'PR_stg_min': 1.5,
+        'PR_stg_max': 3.6,
+        'Ns': Ns_conversion * np.array(
             [17.08552039, 20.11489472, 23.24840648, 29.15502332, 39.30029828, 59.07563978, 337.6362693, 824.9591252,
-             1925.245424, 3710.761211])
-        Ds_ideal = Ds_conversion * np.array(
+             1925.245424, 3710.761211]),
+        'Ds': Ds_conversion * np.array(
             [8.007409952, 7.045900533, 6.032206364, 4.844378804, 3.51843236, 2.397080062, 0.800740995, 0.737526752,
-             0.654923352, 0.603220636])
-        eff_ideal = np.array([0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.8, 0.7, 0.6, 0.5])
-
+             0.654923352, 0.603220636]),
+        'eff': np.array([0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.8, 0.7, 0.6, 0.5]),
         # for classification
-        Ns_radial = Ns_conversion * 59.07563978  # less than this is radial
-        Ns_axial = Ns_conversion * 337.6362693  # more than this is axial, remainer is mixed
+        'Ns_radial': Ns_conversion * 59.07563978,  # less than this is radial
+        'Ns_axial': Ns_conversion * 337.6362693,  # more than this is axial, remainer is mixed
+    },
+}
 
-    else:
+# interpolants of the specific speed charts, created once per machine type
+_cmp_interpolants = {}
+
+
+def cmp_interpolants(machine_type):
+    """
+    interpolants of the specific speed chart of a machine type, cached
+    :param machine_type: key of CMP_MAPS
+    :return f_Ds: specific diameter as a function of specific speed
+    :return f_eff: efficiency as a function of specific speed
+    """
+    if machine_type not in _cmp_interpolants:
+        chart = CMP_MAPS[machine_type]
+        _cmp_interpolants[machine_type] = (interp1d(chart['Ns'], chart['Ds']), interp1d(chart['Ns'], chart['eff']))
+    return _cmp_interpolants[machine_type]
+
+
+# Specific Speed Chart Inputs
+def size_caes_cmp(p_in=1.01325, t_in=20.0, p_out=10.0, m_dot=2.2, RPM_low=10000, RPM_high=50000, RPM_cases=5,
+                  machine_type='radial-mixed-axial', debug=False):
+    """
+    Sizes compressors using specific speed charts, every number of stages and RPM is evaluated at once
+
+    p_in, t_in, p_out and m_dot may be NumPy arrays (broadcast together), each element is an operating point
+
+    :param p_in: inlet pressure [bar]
+    :param t_in: inlet temperature [C]
+    :param p_out: outlet pressure [bar]
+    :param m_dot: mass flow rate [kg/s]
+    :param RPM_low: lowest speed considered [rev/min]
+    :param RPM_high: highest speed considered [rev/min]
+    :param RPM_cases: number of speeds considered [-]
+    :param machine_type: 'piston', 'rotary-piston' or 'radial-mixed-axial'
+    :param debug: debug option [Boolean]
+    :return: DataFrame, one row per feasible design (specific speed within the chart), the column point is the
+        position of the operating point (0 for scalar inputs)
+    """
+    if machine_type not in CMP_MAPS:
         print('machine type must be equal to ''piston'', ''rotary-piston'', or ''radial-mixed-axial''')
         return
+    chart = CMP_MAPS[machine_type]
+    Ns_ideal = chart['Ns']
+    f_Ds, f_eff = cmp_interpolants(machine_type)
 
-    # Convert Inputs
+    # Convert Inputs, one entry per operating point
+    p_in, t_in, p_out, m_dot = np.broadcast_arrays(*[np.atleast_1d(np.asarray(x, dtype=float))
+                                                     for x in (p_in, t_in, p_out, m_dot)])
     p_in = p_in * 1E5  # from bar to Pa
     t_in = t_in + 273.15  # from C to K
     p_out = p_out * 1E5  # from bar to Pa
 
-    # Interpolate Specific Speed Chart Inputs
-    f_Ds = interp1d(Ns_ideal, Ds_ideal)
-    f_eff = interp1d(Ns_ideal, eff_ideal)
-
-    # Determine range of stages to consider
+    # Determine range of stages to consider for each operating point
     PR = p_out / p_in
-    Nstg_low = math.ceil(math.log(PR) / math.log(PR_stg_max))
-    Nstg_high = math.floor(math.log(PR) / math.log(PR_stg_min))
-    Nstgs = np.arange(Nstg_low, Nstg_high, 1)
-    if len(Nstgs) == 0:
-        Nstgs = [Nstg_low]
+    Nstg_low = np.ceil(np.log(PR) / math.log(chart['PR_stg_max'])).astype(int)
+    Nstg_high = np.floor(np.log(PR) / math.log(chart['PR_stg_min'])).astype(int)
+    Nstgs = np.arange(Nstg_low.min(), max(Nstg_high.max(), Nstg_low.max() + 1), 1)
     if debug:
         print('Range of Stages Considered')
-        print('Nstg_low  :' + str(round(Nstg_low, 0)))
-        print('Nstg_high :' + str(round(Nstg_high, 0)))
+        print('Nstg_low  :' + str(Nstg_low))
+        print('Nstg_high :' + str(Nstg_high))
         print('Nstgs     :' + str(Nstgs) + '\n')
 
     # RPMs to consider
@@ -103,103 +132,69 @@ def size_caes_cmp(p_in=1.01325, t_in=20.0, p_out=10.0, m_dot=2.2, RPM_low=10000,
     if debug:
         print('Constants and Fluid Properties:')
         print('g     :' + str(round(g, 3)) + ' (m/s^2)')
-        print('CP    :' + str(round(CP, 3)) + ' (kJ/kg-K)')
-        print('CV    :' + str(round(CV, 3)) + ' (kJ/kg-K)')
-        print('kappa :' + str(round(kappa, 3)) + ' (-)')
+        print('CP    :' + str(np.round(CP, 3)) + ' (kJ/kg-K)')
+        print('CV    :' + str(np.round(CV, 3)) + ' (kJ/kg-K)')
+        print('kappa :' + str(np.round(kappa, 3)) + ' (-)')
         print('MW    :' + str(round(MW, 3)) + ' (kg/kmol)')
         print('R_bar :' + str(round(R_bar, 3)) + ' (kJ/kmol-K)')
         print('R     :' + str(round(R, 3)) + ' (J/kg-K)')
-        print('D1    :' + str(round(D1, 3)) + ' (kg/m^3)')
-        print('V1    :' + str(round(V1, 3)) + ' (m^3/s)\n')
-        print('Begin Cases')
-
-    # DataFrame to hold results
-    variables = ['p_in', 't_in', 'p_out', 'm_dot', 'V1', 'Nstg', 'PR_stg', 'RPM', 'H_ad',
-                 'g', 'Ns', 'Ds', 'D', 'eff', 'type', 'r1', 'r2', 'U2', 'psi', 'I', 'mu']
-    df = pd.DataFrame(columns=variables)
-
-    # Perform Runs
-    for Nstg in Nstgs:
-
-        PR_stg = PR ** (1.0 / Nstg)
-
-        for RPM in RPMs:
-
-            # Balje Calculations (Ideal gas)
-            omega = 2 * pi / 60.0 * RPM  # rad/s
-            # omega = RPM
-            H_ad = kappa / (kappa - 1.0) * R * t_in * (PR ** ((kappa - 1.0) / kappa) - 1.0) / Nstg  # kJ/kg
-            Ns = (omega * V1 ** 0.5) / H_ad ** 0.75
-
-            # Print-out values, if debugging
-            if debug:
-                print('Nstg  :' + str(round(Nstg, 0)) + ' (-)')
-                print('PR_stg:' + str(round(PR_stg, 2)) + ' (-)')
-                print('RPM   :' + str(round(RPM, 0)) + ' (rev/min)')
-                print('omega :' + str(round(omega, 2)) + ' (rad/s)')
-                print('H_ad  :' + str(round(H_ad, 2)) + ' (kJ/kg)')
-                print('Ns    :' + str(round(Ns, 3)) + " (-)\n")
-
-            # Check if within the interpolation limits
-            if Ns_ideal.min() <= Ns <= Ns_ideal.max():
-                eff = f_eff(Ns)
-                Ds = f_Ds(Ns)
-                D = (Ds * V1 ** 0.5) / (g * H_ad) ** 0.25
-
-                r2 = D / 2.0  # Tip radius (m)
-                r1 = r2 / 2.0  # Hub radius (m)
-                U2 = omega * r2  # Tip speed (m/s)
-                psi = V1 / (math.pi * r2 ** 2.0 * U2)  # Flow coefficient (-)
-                I = H_ad / U2 ** 2.0  # Work input coefficient (-)
-                mu = eff * I  # Work coefficient (-)
-
-                # Classify Machine Type
-                if machine_type == 'piston':
-                    machine_type = 'Piston'
-                elif machine_type == 'rotary-piston':
-                    machine_type = 'Rotary Piston'
-                elif machine_type == 'radial-mixed-axial':
-                    if Ns < Ns_radial:
-                        machine_type = 'Radial'
-                    elif Ns_axial < Ns:
-                        machine_type = 'Axial'
-                    else:
-                        machine_type = 'Mixed'
-
-                # Print-out values, if debugging
-                if debug:
-                    print("Successfully sized")
-                    print('Ds    :' + str(round(Ds, 3)))
-                    print('D     :' + str(round(D, 3)))
-                    print('eff   :' + str(round(eff, 3)))
-                    print('#================#\n')
-
-                # Save Values
-                s = pd.Series(index=['Nstg', 'PR_stg', 'RPM', 'H_ad', 'g', 'Ns', 'Ds', 'D', 'eff', 'type',
-                                     'r1', 'r2', 'U2', 'psi', 'I', 'mu'])
-                s['Nstg'] = Nstg
-                s['PR_stg'] = PR_stg
-                s['RPM'] = RPM
-                s['H_ad'] = H_ad
-                s['g'] = g
-                s['Ns'] = Ns
-                s['Ds'] = Ds
-                s['D'] = D
-                s['eff'] = eff
-                s['type'] = machine_type
-                s['r1'] = r1
-                s['r2'] = r2
-                s['U2'] = U2
-                s['psi'] = psi
-                s['I'] = I
-                s['mu'] = mu
-                df = df.append(s, ignore_index=True)
-
-    # Store Inputs
-    df.loc[:, 'p_in'] = p_in / 1E5  # from Pa back to bar
-    df.loc[:, 't_in'] = t_in - 273.15  # from K back to C
-    df.loc[:, 'p_out'] = p_out / 1E5  # from Pa back to bar
-    df.loc[:, 'm_dot'] = m_dot  # kg/s
-    df.loc[:, 'V1'] = V1  # m3/s
+        print('D1    :' + str(np.round(D1, 3)) + ' (kg/m^3)')
+        print('V1    :' + str(np.round(V1, 3)) + ' (m^3/s)\n')
+
+    # grid of cases, axes are (operating point, Nstg, RPM)
+    point = np.arange(len(PR))[:, None, None]
+    Nstg = Nstgs[None, :, None]
+    RPM = RPMs[None, None, :]
+    omega = 2 * pi / 60.0 * RPM  # rad/s
+    PR, kappa, t_in, V1 = [x[:, None, None] for x in (PR, kappa, t_in, V1)]
+
+    # stages considered, Nstg_low up to (not including) Nstg_high, or only Nstg_low if that range is empty
+    considered = (Nstg >= Nstg_low[:, None, None]) & (
+            (Nstg < Nstg_high[:, None, None]) | (Nstg == Nstg_low[:, None, None]))
+
+    # Balje Calculations (Ideal gas)
+    PR_stg = PR ** (1.0 / Nstg)
+    H_ad = kappa / (kappa - 1.0) * R * t_in * (PR ** ((kappa - 1.0) / kappa) - 1.0) / Nstg  # kJ/kg
+    Ns = (omega * V1 ** 0.5) / H_ad ** 0.75
+
+    # Check if within the interpolation limits
+    shape = Ns.shape
+    sized = considered & (Ns_ideal.min() <= Ns) & (Ns <= Ns_ideal.max())
+    point, Nstg, PR_stg, RPM, omega, H_ad, Ns, t_in, V1 = [np.broadcast_to(x, shape)[sized] for x in
+                                                           (point, Nstg, PR_stg, RPM, omega, H_ad, Ns, t_in, V1)]
+
+    eff = f_eff(Ns)
+    Ds = f_Ds(Ns)
+    D = (Ds * V1 ** 0.5) / (g * H_ad) ** 0.25
+
+    r2 = D / 2.0  # Tip radius (m)
+    r1 = r2 / 2.0  # Hub radius (m)
+    U2 = omega * r2  # Tip speed (m/s)
+    psi = V1 / (math.pi * r2 ** 2.0 * U2)  # Flow coefficient (-)
+    I = H_ad / U2 ** 2.0  # Work input coefficient (-)
+    mu = eff * I  # Work coefficient (-)
+
+    # Classify Machine Type
+    if machine_type == 'piston':
+        types = np.full(len(Ns), 'Piston', dtype=object)
+    elif machine_type == 'rotary-piston':
+        types = np.full(len(Ns), 'Rotary Piston', dtype=object)
+    else:
+        types = np.where(Ns < chart['Ns_radial'], 'Radial', np.where(chart['Ns_axial'] < Ns, 'Axial', 'Mixed'))
+        types = types.astype(object)
+
+    if debug:
+        print('Cases evaluated       :' + str(int(considered.sum())))
+        print('Cases sized           :' + str(len(Ns)) + '\n')
+
+    # Store Inputs and results
+    df = pd.DataFrame({'point': point,
+                       'p_in': p_in[point] / 1E5,  # from Pa back to bar
+                       't_in': t_in - 273.15,  # from K back to C
+                       'p_out': p_out[point] / 1E5,  # from Pa back to bar
+                       'm_dot': m_dot[point],  # kg/s
+                       'V1': V1,  # m3/s
+                       'Nstg': Nstg, 'PR_stg': PR_stg, 'RPM': RPM, 'H_ad': H_ad, 'g': g, 'Ns': Ns, 'Ds': Ds, 'D': D,
+                       'eff': eff, 'type': types, 'r1': r1, 'r2': r2, 'U2': U2, 'psi': psi, 'I': I, 'mu': mu})
 
     return df
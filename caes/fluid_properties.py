@@ -0,0 +1,328 @@
+import os
+from math import log
+import numpy as np
+import CoolProp
+import CoolProp.CoolProp as CP  # http://www.coolprop.org/coolprop/HighLevelAPI.html#propssi-function
+
+# properties available from every backend, CoolProp output names and units:
+# D - density [kg/m^3]
+# V - viscosity [Pa*s]
+# Z - compressibility (gas deviation) factor [-]
+# PRANDTL - Prandtl number [-]
+# CONDUCTIVITY - thermal conductivity [W/m-K]
+# CPMASS - constant pressure specific heat [J/kg-K]
+PROPERTIES = ('D', 'V', 'Z', 'PRANDTL', 'CONDUCTIVITY', 'CPMASS')
+
+# default location of stored property tables
+TABLE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'caes')
+
+# property tables already loaded by this process, shared between systems
+_tables = {}
+
+
+class PropsSIAir:
+    """
+    air properties from the CoolProp high-level interface, one PropsSI call per property (reference backend)
+    """
+
+    def __init__(self, fluid='Air'):
+        self.fluid = fluid
+
+    def props(self, keys, T, p):
+        """
+        :param keys: CoolProp output names, see PROPERTIES
+        :param T: temperature [K]
+        :param p: pressure [MPa]
+        :return: list of property values, in the order of keys
+        """
+        return [CP.PropsSI(key, 'T', T, 'P', p * 1e6, self.fluid) for key in keys]
+
+    def props_array(self, keys, T, p):
+        """
+        :param keys: CoolProp output names, see PROPERTIES
+        :param T: temperatures [K], NumPy array
+        :param p: pressures [MPa], NumPy array
+        :return: list of NumPy arrays, in the order of keys
+        """
+        T, p = np.broadcast_arrays(np.asarray(T, dtype=float), np.asarray(p, dtype=float))
+        return [np.reshape(CP.PropsSI(key, 'T', T.ravel(), 'P', p.ravel() * 1e6, self.fluid), T.shape)
+                for key in keys]
+
+
+class AbstractStateProps:
+    """
+    fluid properties from a persistent CoolProp AbstractState (low-level interface)
+
+    A single update at (T, p) provides every property, and repeated requests at the same state skip the update.
+    backend selects the CoolProp backend: 'HEOS' (full equation of state), or the tabular 'TTSE&HEOS' and
+    'BICUBIC&HEOS', which are faster at a small loss of accuracy (CoolProp builds and stores their tables on first use)
+    """
+
+    def __init__(self, backend='HEOS', fluid='Air'):
+        """
+        :param backend: CoolProp backend name
+        :param fluid: CoolProp fluid name
+        """
+        self.backend = backend
+        self.fluid = fluid
+        self.state = CP.AbstractState(backend, fluid)
+        self.T = None  # current state [K]
+        self.p = None  # current state [MPa]
+        self.getters = {'D': self.state.rhomass, 'V': self.state.viscosity, 'Z': self.state.compressibility_factor,
+                        'PRANDTL': self.state.Prandtl, 'CONDUCTIVITY': self.state.conductivity,
+                        'CPMASS': self.state.cpmass}
+        if backend != 'HEOS':
+            # tabular backends do not provide Z, calculate from density instead
+            self.R = CP.PropsSI('GAS_CONSTANT', fluid) / CP.PropsSI('M', fluid)  # specific gas constant [J/kg-K]
+            self.getters['Z'] = self.compressibility_factor
+
+    def compressibility_factor(self):
+        return self.p * 1e6 / (self.state.rhomass() * self.R * self.T)
+
+    def props(self, keys, T, p):
+        """
+        :param keys: CoolProp output names, see PROPERTIES
+        :param T: temperature [K]
+        :param p: pressure [MPa]
+        :return: list of property values, in the order of keys
+        """
+        if T != self.T or p != self.p:
+            self.state.update(CP.PT_INPUTS, p * 1e6, T)
+            self.T = T
+            self.p = p
+        return [self.getters[key]() for key in keys]
+
+    def props_array(self, keys, T, p):
+        """
+        :param keys: CoolProp output names, see PROPERTIES
+        :param T: temperatures [K], NumPy array
+        :param p: pressures [MPa], NumPy array
+        :return: list of NumPy arrays, in the order of keys, NaN where CoolProp fails
+        """
+        T, p = np.broadcast_arrays(np.asarray(T, dtype=float), np.asarray(p, dtype=float))
+        results = [np.full(T.shape, np.nan) for key in keys]
+        for index in np.ndindex(T.shape):
+            try:
+                values = self.props(keys, float(T[index]), float(p[index]))
+            except ValueError:  # CoolProp could not solve this state, leave as NaN
+                continue
+            for result, value in zip(results, values):
+                result[index] = value
+        return results
+
+
+class TabulatedAir:
+    """
+    air properties interpolated from a precomputed bicubic table in temperature and log(pressure)
+
+    The table covers T_min to T_max and p_min to p_max. Grid spacing is halved until the interpolation error at the
+    centre of every cell is below tol (relative) for all PROPERTIES, or until max_points per axis is reached (CoolProp's
+    thermal conductivity of air has a kink near 265 K and 24 MPa, so tolerances much below 1e-3 are not reached). Tables
+    are built once with CoolProp, saved in table_dir and memory-mapped when loaded. States outside the table bounds
+    are passed to the fallback backend (CoolProp HEOS by default). props evaluates single states in plain Python from
+    the coefficients of each cell, copied out of the table the first time the cell is used.
+    """
+
+    def __init__(self, T_min=250.0, T_max=750.0, p_min=0.1, p_max=40.0, tol=1e-3, max_points=257,
+                 table_dir=TABLE_DIR, fallback=None, fluid='Air'):
+        """
+        :param T_min: minimum temperature [K]
+        :param T_max: maximum temperature [K]
+        :param p_min: minimum pressure [MPa]
+        :param p_max: maximum pressure [MPa]
+        :param tol: allowable relative interpolation error [-]
+        :param max_points: maximum grid points per axis [-]
+        :param table_dir: directory to store tables in
+        :param fallback: backend used outside the table, default AbstractStateProps('HEOS')
+        :param fluid: CoolProp fluid name
+        """
+        self.fluid = fluid
+        self.T_min = T_min
+        self.T_max = T_max
+        self.p_min = p_min
+        self.p_max = p_max
+        self.tol = tol
+        if fallback is None:
+            fallback = AbstractStateProps('HEOS', fluid)
+        self.fallback = fallback
+        self.index = {key: i for i, key in enumerate(PROPERTIES)}
+        self.cells = {}  # (i, j): coefficients of each property as a tuple of 16 floats, used by props
+        self.max_cells = 4096  # cells kept by props before the cache is cleared [-]
+
+        # bicubic coefficients, shape (n_T - 1, n_p - 1, len(PROPERTIES), 4, 4)
+        key = (fluid, T_min, T_max, p_min, p_max, tol, max_points, table_dir)
+        if key not in _tables:
+            _tables[key] = self._load(max_points, table_dir)
+        self.coeffs = _tables[key]
+
+        # grid, uniform in temperature and log(pressure)
+        self.n_T = self.coeffs.shape[0] + 1
+        self.n_p = self.coeffs.shape[1] + 1
+        self.x_min = log(p_min)
+        self.x_max = log(p_max)
+        self.dT = (T_max - T_min) / (self.n_T - 1)
+        self.dx = (self.x_max - self.x_min) / (self.n_p - 1)
+
+    def _load(self, max_points, table_dir):
+        # load table from disk, or build and save it if it does not exist yet
+        filename = '{}_T{}-{}K_p{}-{}MPa_tol{}_max{}_CoolProp{}.npy'.format(self.fluid, self.T_min, self.T_max,
+                                                                          self.p_min, self.p_max, self.tol,
+                                                                          max_points, CoolProp.__version__)
+        path = os.path.join(table_dir, filename)
+        if not os.path.isfile(path):
+            coeffs = self.build(max_points)
+            os.makedirs(table_dir, exist_ok=True)
+            tmp = path + '.' + str(os.getpid()) + '.tmp'  # write then rename, other processes may be building too
+            with open(tmp, 'wb') as f:
+                np.save(f, coeffs)
+            os.replace(tmp, path)
+        return np.asarray(np.load(path, mmap_mode='r'))  # plain array view of the memory map, faster to index
+
+    def build(self, max_points=257):
+        """
+        computes the bicubic coefficients, refining the grid until the tolerance is met
+        :param max_points: maximum grid points per axis [-]
+        :return: NumPy array of bicubic coefficients
+        """
+        n = 17
+        while True:
+            T = np.linspace(self.T_min, self.T_max, n)
+            x = np.linspace(np.log(self.p_min), np.log(self.p_max), n)
+            coeffs = bicubic_coeffs(self._coolprop_grid(T, x))
+
+            # check against CoolProp at the centre of every cell
+            i, j = np.meshgrid(np.arange(n - 1), np.arange(n - 1), indexing='ij')
+            exact = self._coolprop_grid(T[:-1] + 0.5 * (T[1] - T[0]), x[:-1] + 0.5 * (x[1] - x[0]))
+            approx = bicubic_eval(coeffs, i, j, 0.5, 0.5)
+            error = np.max(np.abs(approx - exact) / np.abs(exact))
+            if error <= self.tol or 2 * n - 1 > max_points:
+                if error > self.tol:
+                    print('Warning - property table tolerance not met, max relative error ' + str(error))
+                return coeffs
+            n = 2 * n - 1
+
+    def _coolprop_grid(self, T, x):
+        # property values on the grid (T, log(p)), shape (len(PROPERTIES), len(T), len(x))
+        T_grid, x_grid = np.meshgrid(T, x, indexing='ij')
+        p_grid = np.exp(x_grid) * 1e6  # [Pa]
+        return np.array([CP.PropsSI(key, 'T', T_grid.ravel(), 'P', p_grid.ravel(), self.fluid).reshape(T_grid.shape)
+                         for key in PROPERTIES])
+
+    def props(self, keys, T, p):
+        """
+        :param keys: CoolProp output names, see PROPERTIES
+        :param T: temperature [K]
+        :param p: pressure [MPa]
+        :return: list of property values, in the order of keys
+        """
+        if not (self.T_min <= T <= self.T_max and self.p_min <= p <= self.p_max):
+            return self.fallback.props(keys, T, p)
+
+        # cell and position within the cell
+        u = (T - self.T_min) / self.dT
+        v = (log(p) - self.x_min) / self.dx
+        i = min(int(u), self.n_T - 2)
+        j = min(int(v), self.n_p - 2)
+        u = u - i
+        v = v - j
+
+        cell = self.cells.get((i, j))
+        if cell is None:
+            if len(self.cells) >= self.max_cells:
+                self.cells.clear()
+            cell = [tuple(a) for a in self.coeffs[i, j].reshape(len(PROPERTIES), 16).tolist()]
+            self.cells[(i, j)] = cell
+
+        # bicubic polynomial of each requested property, Horner's method in v then u
+        values = []
+        for key in keys:
+            a = cell[self.index[key]]
+            a0 = ((a[3] * v + a[2]) * v + a[1]) * v + a[0]
+            a1 = ((a[7] * v + a[6]) * v + a[5]) * v + a[4]
+            a2 = ((a[11] * v + a[10]) * v + a[9]) * v + a[8]
+            a3 = ((a[15] * v + a[14]) * v + a[13]) * v + a[12]
+            values.append(((a3 * u + a2) * u + a1) * u + a0)
+        return values
+
+    def props_array(self, keys, T, p):
+        """
+        :param keys: CoolProp output names, see PROPERTIES
+        :param T: temperatures [K], NumPy array
+        :param p: pressures [MPa], NumPy array
+        :return: list of NumPy arrays, in the order of keys
+        """
+        T, p = np.broadcast_arrays(np.asarray(T, dtype=float), np.asarray(p, dtype=float))
+        inside = (self.T_min <= T) & (T <= self.T_max) & (self.p_min <= p) & (p <= self.p_max)
+
+        u = (np.where(inside, T, self.T_min) - self.T_min) / self.dT
+        v = (np.log(np.where(inside, p, self.p_min)) - self.x_min) / self.dx
+        i = np.minimum(u.astype(int), self.n_T - 2)
+        j = np.minimum(v.astype(int), self.n_p - 2)
+        values = bicubic_eval(self.coeffs, i, j, u - i, v - j)
+
+        results = [values[self.index[key]] for key in keys]
+        if not inside.all():
+            outside = self.fallback.props_array(keys, T[~inside], p[~inside])
+            for result, value in zip(results, outside):
+                result[~inside] = value
+        return results
+
+
+def bicubic_coeffs(f):
+    """
+    bicubic coefficients from values on a uniform grid, derivatives estimated by finite differences
+    :param f: values, shape (n_props, n_x, n_y)
+    :return: coefficients a, shape (n_x - 1, n_y - 1, n_props, 4, 4), f(x, y) = sum(a[m, n] * x ** m * y ** n)
+    """
+    # derivatives with respect to grid index
+    fx = np.gradient(f, axis=1, edge_order=2)
+    fy = np.gradient(f, axis=2, edge_order=2)
+    fxy = np.gradient(fx, axis=2, edge_order=2)
+
+    # corner values of each cell, shape (n_props, n_x - 1, n_y - 1, 4, 4)
+    def corners(g):
+        return np.stack([np.stack([g[:, :-1, :-1], g[:, :-1, 1:]], axis=-1),
+                         np.stack([g[:, 1:, :-1], g[:, 1:, 1:]], axis=-1)], axis=-2)
+
+    F = np.concatenate([np.concatenate([corners(f), corners(fy)], axis=-1),
+                        np.concatenate([corners(fx), corners(fxy)], axis=-1)], axis=-2)
+    M = np.array([[1.0, 0.0, 0.0, 0.0],
+                  [0.0, 0.0, 1.0, 0.0],
+                  [-3.0, 3.0, -2.0, -1.0],
+                  [2.0, -2.0, 1.0, 1.0]])
+    a = M @ F @ M.T
+    return np.ascontiguousarray(np.moveaxis(a, 0, 2))
+
+
+def bicubic_eval(coeffs, i, j, u, v):
+    """
+    evaluates bicubic coefficients
+    :param coeffs: coefficients from bicubic_coeffs
+    :param i: cell index, first axis (NumPy array)
+    :param j: cell index, second axis (NumPy array)
+    :param u: position within cell [0-1], first axis
+    :param v: position within cell [0-1], second axis
+    :return: values, shape (n_props,) + shape of i
+    """
+    i, j, u, v = np.broadcast_arrays(i, j, u, v)
+    U = np.stack([np.ones(u.shape), u, u ** 2, u ** 3], axis=-1)
+    V = np.stack([np.ones(v.shape), v, v ** 2, v ** 3], axis=-1)
+    a = coeffs[i, j]  # shape i.shape + (n_props, 4, 4)
+    values = np.einsum('...m,...kmn,...n->...k', U, a, V)
+    return np.moveaxis(values, -1, 0)
+
+
+def air_property_backend(name='HEOS', tol=1e-3):
+    """
+    creates the air property backend used by CAES
+    :param name: 'HEOS', 'TTSE&HEOS' or 'BICUBIC&HEOS' (CoolProp AbstractState), 'PropsSI' (CoolProp high-level
+                 interface) or 'table' (TabulatedAir)
+    :param tol: allowable relative error of the table [-]
+    :return: backend with props(keys, T, p) and props_array(keys, T, p) methods
+    """
+    if name == 'table':
+        return TabulatedAir(tol=tol)
+    elif name == 'PropsSI':
+        return PropsSIAir()
+    else:
+        return AbstractStateProps(name, 'Air')
@@ -1,4 +1,6 @@
-from math import pi, exp, log
+import numpy as np
+from math import exp, pi
+from .help_functions import is_array
 
 
 def pipe_heat_transfer_subsurface(r_pipe=0.205, t_pipe=0.01, t_cement=0.0347, r_rock=10.0, depth=1402.35,
@@ -31,7 +33,7 @@ def pipe_heat_transfer_subsurface(r_pipe=0.205, t_pipe=0.01, t_cement=0.0347, r_
 
     :param debug: debug option [Boolean]
 
-    :return delta_T: temperature change [K]
+    :return delta_T: temperature change [K], NumPy array if any input is an array (inputs are broadcast together)
     """
 
     # Reynolds number
@@ -40,7 +42,9 @@ def pipe_heat_transfer_subsurface(r_pipe=0.205, t_pipe=0.01, t_cement=0.0347, r_
     Re = rho * (r_pipe * 2.0) * abs(U) / mu  # [-]
 
     # Nusselt Number
-    if Ts > Tm:  # heating
+    if is_array(Ts, Tm):
+        n = np.where(np.asarray(Ts) > Tm, 0.4, 0.3)  # heating (0.4) or cooling (0.3)
+    elif Ts > Tm:  # heating
         n = 0.4
     else:  # cooling
         n = 0.3
@@ -55,14 +59,14 @@ def pipe_heat_transfer_subsurface(r_pipe=0.205, t_pipe=0.01, t_cement=0.0347, r_
     r3 = r_pipe + t_pipe + t_cement
     r4 = r_pipe + t_pipe + t_cement + r_rock
     R_pipe_conv = 1 / (2 * pi * r1 * depth * h)
-    R_pipe_cond = log(r2 / r1) / (2 * pi * depth * k_pipe)
-    R_cement_cond = log(r3 / r2) / (2 * pi * depth * k_cement)
-    R_rock_cond = log(r4 / r3) / (2 * pi * depth * k_rock)
+    R_pipe_cond = np.log(r2 / r1) / (2 * pi * depth * k_pipe)
+    R_cement_cond = np.log(r3 / r2) / (2 * pi * depth * k_cement)
+    R_rock_cond = np.log(r4 / r3) / (2 * pi * depth * k_rock)
     R_tot = R_pipe_conv + R_pipe_cond + R_cement_cond + R_rock_cond
     UA = 1 / R_tot
 
     # heat transfer
-    Tm_out = Ts - (Ts - Tm) * exp(-UA / (abs(m_dot) * cp))
+    Tm_out = Ts - (Ts - Tm) * np.exp(-UA / (abs(m_dot) * cp))
     delta_T = Tm - Tm_out
 
     if debug:
@@ -115,7 +119,7 @@ def pipe_heat_transfer_ocean(r_pipe=0.205, depth=25.0, t_pipe=0.01, t_insul=0.02
 
     :param debug: debug option [Boolean]
 
-    :return delta_T: temperature change [K]
+    :return delta_T: temperature change [K], NumPy array if any input is an array (inputs are broadcast together)
     """
 
     # Reynolds number
@@ -124,7 +128,9 @@ def pipe_heat_transfer_ocean(r_pipe=0.205, depth=25.0, t_pipe=0.01, t_insul=0.02
     Re = rho * (r_pipe * 2.0) * abs(U) / mu  # [-]
 
     # Nusselt Number
-    if Ts > Tm:  # heating
+    if is_array(Ts, Tm):
+        n = np.where(np.asarray(Ts) > Tm, 0.4, 0.3)  # heating (0.4) or cooling (0.3)
+    elif Ts > Tm:  # heating
         n = 0.4
     else:  # cooling
         n = 0.3
@@ -138,14 +144,14 @@ def pipe_heat_transfer_ocean(r_pipe=0.205, depth=25.0, t_pipe=0.01, t_insul=0.02
     r2 = r_pipe + t_pipe
     r3 = r_pipe + t_pipe + t_insul
     R_pipe_conv = 1 / (2 * pi * r1 * depth * h)
-    R_pipe_cond = log(r2 / r1) / (2 * pi * depth * k_pipe)
-    R_insul_cond = log(r3 / r2) / (2 * pi * depth * k_insul)
+    R_pipe_cond = np.log(r2 / r1) / (2 * pi * depth * k_pipe)
+    R_insul_cond = np.log(r3 / r2) / (2 * pi * depth * k_insul)
     R_ocean_conv = 1 / (2 * pi * r3 * depth * h_ocean)
     R_tot = R_pipe_conv + R_pipe_cond + R_insul_cond + R_ocean_conv
     UA = 1 / R_tot
 
     # heat transfer
-    Tm_out = Ts - (Ts - Tm) * exp(-UA / (abs(m_dot) * cp))
+    Tm_out = Ts - (Ts - Tm) * np.exp(-UA / (abs(m_dot) * cp))
     delta_T = Tm - Tm_out
 
     if debug:
@@ -164,3 +170,128 @@ def pipe_heat_transfer_ocean(r_pipe=0.205, depth=25.0, t_pipe=0.01, t_insul=0.02
         print('delta_T [K] :' + str(delta_T))
 
     return delta_T
+
+
+def select(value, systems=None):
+    # entries of a per-system geometry array for the selected systems (boolean mask), scalars are returned unchanged
+    if systems is None or np.ndim(value) == 0:
+        return value
+    return value[systems]
+
+
+class WellboreThermalModel:
+    """
+    pipe heat transfer of a wellbore (ocean section then subsurface section for injection, reverse for withdrawl), as in
+    pipe_heat_transfer_ocean and pipe_heat_transfer_subsurface
+
+    The conduction resistances and the ocean convection resistance only depend on the geometry and conductivities, they
+    are calculated once. Only the convection inside the pipe is evaluated for each flow state. Geometry inputs may be
+    NumPy arrays (one entry per system) when used with delta_T_array.
+    """
+
+    def __init__(self, r_pipe=0.205, t_pipe=0.01, t_cement=0.0347, r_rock=10.0, depth=1402.35, T_sub=295.0,
+                 depth_ocean=25.0, t_insul=0.02, T_ocean=290.0, k_pipe=56.7, k_cement=0.72, k_rock=2.90, k_insul=0.46,
+                 h_ocean=3000.0):
+        """
+        :param r_pipe: pipe radius [m]
+        :param t_pipe: pipe wall thickness [m]
+        :param t_cement: concrete thickness [m]
+        :param r_rock: distance to "infinity" where formation temperature, T_sub, is fixed [m]
+        :param depth: well depth / subsurface pipe length [m]
+        :param T_sub: formation fixed temperature [K]
+        :param depth_ocean: pipe length exposed to ocean [m]
+        :param t_insul: insulation thickness [m]
+        :param T_ocean: ocean fixed temperature [K]
+        :param k_pipe: thermal conductivity of pipe [W/m-K]
+        :param k_cement: thermal conductivity of cement [W/m-K]
+        :param k_rock: thermal conductivity of rock/formation [W/m-K]
+        :param k_insul: thermal conductivity of insulation (just through ocean) [W/m-K]
+        :param h_ocean: free convection of ocean water [W/m^2-K]
+        """
+        self.d = 2.0 * r_pipe  # pipe diameter [m]
+        self.A = pi / 4.0 * self.d ** 2.0  # pipe cross-sectional area [m^2]
+        self.T_sub = T_sub  # [K]
+        self.T_ocean = T_ocean  # [K]
+
+        # subsurface thermal resistances [K/W], convection inside the pipe is R_sub_conv / h
+        r1 = r_pipe
+        r2 = r_pipe + t_pipe
+        r3 = r_pipe + t_pipe + t_cement
+        r4 = r_pipe + t_pipe + t_cement + r_rock
+        self.R_sub_conv = 1 / (2 * pi * r1 * depth)
+        self.R_pipe_cond_sub = np.log(r2 / r1) / (2 * pi * depth * k_pipe)
+        self.R_cement_cond = np.log(r3 / r2) / (2 * pi * depth * k_cement)
+        self.R_rock_cond = np.log(r4 / r3) / (2 * pi * depth * k_rock)
+        self.R_sub = self.R_pipe_cond_sub + self.R_cement_cond + self.R_rock_cond
+
+        # ocean thermal resistances [K/W], convection inside the pipe is R_ocean_conv_pipe / h
+        r3 = r_pipe + t_pipe + t_insul
+        self.R_ocean_conv_pipe = 1 / (2 * pi * r1 * depth_ocean)
+        self.R_pipe_cond_ocean = np.log(r2 / r1) / (2 * pi * depth_ocean * k_pipe)
+        self.R_insul_cond = np.log(r3 / r2) / (2 * pi * depth_ocean * k_insul)
+        self.R_ocean_conv = 1 / (2 * pi * r3 * depth_ocean * h_ocean)
+        self.R_ocean = self.R_pipe_cond_ocean + self.R_insul_cond + self.R_ocean_conv
+
+    def h_factor(self, m_dot, k_air, rho, mu, systems=None):
+        # heat transfer coefficient inside the pipe without the Prandtl number term, h = h_factor * Pr ** n [W/m^2*K]
+        A = select(self.A, systems)
+        d = select(self.d, systems)
+        U = m_dot / (rho * A)  # velocity [m/s]
+        Re = rho * d * abs(U) / mu  # [-]
+        return 0.023 * Re ** (4.0 / 5.0) * k_air / d
+
+    def delta_T(self, Tm=325.0, m_dot=325.0, k_air=0.033242, rho=169.11, mu=21.492e-6, Pr=0.79960, cp=1236.8):
+        """
+        temperature change through the wellbore for a single flow state, properties of air are evaluated at the inlet
+        :param Tm: air temperature entering pipe [K]
+        :param m_dot: mass flow [kg/s], (+) injection, (-) withdrawl
+        :param k_air: thermal conductivity of air [W/m-K]
+        :param rho: air density [kg/m^3]
+        :param mu: air viscosity [Pa*s]
+        :param Pr: air Prandtl number [-]
+        :param cp: air heat capacity [J/kg-K]
+        :return dT_ocean: temperature change in ocean section [K]
+        :return dT_sub: temperature change in subsurface section [K]
+        """
+        h = self.h_factor(m_dot, k_air, rho, mu)
+        mcp = abs(m_dot) * cp
+
+        def section(Tm, Ts, R_conv, R_cond):
+            n = 0.4 if Ts > Tm else 0.3  # heating (0.4) or cooling (0.3)
+            UA = 1 / (R_conv / (h * Pr ** n) + R_cond)
+            return (Tm - Ts) * (1.0 - exp(-UA / mcp))
+
+        if m_dot > 0.0:  # injection, ocean then subsurface
+            dT_ocean = section(Tm, self.T_ocean, self.R_ocean_conv_pipe, self.R_ocean)
+            dT_sub = section(Tm - dT_ocean, self.T_sub, self.R_sub_conv, self.R_sub)
+        else:  # withdrawl, subsurface then ocean
+            dT_sub = section(Tm, self.T_sub, self.R_sub_conv, self.R_sub)
+            dT_ocean = section(Tm - dT_sub, self.T_ocean, self.R_ocean_conv_pipe, self.R_ocean)
+        return dT_ocean, dT_sub
+
+    def delta_T_array(self, Tm, m_dot, k_air, rho, mu, Pr, cp, injection=True, systems=None):
+        """
+        delta_T for NumPy arrays of flow states (broadcast together with the geometry), all flows in one direction
+        :param injection: True - injection (ocean then subsurface), False - withdrawl (subsurface then ocean)
+        :param systems: if the geometry is an array (one entry per system), the entries the flow states belong to
+                        (boolean mask), None - all
+        :return dT_ocean: temperature change in ocean section [K]
+        :return dT_sub: temperature change in subsurface section [K]
+        """
+        h = self.h_factor(m_dot, k_air, rho, mu, systems)
+        mcp = np.abs(m_dot) * cp
+
+        def section(Tm, Ts, R_conv, R_cond):
+            n = np.where(np.asarray(Ts) > Tm, 0.4, 0.3)  # heating (0.4) or cooling (0.3)
+            UA = 1 / (R_conv / (h * Pr ** n) + R_cond)
+            return (Tm - Ts) * (1.0 - np.exp(-UA / mcp))
+
+        ocean = (select(self.T_ocean, systems), select(self.R_ocean_conv_pipe, systems), select(self.R_ocean, systems))
+        sub = (select(self.T_sub, systems), select(self.R_sub_conv, systems), select(self.R_sub, systems))
+        if injection:
+            dT_ocean = section(Tm, *ocean)
+            dT_sub = section(Tm - dT_ocean, *sub)
+        else:
+            dT_sub = section(Tm, *sub)
+            dT_ocean = section(Tm - dT_sub, *ocean)
+        return dT_ocean, dT_sub
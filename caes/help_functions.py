@@ -24,3 +24,13 @@ def create_dir(project_path=os.path.normcase('.'), folder='results'):
         os.mkdir(dir)
 
     return dir
+
+
+# -----------------------------------------------------
+# Check if any value is an array (NumPy array, pandas Series or list), without NumPy for speed with scalars
+# -----------------------------------------------------
+def is_array(*values):
+    for value in values:
+        if hasattr(value, '__len__'):
+            return True
+    return False
@@ -1,9 +1,17 @@
-import pandas as pd
-from caes import CAES
+import numpy as np
+from .caes import CAES, compiled_attribute
+from .stages import stage_inputs, interstage_dp, design_pressure_ratios, stage_keys, Stages
 import CoolProp.CoolProp as CP  # http://www.coolprop.org/coolprop/HighLevelAPI.html#propssi-function
 
 
 class ICAES(CAES):
+    # attributes that the stage constants depend on, in addition to R and M
+    cp = compiled_attribute('cp')
+    gamma = compiled_attribute('gamma')
+    c_water = compiled_attribute('c_water')
+    v_water = compiled_attribute('v_water')
+    eta_pump = compiled_attribute('eta_pump')
+
     def get_default_inputs():
         inputs = CAES.get_default_inputs()
 
@@ -21,6 +29,7 @@ class ICAES(CAES):
         inputs['ML_cmp3'] = 1.0
         inputs['ML_cmp4'] = -1  # <0 - unused
         inputs['ML_cmp5'] = -1  # <0 - unused
+        inputs['ML_cmp'] = []  # any number of stages, overrides ML_cmp1 to ML_cmp5 if not empty
 
         # expansion - mass loading per stage
         inputs['ML_exp1'] = 1.0
@@ -28,18 +37,21 @@ class ICAES(CAES):
         inputs['ML_exp3'] = 2.0
         inputs['ML_exp4'] = -1  # <0 - unused
         inputs['ML_exp5'] = -1  # <0 - unused
+        inputs['ML_exp'] = []  # any number of stages, overrides ML_exp1 to ML_exp5 if not empty
 
         # compression - pressure drop inbetween stages (fraction)
         inputs['delta_p_cmp12'] = 0.01  # between stages 1 and 2
         inputs['delta_p_cmp23'] = 0.01
         inputs['delta_p_cmp34'] = -1  # <0 - unused
         inputs['delta_p_cmp45'] = -1  # <0 - unused
+        inputs['delta_p_cmp'] = []  # one entry between each pair of stages, overrides delta_p_cmp12 to 45 if not empty
 
         # compression - pressure drop inbetween stages (fraction)
         inputs['delta_p_exp12'] = 0.01  # between stages 1 and 2
         inputs['delta_p_exp23'] = 0.01
         inputs['delta_p_exp34'] = -1  # <0 - unused
         inputs['delta_p_exp45'] = -1  # <0 - unused
+        inputs['delta_p_exp'] = []  # one entry between each pair of stages, overrides delta_p_exp12 to 45 if not empty
 
         return inputs
 
@@ -71,119 +83,28 @@ class ICAES(CAES):
         # -------------------
         # compression
         # -------------------
-        # number of compression stages, stops at first 0, negative or non-integer entry for ML
-        # need to make sure the number of ML entries matches the number of stages
-        if inputs['ML_cmp1'] < 0:
-            self.n_stages_cmp = 1
-            self.ML_cmp = [1]
-
-        elif inputs['ML_cmp2'] < 0:
-            self.n_stages_cmp = 1
-            self.ML_cmp = [inputs['ML_cmp1']]
-
-        elif inputs['ML_cmp3'] < 0:
-            self.n_stages_cmp = 2
-            self.ML_cmp = [inputs['ML_cmp1'], inputs['ML_cmp2']]
-
-        elif inputs['ML_cmp4'] < 0:
-            self.n_stages_cmp = 3
-            self.ML_cmp = [inputs['ML_cmp1'], inputs['ML_cmp2'], inputs['ML_cmp3']]
-
-        elif inputs['ML_cmp5'] < 0:
-            self.n_stages_cmp = 4
-            self.ML_cmp = [inputs['ML_cmp1'], inputs['ML_cmp2'], inputs['ML_cmp3'],
-                           inputs['ML_cmp4']]
-        else:
-            self.n_stages_cmp = 5
-            self.ML_cmp = [inputs['ML_cmp1'], inputs['ML_cmp2'], inputs['ML_cmp3'],
-                           inputs['ML_cmp4'], inputs['ML_cmp5']]
-
-        # interstage pressure drop
-        self.delta_p_cmp = []
-        for i in range(self.n_stages_cmp):
-            if i == 0 and inputs['delta_p_cmp12'] > 0.0 and self.include_interstage_dp:
-                self.delta_p_cmp.append(inputs['delta_p_cmp12'])
-            elif i == 1 and inputs['delta_p_cmp23'] > 0.0 and self.include_interstage_dp:
-                self.delta_p_cmp.append(inputs['delta_p_cmp23'])
-            elif i == 2 and inputs['delta_p_cmp34'] > 0.0 and self.include_interstage_dp:
-                self.delta_p_cmp.append(inputs['delta_p_cmp34'])
-            elif i == 3 and inputs['delta_p_cmp45'] > 0.0 and self.include_interstage_dp:
-                self.delta_p_cmp.append(inputs['delta_p_cmp45'])
-            else:
-                self.delta_p_cmp.append(0.0)
-
-        # multiplier for total pressure ratio to account for interstage pressure drops
-        PR_delta_p_cmp = 1.0
-        for delta_p in self.delta_p_cmp:
-            PR_delta_p_cmp = PR_delta_p_cmp * (1.0 + delta_p)
-
-        # equally divide pressure ratio for each stage, if pressure ratios are unspecified
-        if len(inputs['PR_cmp']) == self.n_stages_cmp:
-            self.PR_cmp = inputs['PR_cmp']
-        else:
-            self.PR_cmp = []
-            PR_equal = (self.p_machine_design / self.p_atm * PR_delta_p_cmp) ** (1. / self.n_stages_cmp)
-            for n in range(self.n_stages_cmp):
-                self.PR_cmp.append(PR_equal)
+        # mass loading of each stage, from ML_cmp (any number of stages) or ML_cmp1, ML_cmp2, ... (stops at the first
+        # negative entry)
+        self.ML_cmp = stage_inputs(inputs, 'ML_cmp')
+        self.n_stages_cmp = len(self.ML_cmp)
+        self.delta_p_cmp = interstage_dp(inputs, 'delta_p_cmp', self.n_stages_cmp, self.include_interstage_dp)
+        self.PR_cmp = design_pressure_ratios(inputs['PR_cmp'], self.p_machine_design / self.p_atm, self.delta_p_cmp)
+        self.PR_cmp_cum = np.cumprod(self.PR_cmp)  # up to the outlet of each stage, used for PR_type 'free'
 
         # -------------------
         # expansion
         # -------------------
-        if inputs['ML_exp1'] < 0:
-            self.n_stages_exp = 1
-            self.ML_exp = [1]
-
-        elif inputs['ML_exp2'] < 0:
-            self.n_stages_exp = 1
-            self.ML_exp = [inputs['ML_exp1']]
-
-        elif inputs['ML_exp3'] < 0:
-            self.n_stages_exp = 2
-            self.ML_exp = [inputs['ML_exp1'], inputs['ML_exp2']]
-
-        elif inputs['ML_exp4'] < 0:
-            self.n_stages_exp = 3
-            self.ML_exp = [inputs['ML_exp1'], inputs['ML_exp2'], inputs['ML_exp3']]
-
-        elif inputs['ML_exp5'] < 0:
-            self.n_stages_exp = 4
-            self.ML_exp = [inputs['ML_exp1'], inputs['ML_exp2'], inputs['ML_exp3'],
-                           inputs['ML_exp4']]
-        else:
-            self.n_stages_exp = 5
-            self.ML_exp = [inputs['ML_exp1'], inputs['ML_exp2'], inputs['ML_exp3'],
-                           inputs['ML_exp4'], inputs['ML_exp5']]
-
-        # interstage pressure drop
-        self.delta_p_exp = []
-        for i in range(self.n_stages_exp):
-            if i == 0 and inputs['delta_p_exp12'] > 0.0 and self.include_interstage_dp:
-                self.delta_p_exp.append(inputs['delta_p_exp12'])
-            elif i == 1 and inputs['delta_p_exp23'] > 0.0 and self.include_interstage_dp:
-                self.delta_p_exp.append(inputs['delta_p_exp23'])
-            elif i == 2 and inputs['delta_p_exp34'] > 0.0 and self.include_interstage_dp:
-                self.delta_p_exp.append(inputs['delta_p_exp34'])
-            elif i == 3 and inputs['delta_p_exp45'] > 0.0 and self.include_interstage_dp:
-                self.delta_p_exp.append(inputs['delta_p_exp45'])
-            else:
-                self.delta_p_exp.append(0.0)
-
-        # multiplier for total pressure ratio to account for interstage pressure drops
-        PR_delta_p_exp = 1.0
-        for delta_p in self.delta_p_exp:
-            PR_delta_p_exp = PR_delta_p_exp * (1.0 + delta_p)
-
-        # equally divide pressure ratio for each stage, if pressure ratios are unspecified
-        if len(inputs['PR_exp']) == self.n_stages_exp:
-            self.PR_exp = inputs['PR_exp']
-        else:
-            self.PR_exp = []
-            PR_equal = (self.p_machine_design / self.p_atm * PR_delta_p_exp) ** (1. / self.n_stages_exp)
-            for n in range(self.n_stages_exp):
-                self.PR_exp.append(PR_equal)
+        self.ML_exp = stage_inputs(inputs, 'ML_exp')
+        self.n_stages_exp = len(self.ML_exp)
+        self.delta_p_exp = interstage_dp(inputs, 'delta_p_exp', self.n_stages_exp, self.include_interstage_dp)
+        self.PR_exp = design_pressure_ratios(inputs['PR_exp'], self.p_machine_design / self.p_atm, self.delta_p_exp)
+        self.PR_exp_cum = np.cumprod(self.PR_exp)  # up to the outlet of each stage
+
+        # per-stage constants
+        self.recompile()
 
         # -------------------
-        # recreate dataframe to store data (with additional entries)
+        # recreate time series to store data (with additional entries)
         # -------------------
         additional_time_series = ['cmp_p_in', 'cmp_T_in', 'exp_p_in', 'exp_T_in']
         stage_entries = ['ML', 'n', 'w_stg', 'w_pmp']
@@ -199,7 +120,42 @@ class ICAES(CAES):
             for entry in state_entries:
                 additional_time_series.append('exp_' + entry + str(n))
         self.attributes_time_series = self.attributes_time_series + additional_time_series
-        self.data = pd.DataFrame(columns=self.attributes_time_series)
+        self.stage_keys_cmp = stage_keys('cmp_', stage_entries + state_entries, self.n_stages_cmp)
+        self.stage_keys_exp = stage_keys('exp_', stage_entries + state_entries, self.n_stages_exp)
+        self.init_data()
+
+    def stage_constants(self):
+        """
+        polytropic index, exponent (n - 1) / n, work per kelvin and pump work per pressure difference of each stage,
+        computed once rather than every time step. recomputed by recompile if an attribute they depend on is changed
+        after initialization
+        """
+        cd = self.c_water  # water - heat capacity [kJ/kg-K]
+        self.n_cmp = self.gamma * (1 + self.ML_cmp * (cd / self.cp)) / (1 + self.gamma * self.ML_cmp * (cd / self.cp))
+        self.n_exp = self.gamma * (1 + self.ML_exp * (cd / self.cp)) / (1 + self.gamma * self.ML_exp * (cd / self.cp))
+        self.exponent_cmp = (self.n_cmp - 1.0) / self.n_cmp
+        self.exponent_exp = (self.n_exp - 1.0) / self.n_exp
+        self.work_factor_cmp = self.R / self.M / self.exponent_cmp  # [kJ/kg-K]
+        self.work_factor_exp = self.R / self.M / self.exponent_exp  # [kJ/kg-K]
+        self.pump_factor_cmp = self.ML_cmp * self.v_water / self.eta_pump / 1000.0  # [kJ/kg-MPa]
+        self.pump_factor_exp = self.ML_exp * self.v_water / self.eta_pump / 1000.0  # [kJ/kg-MPa]
+        self.stages_cmp = Stages(self.PR_cmp, self.delta_p_cmp, self.exponent_cmp, self.work_factor_cmp)
+        self.stages_exp = Stages(self.PR_exp, self.delta_p_exp, self.exponent_exp, self.work_factor_exp, expansion=True)
+        # as Python lists/floats for the time step, the recorded constants are ML then n (see stage_keys)
+        self.pump_factors_cmp = self.pump_factor_cmp.tolist()
+        self.pump_factors_exp = self.pump_factor_exp.tolist()
+        self.stage_values_cmp = self.ML_cmp.tolist() + self.n_cmp.tolist()
+        self.stage_values_exp = self.ML_exp.tolist() + self.n_exp.tolist()
+        self.water_per_kg_cmp = float(self.ML_cmp.sum())  # [kg/kg air]
+        self.water_per_kg_exp = float(self.ML_exp.sum())  # [kg/kg air]
+
+    def recompile(self):
+        """
+        recomputes the system and stage constants
+        :return: self.constants
+        """
+        self.stage_constants()
+        return CAES.recompile(self)
 
     def charge_perf(self, s):
         """
@@ -209,80 +165,47 @@ class ICAES(CAES):
         designed to be updated for each caes architecture
 
         :param:
-            s - pandas series containing performance of current time step and error messages
+            s - row (dict) containing performance of current time step and error messages
         :return:
             s - updated including (at a minimum) the following entries:
                 work_per_kg - compression work [kJ/kg air]
                 water_per_kg - water use [kg water /kg air ]
                 fuel_per_kg - fuel use [kg fuel /kg air]
         """
-        # --------------
-        # fluid properties
-        # --------------
-        cd = self.c_water  # water - heat capacity [kJ/kg-K]
-        cp = self.cp  # air - constant pressure specific heat [kJ/kg-K]
-        gamma = self.gamma  # air - heat capacity ratio [-]
-
         # --------------
         # determine stage pressure ratios
         # --------------
+        stages = self.stages_cmp
         if self.PR_type == 'fixed':
-            PRs = self.PR_cmp
+            PRs = stages.PR
         else:  # self.PR_type == 'free'
-            PRs = []
-            p_in_stg = s['p0']
-            p_out_final = s['p1']
-            for PR_design in self.PR_cmp:
-                if p_in_stg * PR_design >= p_out_final:
-                    PR = p_out_final / p_in_stg
-                else:
-                    PR = PR_design
-                PRs.append(PR)
-                # update for next stage
-                p_in_stg = p_in_stg * PR
+            PRs = stages.free_pressure_ratios(s['p0'], s['p1'])
 
         # --------------
         # inlet
         # --------------
-        p_in = s['p0']
-        T_in = s['T0']
-        s['cmp_p_in'] = p_in
-        s['cmp_T_in'] = T_in
+        s['cmp_p_in'] = s['p0']
+        s['cmp_T_in'] = s['T0']
 
         # --------------
-        # calculate performance for each stage
+        # calculate performance for all stages
         # --------------
-        for n_stg, ML, PR, delta_p in zip(range(self.n_stages_cmp), self.ML_cmp, PRs, self.delta_p_cmp):
-            p_out = p_in * PR
-            n = gamma * (1 + ML * (cd / cp)) / (1 + gamma * ML * (cd / cp))  # polytropic exponent
-            w_stg = n * self.R / self.M * T_in / (n - 1.0) * (1.0 - (p_out / p_in) ** ((n - 1) / n))  # [kJ/kg]
-            w_pmp = - ML * self.v_water * (p_out - self.p_water) / self.eta_pump / 1000.0  # [kJ/kg]
-            T_out = T_in * (p_out / p_in) ** ((n - 1.0) / n)  # outlet temperature
-
-            # -------------
-            # store results
-            # -------------
-            # required
-            s['work_per_kg'] = s['work_per_kg'] + w_stg + w_pmp  # [kJ/kg]
-            s['water_per_kg'] = s['water_per_kg'] + ML  # [kg/kg air]
-            s['fuel_per_kg'] = 0.0  # near-isothermal - no heat input [kg/kg air]
-            # additional
-            s['cmp_p_in' + str(n_stg)] = p_in
-            s['cmp_T_in' + str(n_stg)] = T_in
-            s['cmp_ML' + str(n_stg)] = ML
-            s['cmp_n' + str(n_stg)] = n
-            s['cmp_w_stg' + str(n_stg)] = w_stg
-            s['cmp_w_pmp' + str(n_stg)] = w_pmp
-            s['cmp_p_out' + str(n_stg)] = p_out
-            s['cmp_T_out' + str(n_stg)] = T_out
-
-            # -------------
-            # inlet state for next stage
-            # -------------
-            p_in = p_out * (1.0 - delta_p)
-            T_in = T_out
-
-        s['T1'] = T_out
+        p_in, T_in, p_out, T_out = stages.states(s['p0'], s['T0'], PRs)
+        w_stg = stages.work(T_in, T_out)  # [kJ/kg]
+        w_pmp = [- factor * (p - self.p_water) for factor, p in zip(self.pump_factors_cmp, p_out)]  # [kJ/kg]
+
+        # -------------
+        # store results
+        # -------------
+        # required
+        s['work_per_kg'] = s['work_per_kg'] + sum(w_stg) + sum(w_pmp)  # [kJ/kg]
+        s['water_per_kg'] = s['water_per_kg'] + self.water_per_kg_cmp  # [kg/kg air]
+        s['fuel_per_kg'] = 0.0  # near-isothermal - no heat input [kg/kg air]
+        # additional
+        self.recorder.set_block(s, self.stage_keys_cmp,
+                                self.stage_values_cmp + w_stg + w_pmp + p_in + T_in + p_out + T_out)
+
+        s['T1'] = T_out[-1]
         return s
 
     def discharge_perf(self, s):
@@ -292,7 +215,7 @@ class ICAES(CAES):
         designed to be updated for each caes architecture
 
         :param:
-            s - pandas series containing performance of current time step and error messages
+            s - row (dict) containing performance of current time step and error messages
         :return:
             s - updated including (at a minimum) the following entries:
                 work_per_kg - compression work [kJ/kg air]
@@ -300,30 +223,14 @@ class ICAES(CAES):
                 fuel_per_kg - fuel use [kg fuel /kg air]
         """
 
-        # --------------
-        # fluid properties
-        # --------------
-        cd = self.c_water  # water - heat capacity [kJ/kg-K]
-        cp = self.cp  # air - constant pressure specific heat [kJ/kg-K]
-        gamma = self.gamma  # air - heat capacity ratio [-]
-
         # --------------
         # determine stage pressure ratios
         # --------------
+        stages = self.stages_exp
         if self.PR_type == 'fixed':
-            PRs = self.PR_exp
+            PRs = stages.PR
         else:  # self.PR_type == 'free'
-            PRs = []
-            p_in_stg = s['p1']
-            p_out_final = s['p0']
-            for PR_design in self.PR_exp:
-                if p_in_stg / PR_design <= p_out_final:
-                    PR = p_in_stg / p_out_final
-                else:
-                    PR = PR_design
-                PRs.append(PR)
-                # update for next stage
-                p_in_stg = p_in_stg / PR
+            PRs = stages.free_pressure_ratios(s['p1'], s['p0'])
 
         # --------------
         # inlet
@@ -331,9 +238,7 @@ class ICAES(CAES):
         if self.PR_type == 'free':
             p_in = s['p1']
         else:  # if self.PR_type == 'fixed':
-            p_in = s['p0']
-            for PR_design in self.PR_exp:
-                p_in = p_in * PR_design  # back-calculate throttle pressure
+            p_in = s['p0'] * self.PR_exp_cum[-1]  # back-calculate throttle pressure
             if p_in / 1000.0 > self.p_store:
                 print('expander inlet pressure > storage pressure')
         T_in = s['T1']
@@ -341,37 +246,22 @@ class ICAES(CAES):
         s['exp_T_in'] = T_in
 
         # --------------
-        # calculate performance for each stage
+        # calculate performance for all stages
         # --------------
-        for n_stg, ML, PR, delta_p in zip(range(self.n_stages_exp), self.ML_exp, PRs, self.delta_p_exp):
-            p_out = p_in / PR
-            n = gamma * (1 + ML * (cd / cp)) / (1 + gamma * ML * (cd / cp))  # polytropic exponent
-            w_stg = n * self.R / self.M * T_in / (n - 1.0) * (1.0 - (p_out / p_in) ** ((n - 1) / n))  # [kJ/kg]
-            w_pmp = - ML * self.v_water * (p_out - self.p_water) / self.eta_pump / 1000.0  # [kJ/kg]
-            T_out = T_in * (p_out / p_in) ** ((n - 1.0) / n)  # outlet temperature
-
-            # -------------
-            # store results
-            # -------------
-            # required
-            s['work_per_kg'] = s['work_per_kg'] + w_stg + w_pmp  # [kJ/kg]
-            s['water_per_kg'] = s['water_per_kg'] + ML  # [kg/kg air]
-            s['fuel_per_kg'] = 0.0  # near-isothermal - no heat input [kg/kg air]
-            # additional
-            s['exp_p_in' + str(n_stg)] = p_in
-            s['exp_T_in' + str(n_stg)] = T_in
-            s['exp_ML' + str(n_stg)] = ML
-            s['exp_n' + str(n_stg)] = n
-            s['exp_w_stg' + str(n_stg)] = w_stg
-            s['exp_w_pmp' + str(n_stg)] = w_pmp
-            s['exp_p_out' + str(n_stg)] = p_out
-            s['exp_T_out' + str(n_stg)] = T_out
-
-            # -------------
-            # inlet state for next stage
-            # -------------
-            p_in = p_out * (1.0 - delta_p)
-            T_in = T_out
-
-        s['T0'] = T_out
+        p_in, T_in, p_out, T_out = stages.states(p_in, T_in, PRs)
+        w_stg = stages.work(T_in, T_out)  # [kJ/kg]
+        w_pmp = [- factor * (p - self.p_water) for factor, p in zip(self.pump_factors_exp, p_out)]  # [kJ/kg]
+
+        # -------------
+        # store results
+        # -------------
+        # required
+        s['work_per_kg'] = s['work_per_kg'] + sum(w_stg) + sum(w_pmp)  # [kJ/kg]
+        s['water_per_kg'] = s['water_per_kg'] + self.water_per_kg_exp  # [kg/kg air]
+        s['fuel_per_kg'] = 0.0  # near-isothermal - no heat input [kg/kg air]
+        # additional
+        self.recorder.set_block(s, self.stage_keys_exp,
+                                self.stage_values_exp + w_stg + w_pmp + p_in + T_in + p_out + T_out)
+
+        s['T0'] = T_out[-1]
         return s
@@ -1,5 +1,6 @@
-import pandas as pd
-from caes import CAES
+import numpy as np
+from .caes import CAES
+from .stages import stage_inputs, interstage_dp, design_pressure_ratios, stage_keys, Stages
 import CoolProp.CoolProp as CP  # http://www.coolprop.org/coolprop/HighLevelAPI.html#propssi-function
 
 
@@ -18,6 +19,7 @@ class ICAES2(CAES):
         inputs['n_cmp3'] = -1
         inputs['n_cmp4'] = -1  # <0 - unused
         inputs['n_cmp5'] = -1  # <0 - unused
+        inputs['n_cmp'] = []  # any number of stages, overrides n_cmp1 to n_cmp5 if not empty
 
         # expansion - polytropic index per stage
         inputs['n_exp1'] = 1.1
@@ -25,18 +27,21 @@ class ICAES2(CAES):
         inputs['n_exp3'] = -1
         inputs['n_exp4'] = -1
         inputs['n_exp5'] = -1
+        inputs['n_exp'] = []  # any number of stages, overrides n_exp1 to n_exp5 if not empty
 
         # compression - pressure drop inbetween stages (fraction)
         inputs['delta_p_cmp12'] = 0.0  # between stages 1 and 2
         inputs['delta_p_cmp23'] = -1  # <0 - unused
         inputs['delta_p_cmp34'] = -1
         inputs['delta_p_cmp45'] = -1
+        inputs['delta_p_cmp'] = []  # one entry between each pair of stages, overrides delta_p_cmp12 to 45 if not empty
 
         # compression - pressure drop inbetween stages (fraction)
         inputs['delta_p_exp12'] = 0.0  # between stages 1 and 2
         inputs['delta_p_exp23'] = -1  # <0 - unused
         inputs['delta_p_exp34'] = -1
         inputs['delta_p_exp45'] = -1
+        inputs['delta_p_exp'] = []  # one entry between each pair of stages, overrides delta_p_exp12 to 45 if not empty
 
         return inputs
 
@@ -65,119 +70,28 @@ class ICAES2(CAES):
         # -------------------
         # compression
         # -------------------
-        # number of compression stages, stops at first 0, negative or non-integer entry for n
-        # need to make sure the number of n entries matches the number of stages
-        if inputs['n_cmp1'] < 0:
-            self.n_stages_cmp = 1
-            self.n_cmp = [1]
-
-        elif inputs['n_cmp2'] < 0:
-            self.n_stages_cmp = 1
-            self.n_cmp = [inputs['n_cmp1']]
-
-        elif inputs['n_cmp3'] < 0:
-            self.n_stages_cmp = 2
-            self.n_cmp = [inputs['n_cmp1'], inputs['n_cmp2']]
-
-        elif inputs['n_cmp4'] < 0:
-            self.n_stages_cmp = 3
-            self.n_cmp = [inputs['n_cmp1'], inputs['n_cmp2'], inputs['n_cmp3']]
-
-        elif inputs['n_cmp5'] < 0:
-            self.n_stages_cmp = 4
-            self.n_cmp = [inputs['n_cmp1'], inputs['n_cmp2'], inputs['n_cmp3'],
-                          inputs['n_cmp4']]
-        else:
-            self.n_stages_cmp = 5
-            self.n_cmp = [inputs['n_cmp1'], inputs['n_cmp2'], inputs['n_cmp3'],
-                          inputs['n_cmp4'], inputs['n_cmp5']]
-
-        # interstage pressure drop
-        self.delta_p_cmp = []
-        for i in range(self.n_stages_cmp):
-            if i == 0 and inputs['delta_p_cmp12'] > 0.0 and self.include_interstage_dp:
-                self.delta_p_cmp.append(inputs['delta_p_cmp12'])
-            elif i == 1 and inputs['delta_p_cmp23'] > 0.0 and self.include_interstage_dp:
-                self.delta_p_cmp.append(inputs['delta_p_cmp23'])
-            elif i == 2 and inputs['delta_p_cmp34'] > 0.0 and self.include_interstage_dp:
-                self.delta_p_cmp.append(inputs['delta_p_cmp34'])
-            elif i == 3 and inputs['delta_p_cmp45'] > 0.0 and self.include_interstage_dp:
-                self.delta_p_cmp.append(inputs['delta_p_cmp45'])
-            else:
-                self.delta_p_cmp.append(0.0)
-
-        # multiplier for total pressure ratio to account for interstage pressure drops
-        PR_delta_p_cmp = 1.0
-        for delta_p in self.delta_p_cmp:
-            PR_delta_p_cmp = PR_delta_p_cmp * (1.0 + delta_p)
-
-        # equally divide pressure ratio for each stage, if pressure ratios are unspecified
-        if len(inputs['PR_cmp']) == self.n_stages_cmp:
-            self.PR_cmp = inputs['PR_cmp']
-        else:
-            self.PR_cmp = []
-            PR_equal = (self.p_machine_design / self.p_atm * PR_delta_p_cmp) ** (1. / self.n_stages_cmp)
-            for n in range(self.n_stages_cmp):
-                self.PR_cmp.append(PR_equal)
+        # polytropic index of each stage, from n_cmp (any number of stages) or n_cmp1, n_cmp2, ... (stops at the first
+        # negative entry)
+        self.n_cmp = stage_inputs(inputs, 'n_cmp')
+        self.n_stages_cmp = len(self.n_cmp)
+        self.delta_p_cmp = interstage_dp(inputs, 'delta_p_cmp', self.n_stages_cmp, self.include_interstage_dp)
+        self.PR_cmp = design_pressure_ratios(inputs['PR_cmp'], self.p_machine_design / self.p_atm, self.delta_p_cmp)
+        self.PR_cmp_cum = np.cumprod(self.PR_cmp)  # up to the outlet of each stage, used for PR_type 'free'
 
         # -------------------
         # expansion
         # -------------------
-        if inputs['n_exp1'] < 0:
-            self.n_stages_exp = 1
-            self.n_exp = [1]
-
-        elif inputs['n_exp2'] < 0:
-            self.n_stages_exp = 1
-            self.n_exp = [inputs['n_exp1']]
-
-        elif inputs['N_exp3'] < 0:
-            self.n_stages_exp = 2
-            self.n_exp = [inputs['n_exp1'], inputs['n_exp2']]
-
-        elif inputs['n_exp4'] < 0:
-            self.n_stages_exp = 3
-            self.n_exp = [inputs['n_exp1'], inputs['n_exp2'], inputs['n_exp3']]
-
-        elif inputs['n_exp5'] < 0:
-            self.n_stages_exp = 4
-            self.n_exp = [inputs['n_exp1'], inputs['n_exp2'], inputs['n_exp3'],
-                          inputs['n_exp4']]
-        else:
-            self.n_stages_exp = 5
-            self.n_exp = [inputs['n_exp1'], inputs['n_exp2'], inputs['n_exp3'],
-                          inputs['n_exp4'], inputs['n_exp5']]
-
-        # interstage pressure drop
-        self.delta_p_exp = []
-        for i in range(self.n_stages_exp):
-            if i == 0 and inputs['delta_p_exp12'] > 0.0 and self.include_interstage_dp:
-                self.delta_p_exp.append(inputs['delta_p_exp12'])
-            elif i == 1 and inputs['delta_p_exp23'] > 0.0 and self.include_interstage_dp:
-                self.delta_p_exp.append(inputs['delta_p_exp23'])
-            elif i == 2 and inputs['delta_p_exp34'] > 0.0 and self.include_interstage_dp:
-                self.delta_p_exp.append(inputs['delta_p_exp34'])
-            elif i == 3 and inputs['delta_p_exp45'] > 0.0 and self.include_interstage_dp:
-                self.delta_p_exp.append(inputs['delta_p_exp45'])
-            else:
-                self.delta_p_exp.append(0.0)
-
-        # multiplier for total pressure ratio to account for interstage pressure drops
-        PR_delta_p_exp = 1.0
-        for delta_p in self.delta_p_exp:
-            PR_delta_p_exp = PR_delta_p_exp * (1.0 + delta_p)
-
-        # equally divide pressure ratio for each stage, if pressure ratios are unspecified
-        if len(inputs['PR_exp']) == self.n_stages_exp:
-            self.PR_exp = inputs['PR_exp']
-        else:
-            self.PR_exp = []
-            PR_equal = (self.p_machine_design / self.p_atm * PR_delta_p_exp) ** (1. / self.n_stages_exp)
-            for n in range(self.n_stages_exp):
-                self.PR_exp.append(PR_equal)
+        self.n_exp = stage_inputs(inputs, 'n_exp')
+        self.n_stages_exp = len(self.n_exp)
+        self.delta_p_exp = interstage_dp(inputs, 'delta_p_exp', self.n_stages_exp, self.include_interstage_dp)
+        self.PR_exp = design_pressure_ratios(inputs['PR_exp'], self.p_machine_design / self.p_atm, self.delta_p_exp)
+        self.PR_exp_cum = np.cumprod(self.PR_exp)  # up to the outlet of each stage
+
+        # per-stage constants
+        self.recompile()
 
         # -------------------
-        # recreate dataframe to store data (with additional entries)
+        # recreate time series to store data (with additional entries)
         # -------------------
         additional_time_series = ['cmp_p_in', 'cmp_T_in', 'exp_p_in', 'exp_T_in']
         stage_entries = ['n', 'w_stg']
@@ -193,7 +107,31 @@ class ICAES2(CAES):
             for entry in state_entries:
                 additional_time_series.append('exp_' + entry + str(n))
         self.attributes_time_series = self.attributes_time_series + additional_time_series
-        self.data = pd.DataFrame(columns=self.attributes_time_series)
+        self.stage_keys_cmp = stage_keys('cmp_', stage_entries + state_entries, self.n_stages_cmp)
+        self.stage_keys_exp = stage_keys('exp_', stage_entries + state_entries, self.n_stages_exp)
+        self.init_data()
+
+    def stage_constants(self):
+        """
+        exponent (n - 1) / n and work per kelvin of each stage, computed once rather than every time step. recomputed by
+        recompile if R or M is changed after initialization
+        """
+        self.exponent_cmp = (self.n_cmp - 1.0) / self.n_cmp
+        self.exponent_exp = (self.n_exp - 1.0) / self.n_exp
+        self.work_factor_cmp = self.R / self.M / self.exponent_cmp  # [kJ/kg-K]
+        self.work_factor_exp = self.R / self.M / self.exponent_exp  # [kJ/kg-K]
+        self.stages_cmp = Stages(self.PR_cmp, self.delta_p_cmp, self.exponent_cmp, self.work_factor_cmp)
+        self.stages_exp = Stages(self.PR_exp, self.delta_p_exp, self.exponent_exp, self.work_factor_exp, expansion=True)
+        self.stage_values_cmp = self.n_cmp.tolist()  # recorded constants, see stage_keys
+        self.stage_values_exp = self.n_exp.tolist()
+
+    def recompile(self):
+        """
+        recomputes the system and stage constants
+        :return: self.constants
+        """
+        self.stage_constants()
+        return CAES.recompile(self)
 
     def charge_perf(self, s):
         """
@@ -203,75 +141,44 @@ class ICAES2(CAES):
         designed to be updated for each caes architecture
 
         :param:
-            s - pandas series containing performance of current time step and error messages
+            s - row (dict) containing performance of current time step and error messages
         :return:
             s - updated including (at a minimum) the following entries:
                 work_per_kg - compression work [kJ/kg air]
                 water_per_kg - water use [kg water /kg air ]
                 fuel_per_kg - fuel use [kg fuel /kg air]
         """
-        # --------------
-        # fluid properties
-        # --------------
-        cd = self.c_water  # water - heat capacity [kJ/kg-K]
-        cp = self.cp  # air - constant pressure specific heat [kJ/kg-K]
-        gamma = self.gamma  # air - heat capacity ratio [-]
-
         # --------------
         # determine stage pressure ratios
         # --------------
+        stages = self.stages_cmp
         if self.PR_type == 'fixed':
-            PRs = self.PR_cmp
+            PRs = stages.PR
         else:  # self.PR_type == 'free'
-            PRs = []
-            p_in_stg = s['p0']
-            p_out_final = s['p1']
-            for PR_design in self.PR_cmp:
-                if p_in_stg * PR_design >= p_out_final:
-                    PR = p_out_final / p_in_stg
-                else:
-                    PR = PR_design
-                PRs.append(PR)
-                # update for next stage
-                p_in_stg = p_in_stg * PR
+            PRs = stages.free_pressure_ratios(s['p0'], s['p1'])
 
         # --------------
         # inlet
         # --------------
-        p_in = s['p0']
-        T_in = s['T0']
-        s['cmp_p_in'] = p_in
-        s['cmp_T_in'] = T_in
+        s['cmp_p_in'] = s['p0']
+        s['cmp_T_in'] = s['T0']
 
         # --------------
-        # calculate performance for each stage
+        # calculate performance for all stages
         # --------------
-        for n_stg, n, PR, delta_p in zip(range(self.n_stages_cmp), self.n_cmp, PRs, self.delta_p_cmp):
-            p_out = p_in * PR
-            w_stg = n * self.R / self.M * T_in / (n - 1.0) * (1.0 - (p_out / p_in) ** ((n - 1) / n))  # [kJ/kg]
-            T_out = T_in * (p_out / p_in) ** ((n - 1.0) / n)  # outlet temperature
-
-            # -------------
-            # store results
-            # -------------
-            # required
-            s['work_per_kg'] = s['work_per_kg'] + w_stg  # [kJ/kg]
-            s['fuel_per_kg'] = 0.0  # near-isothermal - no heat input [kg/kg air]
-            # additional
-            s['cmp_p_in' + str(n_stg)] = p_in
-            s['cmp_T_in' + str(n_stg)] = T_in
-            s['cmp_n' + str(n_stg)] = n
-            s['cmp_w_stg' + str(n_stg)] = w_stg
-            s['cmp_p_out' + str(n_stg)] = p_out
-            s['cmp_T_out' + str(n_stg)] = T_out
-
-            # -------------
-            # inlet state for next stage
-            # -------------
-            p_in = p_out * (1.0 - delta_p)
-            T_in = T_out
-
-        s['T1'] = T_out
+        p_in, T_in, p_out, T_out = stages.states(s['p0'], s['T0'], PRs)
+        w_stg = stages.work(T_in, T_out)  # [kJ/kg]
+
+        # -------------
+        # store results
+        # -------------
+        # required
+        s['work_per_kg'] = s['work_per_kg'] + sum(w_stg)  # [kJ/kg]
+        s['fuel_per_kg'] = 0.0  # near-isothermal - no heat input [kg/kg air]
+        # additional
+        self.recorder.set_block(s, self.stage_keys_cmp, self.stage_values_cmp + w_stg + p_in + T_in + p_out + T_out)
+
+        s['T1'] = T_out[-1]
         return s
 
     def discharge_perf(self, s):
@@ -281,7 +188,7 @@ class ICAES2(CAES):
         designed to be updated for each caes architecture
 
         :param:
-            s - pandas series containing performance of current time step and error messages
+            s - row (dict) containing performance of current time step and error messages
         :return:
             s - updated including (at a minimum) the following entries:
                 work_per_kg - compression work [kJ/kg air]
@@ -289,30 +196,14 @@ class ICAES2(CAES):
                 fuel_per_kg - fuel use [kg fuel /kg air]
         """
 
-        # --------------
-        # fluid properties
-        # --------------
-        cd = self.c_water  # water - heat capacity [kJ/kg-K]
-        cp = self.cp  # air - constant pressure specific heat [kJ/kg-K]
-        gamma = self.gamma  # air - heat capacity ratio [-]
-
         # --------------
         # determine stage pressure ratios
         # --------------
+        stages = self.stages_exp
         if self.PR_type == 'fixed':
-            PRs = self.PR_exp
+            PRs = stages.PR
         else:  # self.PR_type == 'free'
-            PRs = []
-            p_in_stg = s['p1']
-            p_out_final = s['p0']
-            for PR_design in self.PR_exp:
-                if p_in_stg / PR_design <= p_out_final:
-                    PR = p_in_stg / p_out_final
-                else:
-                    PR = PR_design
-                PRs.append(PR)
-                # update for next stage
-                p_in_stg = p_in_stg / PR
+            PRs = stages.free_pressure_ratios(s['p1'], s['p0'])
 
         # --------------
         # inlet
@@ -320,9 +211,7 @@ class ICAES2(CAES):
         if self.PR_type == 'free':
             p_in = s['p1']
         else:  # if self.PR_type == 'fixed':
-            p_in = s['p0']
-            for PR_design in self.PR_exp:
-                p_in = p_in * PR_design  # back-calculate throttle pressure
+            p_in = s['p0'] * self.PR_exp_cum[-1]  # back-calculate throttle pressure
             if p_in / 1000.0 > self.p_store:
                 print('expander inlet pressure > storage pressure')
         T_in = s['T1']
@@ -330,32 +219,19 @@ class ICAES2(CAES):
         s['exp_T_in'] = T_in
 
         # --------------
-        # calculate performance for each stage
+        # calculate performance for all stages
         # --------------
-        for n_stg, n, PR, delta_p in zip(range(self.n_stages_exp), self.n_exp, PRs, self.delta_p_exp):
-            p_out = p_in / PR
-            w_stg = n * self.R / self.M * T_in / (n - 1.0) * (1.0 - (p_out / p_in) ** ((n - 1) / n))  # [kJ/kg]
-            T_out = T_in * (p_out / p_in) ** ((n - 1.0) / n)  # outlet temperature
-
-            # -------------
-            # store results
-            # -------------
-            # required
-            s['work_per_kg'] = s['work_per_kg'] + w_stg  # [kJ/kg]
-            s['fuel_per_kg'] = 0.0  # near-isothermal - no heat input [kg/kg air]
-            # additional
-            s['exp_p_in' + str(n_stg)] = p_in
-            s['exp_T_in' + str(n_stg)] = T_in
-            s['exp_n' + str(n_stg)] = n
-            s['exp_w_stg' + str(n_stg)] = w_stg
-            s['exp_p_out' + str(n_stg)] = p_out
-            s['exp_T_out' + str(n_stg)] = T_out
-
-            # -------------
-            # inlet state for next stage
-            # -------------
-            p_in = p_out * (1.0 - delta_p)
-            T_in = T_out
-
-        s['T0'] = T_out
+        p_in, T_in, p_out, T_out = stages.states(p_in, T_in, PRs)
+        w_stg = stages.work(T_in, T_out)  # [kJ/kg]
+
+        # -------------
+        # store results
+        # -------------
+        # required
+        s['work_per_kg'] = s['work_per_kg'] + sum(w_stg)  # [kJ/kg]
+        s['fuel_per_kg'] = 0.0  # near-isothermal - no heat input [kg/kg air]
+        # additional
+        self.recorder.set_block(s, self.stage_keys_exp, self.stage_values_exp + w_stg + p_in + T_in + p_out + T_out)
+
+        s['T0'] = T_out[-1]
         return s
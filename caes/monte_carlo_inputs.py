@@ -21,66 +21,152 @@ OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
 import pandas as pd
 import numpy as np
+from scipy import stats
+from scipy.stats import qmc
+
+# sampling methods, 'random' - pseudo-random, 'lhs' - Latin hypercube, 'sobol' - scrambled Sobol sequence
+SAMPLING_METHODS = ['random', 'lhs', 'sobol']
 
 
 # =============================================================================#
 # Create MonteCarlo Inputs
 # =============================================================================#
-def monteCarloInputs(filename, sheetname, iterations):
+def monteCarloInputs(filename, sheetname, iterations, method='random', seed=None):
+    """
+    samples the distributions specified in an Excel sheet, see monteCarloSamples
+    :param filename: Excel file
+    :param sheetname: sheet, one row per parameter
+    :param iterations: number of samples
+    :param method: 'random', 'lhs' or 'sobol'
+    :param seed: seed of the random number generator, None - not repeatable
+    :return: DataFrame, one row per sample
+    """
     # Read Excel with inputs
     df_xls = pd.read_excel(filename, sheet_name=sheetname, index_col=0)
 
+    df = monteCarloSamples(df_xls, iterations, method=method, seed=seed)
+    df.insert(0, 'sheetname', sheetname)
+    return df
+
+
+def monteCarloSamples(df_xls, iterations, method='random', seed=None):
+    """
+    samples the distribution of each parameter
+
+    With method 'lhs' (Latin hypercube) or 'sobol' (scrambled Sobol sequence) the samples of every non-constant
+    parameter are drawn together in the unit hypercube and mapped through the inverse CDF of each distribution, so the
+    distributions are covered evenly with fewer samples. Sobol sequences are balanced when iterations is a power of 2.
+
+    :param df_xls: DataFrame, one row per parameter (index) with columns Distribution and, as required by the
+        distribution, Average, Low, High and Stdev
+        constant ('constant', 'Constant', 'C'): Average
+        uniform ('uniform', 'Uniform', 'U'): Low and High
+        uniform (+/-) 10 % perturbation from average ('uniform_perturb10', 'Uniform_perturb10'): Average
+        normal ('normal', 'Normal', 'N'): Average and Stdev
+        lognormal ('lognormal', 'Lognormal', 'LN'): Average and Stdev of the underlying normal distribution
+        triangle ('triangle', 'Triangle', 'T'): Low, Average (mode) and High
+    :param iterations: number of samples
+    :param method: 'random', 'lhs' or 'sobol'
+    :param seed: seed of the random number generator, None - not repeatable
+    :return: DataFrame, one row per sample, one column per parameter
+    """
+    if method not in SAMPLING_METHODS:
+        print('Warning - sampling method must be ' + ', '.join(SAMPLING_METHODS) + ', random used')
+        method = 'random'
+    rng = np.random.default_rng(seed)
+
     # Create Dataframe to hold inputs
     rows = range(iterations)
-    parameters1 = df_xls.index.values
-    parameters2 = np.append('sheetname', parameters1)
-    df = pd.DataFrame(data=0.0, index=rows, columns=parameters2)
+    parameters = df_xls.index.values
+    df = pd.DataFrame(data=0.0, index=rows, columns=parameters)
+
+    # samples in the unit hypercube, one column per parameter that is not constant
+    sampled = [param for param in parameters if distType(df_xls.loc[param]['Distribution']) not in [None, 'constant']]
+    if method == 'lhs':
+        unit = qmc.LatinHypercube(d=max(len(sampled), 1), seed=rng).random(iterations)
+    elif method == 'sobol':
+        sobol = qmc.Sobol(d=max(len(sampled), 1), scramble=True, seed=rng)
+        m = int(np.log2(iterations))
+        if 2 ** m == iterations:
+            unit = sobol.random_base2(m)
+        else:
+            unit = sobol.random(iterations)
+    else:
+        unit = None
+    if unit is not None:
+        unit = np.clip(unit, 1e-12, 1.0 - 1e-12)  # inverse CDFs of unbounded distributions are infinite at 0 and 1
 
     # Create Inputs
-    for param in parameters1:
-
-        dist_type = df_xls.loc[param]["Distribution"]
+    for param in parameters:
+        row = df_xls.loc[param]
+        dist_type = distType(row['Distribution'])
+        if dist_type is None:
+            continue
+        u = unit[:, sampled.index(param)] if unit is not None and param in sampled else None
 
         # Constants
-        if dist_type == "constant" or dist_type == "Constant" or dist_type == "C":
-            avg = df_xls.loc[param]["Average"]
-            df.loc[:][param] = avg
-
-        # Uniform Distributions - specified low and high values
-        elif dist_type == "uniform" or dist_type == "Uniform" or dist_type == "U":
-            low = df_xls.loc[param]["Low"]
-            high = df_xls.loc[param]["High"]
-            df.loc[:][param] = np.random.uniform(low=low, high=high, size=iterations)
-
-        # Uniform Distributions - (+/-) 10 % perturbation from average
-        elif dist_type == "uniform_perturb10" or dist_type == "Uniform_perturb10":
-            low = 0.9 * df_xls.loc[param]["Average"]
-            high = 1.1 * df_xls.loc[param]["Average"]
-            df.loc[:][param] = np.random.uniform(low=low, high=high, size=iterations)
+        if dist_type == 'constant':
+            df.loc[:, param] = row['Average']
+
+        # Uniform Distributions - specified low and high values, or (+/-) 10 % perturbation from average
+        elif dist_type == 'uniform' or dist_type == 'uniform_perturb10':
+            if dist_type == 'uniform':
+                low = row['Low']
+                high = row['High']
+            else:
+                low = 0.9 * row['Average']
+                high = 1.1 * row['Average']
+            if u is None:
+                df.loc[:, param] = rng.uniform(low=low, high=high, size=iterations)
+            else:
+                df.loc[:, param] = low + u * (high - low)
 
         # Normal Distributions
-        elif dist_type == "normal" or dist_type == "Normal" or dist_type == "N":
-            avg = df_xls.loc[param]["Average"]
-            stdev = df_xls.loc[param]["Stdev"]
-            df.loc[:][param] = np.random.normal(loc=avg, scale=stdev, size=iterations)
+        elif dist_type == 'normal':
+            avg = row['Average']
+            stdev = row['Stdev']
+            if u is None:
+                df.loc[:, param] = rng.normal(loc=avg, scale=stdev, size=iterations)
+            else:
+                df.loc[:, param] = stats.norm.ppf(u, loc=avg, scale=stdev)
 
         # LogNormal Distributions
-        elif dist_type == "lognormal" or dist_type == "Lognormal" or dist_type == "LN":
-            avg = df_xls.loc[param]["Average"]
-            stdev = df_xls.loc[param]["Stdev"]
-            df.loc[:][param] = np.random.lognormal(mean=avg, sigma=stdev, size=iterations)
+        elif dist_type == 'lognormal':
+            avg = row['Average']
+            stdev = row['Stdev']
+            if u is None:
+                df.loc[:, param] = rng.lognormal(mean=avg, sigma=stdev, size=iterations)
+            else:
+                df.loc[:, param] = np.exp(stats.norm.ppf(u, loc=avg, scale=stdev))
 
         # Traingular Distributions
-        elif dist_type == "triangle" or dist_type == "Triangle" or dist_type == "T":
-            left = df_xls.loc[param]["Low"]
-            mode = df_xls.loc[param]["Average"]
-            right = df_xls.loc[param]["High"]
-            df.loc[:][param] = np.random.triangular(left, mode, right, size=iterations)
+        elif dist_type == 'triangle':
+            left = row['Low']
+            mode = row['Average']
+            right = row['High']
+            if u is None:
+                df.loc[:, param] = rng.triangular(left, mode, right, size=iterations)
+            else:
+                df.loc[:, param] = stats.triang.ppf(u, c=(mode - left) / (right - left), loc=left,
+                                                    scale=right - left)
 
-    df.loc[:, 'sheetname'] = sheetname
     return df
 
 
+def distType(name):
+    """
+    :param name: distribution name as written in the Excel sheet
+    :return: 'constant', 'uniform', 'uniform_perturb10', 'normal', 'lognormal', 'triangle' or None (not recognized)
+    """
+    names = {'constant': 'constant', 'Constant': 'constant', 'C': 'constant',
+             'uniform': 'uniform', 'Uniform': 'uniform', 'U': 'uniform',
+             'uniform_perturb10': 'uniform_perturb10', 'Uniform_perturb10': 'uniform_perturb10',
+             'normal': 'normal', 'Normal': 'normal', 'N': 'normal',
+             'lognormal': 'lognormal', 'Lognormal': 'lognormal', 'LN': 'lognormal',
+             'triangle': 'triangle', 'Triangle': 'triangle', 'T': 'triangle'}
+    return names.get(name)
+
+
 # =============================================================================#
 # Use MonteCarlo Inputs to Create Baselines
 # =============================================================================#
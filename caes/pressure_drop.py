@@ -1,4 +1,9 @@
+import numpy as np
 from math import log, log10, pi
+from .help_functions import is_array
+
+# maximum number of Newton iterations for the Colebrook equation
+max_iter_colebrook = 50
 
 
 def aquifer_dp(Q=1, r_f=100.0, r_w=0.25, k=100, mu=0.5, h=40.0, p_f=10.0, T=298.15, Z=1.0):
@@ -10,7 +15,17 @@ def aquifer_dp(Q=1, r_f=100.0, r_w=0.25, k=100, mu=0.5, h=40.0, p_f=10.0, T=298.
     # K - permeability[mD]
     # Mu - viscosity[cP]
     # Z - gas deviation factor[-]
+    accepts NumPy arrays (broadcast together) for any input, a single warning gives the number of elements affected
     """
+    if is_array(Q, r_f, r_w, k, mu, h, p_f, T, Z):
+        quantity = p_f ** 2.0 - Q * mu * T * Z * np.log(r_f / r_w) / (8.834 * 10.0 ** -3.0 * k * h)
+        valid = quantity > 0.0
+        delta_p = np.where(valid, p_f - np.abs(quantity) ** 0.5, 1e12)
+        n_warnings = np.size(valid) - np.count_nonzero(valid)
+        if n_warnings > 0:
+            print('Warning - Very large aquifer pressure drop (' + str(n_warnings) + ' of ' + str(np.size(valid)) + ')')
+        return delta_p
+
     quantity = p_f ** 2.0 - Q * mu * T * Z * log(r_f / r_w) / (8.834 * 10.0 ** -3.0 * k * h)
     if quantity > 0.0:
         delta_p = p_f - quantity ** 0.5
@@ -27,8 +42,12 @@ def friction_coeff(Re=1000.0, epsilon=0.002 * 1e-3, d=1.06):
     :param Re: Reynolds number [-]
     :param epsilon: Pipe roughness [m]
     :param d: Pipe diameter [m]
-    :return f: friction coefficient [-]
+    :return f: friction coefficient [-], NumPy array if any input is an array (see friction_coeff_array)
     """
+    if is_array(Re, epsilon, d):
+        f, iterations = friction_coeff_array(Re=Re, epsilon=epsilon, d=d)
+        return f
+
     if Re == 0.0:
         f = 0.0
     elif Re <= 4000:  # laminar flow
@@ -38,28 +57,73 @@ def friction_coeff(Re=1000.0, epsilon=0.002 * 1e-3, d=1.06):
         # allowable calculation error
         error = 1e-6
 
-        # initial friction factor values
-        f = 0.01  # initial guess
+        # Colebrook equation, g(x) = 0 where x = 1/f^0.5, solved with Newton's method
+        a = (epsilon / d) / 3.7
+        b = 2.51 / Re
 
-        # initial values
-        LHS = 1.0
-        RHS = 0.0
+        # initial value, Swamee-Jain explicit approximation
+        x = -2.0 * log10(a + 5.74 / Re ** 0.9)
 
-        while abs(LHS - RHS) > error:
-            # f_guess = f_calc  # update guess
-            # a =
-            # f_calc = (1 / a) ** 2  # calculate new value
+        for i in range(max_iter_colebrook):
+            g = x + 2.0 * log10(a + b * x)
+            if abs(g) <= error:
+                break
+            x = x - g / (1.0 + 2.0 * b / ((a + b * x) * log(10.0)))
 
-            LHS = 1 / (f ** 0.5)
-            RHS = -2.0 * log10((epsilon / d) / 3.7 + 2.51 / (Re * f ** 0.5))
-            f = (1 / RHS) ** 2  # calculate new value
+        f = 1.0 / x ** 2  # calculate new value
 
     return f
 
 
+def friction_coeff_array(Re=1000.0, epsilon=0.002 * 1e-3, d=1.06, error=1e-6):
+    """
+    friction_coeff for NumPy arrays (broadcast together), all turbulent elements are solved together
+
+    :param Re: Reynolds number [-]
+    :param epsilon: Pipe roughness [m]
+    :param d: Pipe diameter [m]
+    :param error: allowable calculation error, |LHS - RHS| of the Colebrook equation in 1/f^0.5 [-]
+    :return f: friction coefficient [-]
+    :return iterations: number of Newton iterations performed for each element [-]
+    """
+    Re, epsilon, d = np.broadcast_arrays(np.asarray(Re, dtype=float), np.asarray(epsilon, dtype=float),
+                                         np.asarray(d, dtype=float))
+    f = np.zeros(Re.shape)
+    iterations = np.zeros(Re.shape, dtype=int)
+
+    # laminar flow
+    laminar = (Re > 0.0) & (Re <= 4000)
+    f[laminar] = 64.0 / Re[laminar]
+
+    # turbulent flow, Colebrook equation g(x) = 0 where x = 1/f^0.5
+    turbulent = Re > 4000
+    a = (epsilon[turbulent] / d[turbulent]) / 3.7
+    b = 2.51 / Re[turbulent]
+
+    # initial value, Swamee-Jain explicit approximation
+    x = -2.0 * np.log10(a + 5.74 / Re[turbulent] ** 0.9)
+    n = np.zeros(x.shape, dtype=int)
+
+    # Newton's method, only elements that have not converged are updated
+    active = np.arange(x.size)
+    for i in range(max_iter_colebrook):
+        g = x[active] + 2.0 * np.log10(a[active] + b[active] * x[active])
+        unconverged = np.abs(g) > error
+        active = active[unconverged]
+        if active.size == 0:
+            break
+        dg = 1.0 + 2.0 * b[active] / ((a[active] + b[active] * x[active]) * log(10.0))
+        x[active] = x[active] - g[unconverged] / dg
+        n[active] = n[active] + 1
+
+    f[turbulent] = 1.0 / x ** 2
+    iterations[turbulent] = n
+    return f, iterations
+
+
 def pipe_fric_dp(epsilon=0.002 * 1.0e-3, d=1.06, depth=950, m_dot=10.0, rho=172, mu=18.37e-6):
     """
-    Assumes constant density
+    Assumes constant density, accepts NumPy arrays (broadcast together) for any input
     :param epsilon: roughness [m]
     :param d: pipe diameter [m]
     :param depth: well depth / pipe length [m]
@@ -67,37 +131,91 @@ def pipe_fric_dp(epsilon=0.002 * 1.0e-3, d=1.06, depth=950, m_dot=10.0, rho=172,
     :param rho: density [kg/m^3]
     :param mu: viscosity [Pa*s]
     :return delta_p: pressure drop [MPa]
+    :return f: friction coefficient [-]
     """
 
     # gravitational constant
     g = 9.81  # [m/s^2]
 
-    if abs(m_dot) == 0.0:  # no flow
-        delta_p = 0.0
-        f = 0.0
-    else:
-
+    if is_array(epsilon, d, depth, m_dot, rho, mu):
         # velocity
         A = pi / 4.0 * d ** 2.0  # pipe cross-sectional area [m^2]
         U = m_dot / (rho * A)  # velocity [m/s]
 
-        # Reynolds number
-        Re = rho * d * abs(U) / mu
+        # Reynolds number (zero for no flow)
+        Re = rho * d * np.abs(U) / mu
 
-        f = friction_coeff(Re=Re, epsilon=epsilon, d=d)
+        f, iterations = friction_coeff_array(Re=Re, epsilon=epsilon, d=d)
 
-        # head loss
+        # head loss and pressure drop
         h = f * depth / d * U ** 2.0 / (2.0 * g)
-
-        # pressure drop
         delta_p = rho * g * h
 
+    elif abs(m_dot) == 0.0:  # no flow
+        delta_p = 0.0
+        f = 0.0
+    else:
+        A = pi / 4.0 * d ** 2.0  # pipe cross-sectional area [m^2]
+        return pipe_fric_dp_scalar(epsilon, d, A, depth, m_dot, rho, mu)
+
+    return delta_p * 1.0e-6, f  # convert from Pa to MPa
+
+
+def pipe_fric_dp_scalar(epsilon, d, A, depth, m_dot, rho, mu):
+    """
+    pipe_fric_dp for floats and a flow (m_dot != 0), with the pipe cross-sectional area precomputed
+    :param epsilon: roughness [m]
+    :param d: pipe diameter [m]
+    :param A: pipe cross-sectional area [m^2]
+    :param depth: well depth / pipe length [m]
+    :param m_dot: mass flow [kg/s]
+    :param rho: density [kg/m^3]
+    :param mu: viscosity [Pa*s]
+    :return delta_p: pressure drop [MPa]
+    :return f: friction coefficient [-]
+    """
+
+    # gravitational constant
+    g = 9.81  # [m/s^2]
+
+    # velocity
+    U = m_dot / (rho * A)  # velocity [m/s]
+
+    # Reynolds number
+    Re = rho * d * abs(U) / mu
+
+    f = friction_coeff(Re=Re, epsilon=epsilon, d=d)
+
+    # head loss
+    h = f * depth / d * U ** 2.0 / (2.0 * g)
+
+    # pressure drop
+    delta_p = rho * g * h
+
     return delta_p * 1.0e-6, f  # convert from Pa to MPa
 
 
 def pipe_grav_dp(m_dot=10.0, rho=115.0, z=950.0):
     """
 
+    :param m_dot: mass flow [kg/s], (+) injection, (-) withdrawl
+    :param rho: density [kg/m^3]
+    :param z: depth/length [m]
+    :return delta_p: pressure loss [MPa], NumPy array if any input is an array
+    """
+
+    # gravitational constant
+    g = 9.81  # [m/s^2]
+
+    if is_array(m_dot, rho, z):
+        delta_p = np.where(np.asarray(m_dot) < 0.0, rho * g * z, -rho * g * z)  # withdrawl (+), otherwise (-)
+        return delta_p * 1.0e-6  # convert from Pa to MPa
+    return pipe_grav_dp_scalar(m_dot, rho, z)
+
+
+def pipe_grav_dp_scalar(m_dot, rho, z):
+    """
+    pipe_grav_dp for floats
     :param m_dot: mass flow [kg/s], (+) injection, (-) withdrawl
     :param rho: density [kg/m^3]
     :param z: depth/length [m]
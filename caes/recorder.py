@@ -0,0 +1,299 @@
+from operator import itemgetter
+import numpy as np
+import pandas as pd
+
+
+class TimeSeriesRecorder:
+    """
+    Preallocated store for the time series produced by CAES.update
+
+    The declared numeric attributes are held in a single 2D NumPy array (one column per attribute), text attributes
+    and attributes added later in their own arrays. Arrays are sized up front and doubled in length whenever they fill
+    up, so recording a time step never copies the history. Each time step is written into a plain dict, which is
+    stored with a single row assignment when the next row is started or the recorder is read. The pandas DataFrame is
+    only built when it is requested through to_dataframe().
+    """
+
+    def __init__(self, attributes, capacity=100, text_attributes=('error_msg',)):
+        """
+        :param attributes: list of attribute (column) names, in output order
+        :param capacity: number of rows to preallocate [-]
+        :param text_attributes: attributes holding strings rather than floats
+        """
+        self.attributes = list(attributes)
+        self.text_attributes = set(text_attributes)
+        self.capacity = max(int(capacity), 1)
+        self.n_rows = 0
+        self._numeric = [attribute for attribute in self.attributes if attribute not in self.text_attributes]
+        self._text = [attribute for attribute in self.attributes if attribute in self.text_attributes]
+        self._get_numeric = itemgetter(*self._numeric) if len(self._numeric) > 1 else \
+            lambda row: [row[attribute] for attribute in self._numeric]
+        self._defaults = {attribute: '' if attribute in self.text_attributes else 0.0 for attribute in self.attributes}
+        self._fill = {}
+        self._columns = {}
+        self._values = None
+        self._allocate_values(n_old=0)
+        for attribute in self._text:
+            self._allocate(attribute, fill='')
+        self._row = None  # dict of the latest time step, until it is stored
+        self._frame = None  # cached DataFrame, cleared whenever a row is added
+
+    def __len__(self):
+        return self.n_rows
+
+    def _allocate(self, attribute, fill):
+        # text entries are stored as objects, all others as floats
+        if isinstance(fill, str):
+            self._columns[attribute] = np.full(self.capacity, fill, dtype=object)
+        else:
+            self._columns[attribute] = np.full(self.capacity, fill, dtype=float)
+        self._fill[attribute] = fill
+
+    def _allocate_values(self, n_old):
+        # (re)allocate the declared numeric attributes, keeping the first n_old rows, and point their columns at it
+        old = self._values
+        self._values = np.zeros((self.capacity, len(self._numeric)))
+        if old is not None:
+            self._values[:n_old] = old[:n_old]
+        for j, attribute in enumerate(self._numeric):
+            self._columns[attribute] = self._values[:, j]
+            self._fill[attribute] = 0.0
+
+    def _grow(self):
+        # double the capacity of every column, new rows take the column's fill value
+        n_old = self.capacity
+        self.capacity = 2 * n_old
+        self._allocate_values(n_old)
+        for attribute, old in self._columns.items():
+            if attribute in self._defaults and attribute not in self.text_attributes:
+                continue  # in self._values
+            fill = self._fill[attribute]
+            new = np.full(self.capacity, fill, dtype=old.dtype)
+            new[:n_old] = old
+            self._columns[attribute] = new
+
+    def _flush(self):
+        # store the row of the latest time step
+        row = self._row
+        if row is None:
+            return
+        index = self.n_rows - 1
+        self._values[index] = self._get_numeric(row)
+        for attribute in self._text:
+            self._columns[attribute][index] = row[attribute]
+        if len(row) > len(self._defaults):  # entries that were not declared up front
+            for attribute, value in row.items():
+                if attribute not in self._defaults:
+                    if attribute not in self._columns:
+                        self.add_attribute(attribute)
+                    self._columns[attribute][index] = value
+        self._row = None
+
+    def add_attribute(self, attribute):
+        """
+        adds a column that was not declared up front, rows that never set it are reported as NaN (matching the
+        behaviour of appending pandas Series with differing indices)
+        """
+        self.attributes.append(attribute)
+        self._allocate(attribute, fill=np.nan)
+
+    def new_row(self):
+        """
+        starts a new time step
+        :return: dict - stored when the next row is started or the recorder is read, it is not written to afterwards
+        """
+        self._flush()
+        if self.n_rows == self.capacity:
+            self._grow()
+        self._row = dict(self._defaults)
+        self.n_rows = self.n_rows + 1
+        self._frame = None
+        return self._row
+
+    def set_block(self, row, keys, values):
+        """
+        writes several entries of a time step at once
+        :param row: dict of the time step
+        :param keys: attribute names
+        :param values: values, one per key
+        """
+        row.update(zip(keys, values))
+
+    def column(self, attribute):
+        """
+        :param attribute: attribute name
+        :return: NumPy array (view) of the recorded values
+        """
+        self._flush()
+        return self._columns[attribute][:self.n_rows]
+
+    def total(self, attribute):
+        """
+        :param attribute: attribute name
+        :return: sum over all recorded time steps
+        """
+        return self.column(attribute).sum()
+
+    def mean(self, attribute, phase='flow', weights=None):
+        """
+        :param attribute: attribute name
+        :param phase: time steps to average over - 'charge' (m_air > 0), 'discharge' (m_air < 0) or 'flow' (either)
+        :param weights: None - every time step counts equally, otherwise the attribute (e.g. 'm_air') whose absolute
+                        value weights each time step
+        :return: mean over the selected time steps, NaN if there are none (same as pandas)
+        """
+        m_air = self.column('m_air')
+        if phase == 'charge':
+            mask = m_air > 0.0
+        elif phase == 'discharge':
+            mask = m_air < 0.0
+        else:  # phase == 'flow'
+            mask = m_air != 0.0
+        if not mask.any():
+            return np.nan
+        elif weights is None:
+            return self.column(attribute)[mask].mean()
+        else:
+            w = np.abs(self.column(weights)[mask])
+            return np.sum(self.column(attribute)[mask] * w) / np.sum(w)
+
+    def unique(self, attribute):
+        """
+        :param attribute: attribute name
+        :return: set of distinct values recorded
+        """
+        return set(self.column(attribute))
+
+    def to_dataframe(self):
+        """
+        :return: DataFrame of all recorded time steps, cached until the recorder is next written to
+        """
+        if self._frame is None:
+            self._frame = pd.DataFrame({attribute: self.column(attribute).copy() for attribute in self.attributes},
+                                       columns=self.attributes)
+        return self._frame
+
+
+class SummaryRecorder:
+    """
+    Streaming alternative to TimeSeriesRecorder that keeps running sums instead of the per-step history
+
+    Each time step is written into a single reusable row (dict). When the next row is started, the numeric entries are
+    added to running sums kept separately for charge (m_air > 0), discharge (m_air < 0) and idle time steps, and text
+    entries are added to a set of distinct values. Provides the same total/mean/unique interface as
+    TimeSeriesRecorder, which is all that CAES.analyze_performance requires.
+    """
+
+    def __init__(self, attributes, text_attributes=('error_msg',), weights=()):
+        """
+        :param attributes: list of attribute names, entries of each row start at 0.0 (or '' for text attributes)
+        :param text_attributes: attributes holding strings rather than floats
+        :param weights: attributes that mean may weight the time steps by, running sums weighted by each of them are
+                        kept as well
+        """
+        self.attributes = list(attributes)
+        self.text_attributes = set(text_attributes)
+        self.n_rows = 0
+        self._defaults = {attribute: '' if attribute in self.text_attributes else 0.0 for attribute in self.attributes}
+        self._row = dict(self._defaults)
+        self._pending = False  # True if self._row holds a time step that has not been summed yet
+        self._counts = {'charge': 0, 'discharge': 0, 'idle': 0}
+        self._sums = {'charge': {}, 'discharge': {}, 'idle': {}}
+        # weights: phase: running sums weighted by the absolute value of the weights, '' holds the sum of the weights
+        self._weighted_sums = {weights: {'charge': {}, 'discharge': {}, 'idle': {}} for weights in weights}
+        self._unique = {}
+
+    def __len__(self):
+        return self.n_rows
+
+    def _flush(self):
+        # add the pending row to the running sums
+        if not self._pending:
+            return
+        row = self._row
+        if row['m_air'] > 0.0:
+            phase = 'charge'
+        elif row['m_air'] < 0.0:
+            phase = 'discharge'
+        else:
+            phase = 'idle'
+        self._counts[phase] = self._counts[phase] + 1
+        sums = self._sums[phase]
+        for attribute, value in row.items():
+            if isinstance(value, str):
+                self._unique.setdefault(attribute, set()).add(value)
+            else:
+                sums[attribute] = sums.get(attribute, 0.0) + value
+        for weights, weighted_sums in self._weighted_sums.items():
+            w = abs(row[weights])
+            sums = weighted_sums[phase]
+            sums[''] = sums.get('', 0.0) + w
+            for attribute, value in row.items():
+                if not isinstance(value, str):
+                    sums[attribute] = sums.get(attribute, 0.0) + value * w
+        self._pending = False
+
+    def set_block(self, row, keys, values):
+        """
+        writes several numeric entries of a time step at once, same interface as TimeSeriesRecorder.set_block
+        :param row: dict of the time step
+        :param keys: tuple of attribute names
+        :param values: list of values, one per key
+        """
+        row.update(zip(keys, values))
+
+    def new_row(self):
+        """
+        starts a new time step
+        :return: dict - reused for every time step, reset to the default entries
+        """
+        self._flush()
+        self._row.clear()
+        self._row.update(self._defaults)
+        self._pending = True
+        self.n_rows = self.n_rows + 1
+        return self._row
+
+    def total(self, attribute):
+        """
+        :param attribute: attribute name
+        :return: sum over all time steps
+        """
+        self._flush()
+        return sum(self._sums[phase].get(attribute, 0.0) for phase in self._sums)
+
+    def mean(self, attribute, phase='flow', weights=None):
+        """
+        :param attribute: attribute name
+        :param phase: time steps to average over - 'charge' (m_air > 0), 'discharge' (m_air < 0) or 'flow' (either)
+        :param weights: None - every time step counts equally, otherwise the attribute (e.g. 'm_air') whose absolute
+                        value weights each time step, must be one of the weights given at initialization
+        :return: mean over the selected time steps, NaN if there are none (same as pandas)
+        """
+        self._flush()
+        if phase == 'flow':
+            phases = ['charge', 'discharge']
+        else:
+            phases = [phase]
+        count = sum(self._counts[p] for p in phases)
+        if count == 0:
+            return np.nan
+        elif weights is None:
+            return sum(self._sums[p].get(attribute, 0.0) for p in phases) / count
+        elif weights not in self._weighted_sums:
+            raise ValueError('weighted sums are only kept for the weights given at initialization: ' +
+                             str(list(self._weighted_sums)))
+        else:
+            sums = self._weighted_sums[weights]
+            return sum(sums[p].get(attribute, 0.0) for p in phases) / sum(sums[p].get('', 0.0) for p in phases)
+
+    def unique(self, attribute):
+        """
+        :param attribute: attribute name
+        :return: set of distinct values recorded
+        """
+        self._flush()
+        return set(self._unique.get(attribute, set()))
+
+    def to_dataframe(self):
+        raise ValueError("time series are not stored when record = 'summary', use record = 'timeseries'")
@@ -0,0 +1,158 @@
+import os
+import pickle
+import hashlib
+from collections import OrderedDict
+import numpy as np
+from .version import __version__
+
+# inputs that do not change the results of analyze_performance, excluded from the cache key ('record' is included, it
+# can select how single_cycle is solved)
+CACHE_IGNORE = ['debug']
+
+
+def inputs_key(inputs, cls):
+    """
+    canonical hash of a system: the architecture, every entry of inputs (except CACHE_IGNORE) and the package version
+    :param inputs: inputs of cls (Pandas Series or dict)
+    :param cls: CAES architecture
+    :return: hexadecimal string
+    """
+    entries = [cls.__module__ + '.' + cls.__name__, 'caes=' + __version__]
+    for name in sorted(inputs.keys(), key=str):
+        if name in CACHE_IGNORE:
+            continue
+        value = inputs[name]
+        if isinstance(value, (float, np.floating)):
+            value = repr(float(value))  # exact
+        elif isinstance(value, (bool, np.bool_)):
+            value = str(bool(value))
+        elif isinstance(value, (int, np.integer)):
+            value = repr(float(value))  # 1 and 1.0 are the same input
+        entries.append(str(name) + '=' + str(value))
+    return hashlib.sha1('\x1f'.join(entries).encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    results of analyze_performance after a single cycle, keyed by inputs_key
+
+    The most recently used results are kept in memory (up to maxsize). If directory is given, results are also stored
+    on disk, one file per system, and shared between processes and runs. The least recently used files are removed
+    when the directory exceeds max_bytes.
+    """
+
+    def __init__(self, maxsize=1024, directory=None, max_bytes=100e6):
+        """
+        :param maxsize: number of results kept in memory
+        :param directory: directory for the on-disk store, None - memory only
+        :param max_bytes: maximum size of the on-disk store [bytes]
+        """
+        self.maxsize = maxsize
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def get(self, key):
+        """
+        :param key: inputs_key of the system
+        :return: copy of the stored results (Pandas Series), None if not stored
+        """
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits = self.hits + 1
+            return self.memory[key].copy()
+        if self.directory is not None:
+            try:
+                with open(self.path(key), 'rb') as f:
+                    results = pickle.load(f)
+                os.utime(self.path(key))  # mark as recently used
+            except (OSError, EOFError, pickle.UnpicklingError):
+                results = None
+            if results is not None:
+                self.store_memory(key, results)
+                self.hits = self.hits + 1
+                return results.copy()
+        self.misses = self.misses + 1
+        return None
+
+    def put(self, key, results):
+        """
+        stores results
+        :param key: inputs_key of the system
+        :param results: results of analyze_performance (Pandas Series)
+        """
+        results = results.copy()
+        self.store_memory(key, results)
+        if self.directory is not None:
+            tmp = self.path(key) + '.' + str(os.getpid()) + '.tmp'  # write then rename, other processes may read
+            with open(tmp, 'wb') as f:
+                pickle.dump(results, f)
+            os.replace(tmp, self.path(key))
+            self.evict()
+
+    def store_memory(self, key, results):
+        self.memory[key] = results
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+
+    def evict(self):
+        # remove the least recently used files until the on-disk store is within max_bytes
+        files = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pkl'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total = total + stat.st_size
+        files.sort()
+        for mtime, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total = total - size
+
+    def clear(self):
+        """
+        removes all stored results, in memory and on disk
+        """
+        self.memory.clear()
+        if self.directory is not None:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.pkl'):
+                    os.remove(entry.path)
+
+
+# cache used when none is specified, memory only
+default_cache = ResultCache()
+
+
+def cached_performance(inputs, cls, cache=None):
+    """
+    results of a single cycle of cls (single_cycle then analyze_performance), taken from cache if the same system has
+    been evaluated before. Errors raised by the model are not cached.
+    :param inputs: inputs of cls
+    :param cls: CAES architecture
+    :param cache: ResultCache, None - default_cache
+    :return: results - Pandas Series, see analyze_performance
+    """
+    if cache is None:
+        cache = default_cache
+    key = inputs_key(inputs, cls)
+    results = cache.get(key)
+    if results is None:
+        system = cls(inputs=inputs)
+        system.single_cycle()
+        results = system.analyze_performance()
+        cache.put(key, results)
+    return results
@@ -0,0 +1,251 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+from scipy.stats import qmc
+from .icaes2 import ICAES2
+from .batch import ICAES2Batch, UNIFORM_INPUTS
+from . import sweep
+
+
+def parameter_bounds(bounds):
+    """
+    :param bounds: dictionary of name: (low, high), or DataFrame indexed by name with columns Low and High
+    :return names: list of parameter names
+    :return low: NumPy array of lower bounds
+    :return high: NumPy array of upper bounds
+    """
+    if isinstance(bounds, pd.DataFrame):
+        return list(bounds.index), bounds['Low'].to_numpy(dtype=float), bounds['High'].to_numpy(dtype=float)
+    names = list(bounds.keys())
+    low = np.array([bounds[name][0] for name in names], dtype=float)
+    high = np.array([bounds[name][1] for name in names], dtype=float)
+    return names, low, high
+
+
+def scale(unit, bounds):
+    # samples in the unit hypercube to a DataFrame of parameter values
+    names, low, high = parameter_bounds(bounds)
+    return pd.DataFrame(low + unit * (high - low), columns=names)
+
+
+# =============================================================================#
+# Sampling
+# =============================================================================#
+def morris_sample(bounds, trajectories=10, levels=4, seed=None):
+    """
+    Morris one-at-a-time trajectories, each starts at a random point of a grid with levels values per parameter and
+    changes one parameter at a time (in random order) by delta = levels / (2 (levels - 1)) of its range
+    :param bounds: see parameter_bounds
+    :param trajectories: number of trajectories [-]
+    :param levels: number of grid levels [-]
+    :param seed: seed of the random number generator, None - not repeatable
+    :return: DataFrame, trajectories * (parameters + 1) rows, trajectory after trajectory
+    """
+    names, low, high = parameter_bounds(bounds)
+    k = len(names)
+    rng = np.random.default_rng(seed)
+    delta = levels / (2.0 * (levels - 1.0))
+    unit = np.zeros((trajectories, k + 1, k))
+    for t in range(trajectories):
+        x = rng.integers(0, levels, size=k) / (levels - 1.0)
+        unit[t, 0] = x
+        for step, j in enumerate(rng.permutation(k)):
+            if x[j] + delta <= 1.0 and (x[j] - delta < 0.0 or rng.random() < 0.5):
+                x[j] = x[j] + delta
+            else:
+                x[j] = x[j] - delta
+            unit[t, step + 1] = x
+    return scale(unit.reshape(-1, k), bounds)
+
+
+def saltelli_sample(bounds, n=64, seed=None):
+    """
+    Saltelli sampling for Sobol indices, matrices A and B are the two halves of a scrambled Sobol sequence and AB_i is A
+    with parameter i taken from B
+    :param bounds: see parameter_bounds
+    :param n: rows of each matrix, a power of 2 [-]
+    :param seed: seed of the random number generator, None - not repeatable
+    :return: DataFrame, n * (parameters + 2) rows ordered A, B, AB_1, ..., AB_k
+    """
+    names, low, high = parameter_bounds(bounds)
+    k = len(names)
+    base = qmc.Sobol(d=2 * k, scramble=True, seed=seed).random(n)
+    A = base[:, :k]
+    B = base[:, k:]
+    blocks = [A, B]
+    for i in range(k):
+        AB = A.copy()
+        AB[:, i] = B[:, i]
+        blocks.append(AB)
+    return scale(np.vstack(blocks), bounds)
+
+
+# =============================================================================#
+# Model evaluations
+# =============================================================================#
+def evaluate_case(sample, cls=ICAES2, base_inputs=None, integers=()):
+    """
+    single cycle of one sample, failed cases return no results
+    :param sample: Pandas Series of parameter values
+    :param cls: CAES architecture
+    :param base_inputs: dictionary or Pandas Series of inputs that differ from the defaults of cls, None - defaults
+    :param integers: parameters rounded to integers before running
+    :return: results of analyze_performance (Pandas Series)
+    """
+    inputs = cls.get_default_inputs()
+    if base_inputs is not None:
+        for key in base_inputs.keys():
+            inputs[key] = base_inputs[key]
+    for key in sample.index:
+        inputs[key] = round(sample[key]) if key in integers else sample[key]
+    inputs['record'] = 'summary'
+    try:
+        system = cls(inputs=inputs)
+        system.single_cycle()
+        return system.analyze_performance()
+    except Exception:
+        return pd.Series(dtype=float)
+
+
+def evaluate(samples, cls=ICAES2, base_inputs=None, integers=(), engine='batch', n_jobs=None, verbose=False):
+    """
+    runs every sample
+    :param samples: DataFrame, one row per sample, one column per parameter
+    :param cls: CAES architecture
+    :param base_inputs: dictionary or Pandas Series of inputs that differ from the defaults of cls, None - defaults
+    :param integers: parameters rounded to integers before running
+    :param engine: 'batch' - all samples at once with ICAES2Batch, 'sweep' - one system per sample, in parallel with
+        sweep.run. 'sweep' is used if the samples cannot be run with ICAES2Batch (another architecture, or a parameter
+        that sets the model structure)
+    :param n_jobs: number of processes, see sweep.get_n_jobs ('sweep' only)
+    :param verbose: print progress ('sweep' only)
+    :return: DataFrame, results of analyze_performance for each sample (same index as samples)
+    """
+    structure = UNIFORM_INPUTS + ['PR_cmp', 'PR_exp'] + ['n_cmp' + str(i) for i in range(1, 6)] + \
+        ['n_exp' + str(i) for i in range(1, 6)]
+    if engine == 'batch' and (cls is not ICAES2 or any(name in structure for name in samples.columns)):
+        engine = 'sweep'
+
+    if engine == 'batch':
+        inputs = samples.copy()
+        for key in integers:
+            inputs[key] = inputs[key].round()
+        if base_inputs is not None:
+            for key in base_inputs.keys():
+                if key not in inputs.columns and key != 'record':
+                    inputs[key] = [base_inputs[key]] * len(inputs)
+        system = ICAES2Batch(inputs)
+        system.single_cycle()
+        results = system.analyze_performance()
+        # failed cases return no results, as in evaluate_case
+        results.loc[results['errors'] == 'true', results.columns != 'errors'] = np.nan
+        return results
+    else:
+        return sweep.run(evaluate_case, samples, n_jobs=n_jobs, verbose=verbose, cls=cls, base_inputs=base_inputs,
+                         integers=integers)
+
+
+# =============================================================================#
+# Sensitivity indices
+# =============================================================================#
+def morris_indices(bounds, samples, y):
+    """
+    Morris elementary effects, in units of the output per parameter range
+    :param bounds: see parameter_bounds
+    :param samples: DataFrame from morris_sample
+    :param y: output of each sample (NaN for failed cases)
+    :return: DataFrame indexed by parameter, columns mu (mean), mu_star (mean of absolute values) and sigma (standard
+        deviation) of the elementary effects
+    """
+    names, low, high = parameter_bounds(bounds)
+    k = len(names)
+    unit = ((samples[names].to_numpy(dtype=float) - low) / (high - low)).reshape(-1, k + 1, k)
+    y = np.asarray(y, dtype=float).reshape(-1, k + 1)
+    dx = np.diff(unit, axis=1)  # one parameter changes in each step
+    j = np.argmax(np.abs(dx), axis=2)
+    effects = np.full((unit.shape[0], k), np.nan)
+    for t in range(unit.shape[0]):
+        effects[t, j[t]] = np.diff(y[t]) / dx[t, np.arange(k), j[t]]
+    with np.errstate(invalid='ignore'):
+        return pd.DataFrame({'mu': np.nanmean(effects, axis=0),
+                             'mu_star': np.nanmean(np.abs(effects), axis=0),
+                             'sigma': np.nanstd(effects, axis=0, ddof=1)}, index=names)
+
+
+def sobol_indices(bounds, y, resamples=100, confidence=0.95, seed=None):
+    """
+    first order (S1) and total (ST) Sobol indices, estimators of Saltelli et al. (2010). Confidence intervals are
+    estimated by bootstrap
+    :param bounds: see parameter_bounds
+    :param y: output of each sample of saltelli_sample (NaN for failed cases, those rows are not used)
+    :param resamples: number of bootstrap resamples [-]
+    :param confidence: confidence level of the intervals [-]
+    :param seed: seed of the bootstrap, None - not repeatable
+    :return: DataFrame indexed by parameter, columns S1, S1_conf, ST and ST_conf (half-widths of the intervals)
+    """
+    names, low, high = parameter_bounds(bounds)
+    k = len(names)
+    y = np.asarray(y, dtype=float).reshape(k + 2, -1)
+    y = y[:, ~np.isnan(y).any(axis=0)]
+    y = y - np.mean(y[:2])  # centered, reduces the variance of the estimates
+    A = y[0]
+    B = y[1]
+    AB = y[2:]
+
+    def estimate(rows):
+        var = np.var(np.concatenate([A[rows], B[rows]]))
+        S1 = np.mean(B[rows] * (AB[:, rows] - A[rows]), axis=1) / var
+        ST = 0.5 * np.mean((A[rows] - AB[:, rows]) ** 2, axis=1) / var
+        return S1, ST
+
+    n = len(A)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        S1, ST = estimate(np.arange(n))
+        rng = np.random.default_rng(seed)
+        boot = [estimate(rng.integers(0, n, size=n)) for i in range(resamples)]
+    z = stats.norm.ppf(0.5 + confidence / 2.0)
+    return pd.DataFrame({'S1': S1, 'S1_conf': z * np.std([b[0] for b in boot], axis=0, ddof=1),
+                         'ST': ST, 'ST_conf': z * np.std([b[1] for b in boot], axis=0, ddof=1)}, index=names)
+
+
+def combine(indices):
+    # indices of each output side by side, columns '<output>_<index>'
+    return pd.concat([df.add_prefix(output + '_') for output, df in indices.items()], axis=1)
+
+
+def morris(bounds, trajectories=10, levels=4, outputs=('RTE', 'kWh_out'), seed=None, **kwargs):
+    """
+    Morris elementary effects screening
+    :param bounds: see parameter_bounds
+    :param trajectories: number of trajectories, (parameters + 1) runs each [-]
+    :param levels: number of grid levels [-]
+    :param outputs: results of analyze_performance to analyze
+    :param seed: seed of the random number generator, None - not repeatable
+    :param kwargs: passed to evaluate (cls, base_inputs, integers, engine, n_jobs, verbose)
+    :return indices: DataFrame indexed by parameter, morris_indices of each output ('<output>_mu_star', ...)
+    :return results: DataFrame, samples and results of every run
+    """
+    samples = morris_sample(bounds, trajectories, levels, seed)
+    results = evaluate(samples, **kwargs)
+    indices = combine({output: morris_indices(bounds, samples, results[output]) for output in outputs})
+    return indices, pd.concat([samples, results], axis=1)
+
+
+def sobol(bounds, n=64, outputs=('RTE', 'kWh_out'), resamples=100, confidence=0.95, seed=None, **kwargs):
+    """
+    Sobol indices from Saltelli sampling, captures interactions between parameters (ST - S1)
+    :param bounds: see parameter_bounds
+    :param n: base samples, a power of 2, n (parameters + 2) runs [-]
+    :param outputs: results of analyze_performance to analyze
+    :param resamples: number of bootstrap resamples for the confidence intervals [-]
+    :param confidence: confidence level of the intervals [-]
+    :param seed: seed of the random number generator, None - not repeatable
+    :param kwargs: passed to evaluate (cls, base_inputs, integers, engine, n_jobs, verbose)
+    :return indices: DataFrame indexed by parameter, sobol_indices of each output ('<output>_S1', ...)
+    :return results: DataFrame, samples and results of every run
+    """
+    samples = saltelli_sample(bounds, n, seed)
+    results = evaluate(samples, **kwargs)
+    indices = combine({output: sobol_indices(bounds, results[output], resamples, confidence, seed)
+                       for output in outputs})
+    return indices, pd.concat([samples, results], axis=1)
@@ -0,0 +1,281 @@
+import numpy as np
+import pandas as pd
+import time
+from math import exp, log
+from scipy.spatial import cKDTree
+from .icaes2 import ICAES2
+from .result_cache import cached_performance
+
+# site coordinates and formation properties used to find similar sites, permeability is compared on a log scale
+SITE_FEATURES = ['X (m)', 'Y (m)', 'depth_m', 'thickness_m', 'porosity', 'permeability_mD']
+SITE_LOG_FEATURES = ['permeability_mD']
+
+
+def size_system(capacity_MW, duration_hr, inputs, cls=ICAES2, m_dot=10.0, r_f=10.0, tol=1e-6, max_iter=50,
+                cache=None, debug=False):
+    """
+    Sizes the mass flow rate (m_dot) and formation radius (r_f) of a CAES system to deliver the desired power and
+    energy, each guess is evaluated with a full single cycle
+
+    Solves for ln(m_dot) and ln(r_f) with a quasi-Newton (Broyden) method on the log of the power and energy ratios.
+    The Jacobian starts from the approximate scaling (kW ~ m_dot, kWh ~ r_f^2) and is updated after every cycle. Steps
+    are safeguarded by
+        - limiting each step to a factor of max_factor in m_dot and r_f
+        - brackets: kW increases with m_dot and kWh increases with r_f, so each cycle gives a lower or upper bound. A
+          step that leaves a bracket is replaced by bisection (in log space) of the bracket
+        - backtracking: a step to a guess that cannot be evaluated (no discharge) is halved
+
+    :param capacity_MW: desired average discharge power [MW]
+    :param duration_hr: desired discharge duration [hr]
+    :param inputs: inputs of cls (e.g. ICAES2.get_default_inputs()), m_dot and r_f are replaced by the solver
+    :param cls: CAES architecture to size
+    :param m_dot: initial guess of the mass flow rate [kg/s]
+    :param r_f: initial guess of the formation radius [m]
+    :param tol: allowable error, sum of the relative power and energy errors [-]
+    :param max_iter: maximum number of single cycles
+    :param cache: ResultCache to reuse cycles evaluated before (e.g. repeated sizing of the same site), None - no cache
+    :param debug: print each iteration
+    :return: results - Pandas Series, results of analyze_performance at the final guess with the following entries
+        m_dot - mass flow rate [kg/s]
+        r_f - formation radius [m]
+        iterations - number of single cycles performed
+        converged - True if the error is less than tol
+        residual - final error, sum of the relative power and energy errors [-]
+    """
+    # desired performance
+    kW_out = capacity_MW * 1e3
+    kWh_out = capacity_MW * duration_hr * 1e3
+    target = np.array([log(kW_out), log(kWh_out)])
+
+    # only performance results are used, do not store time series
+    inputs = inputs.copy()
+    inputs['record'] = 'summary'
+
+    # solver settings
+    max_factor = 10.0  # largest change in m_dot or r_f per iteration [-]
+    max_step = log(max_factor)
+    max_backtrack = 10
+
+    def evaluate(x):
+        # runs a single cycle for x = [ln(m_dot), ln(r_f)], returns log of actual / desired kW and kWh
+        inputs['m_dot'] = exp(x[0])  # [kg/s]
+        inputs['r_f'] = exp(x[1])  # [m]
+        try:
+            if cache is None:
+                system = cls(inputs=inputs)
+                system.single_cycle()
+                results = system.analyze_performance()
+            else:
+                results = cached_performance(inputs, cls, cache)
+        except (ValueError, ArithmeticError):  # CoolProp or the model could not solve the cycle
+            return None, None
+        actual = np.array([results['kW_out_avg'], results['kWh_out']], dtype=float)
+        if not (np.isfinite(actual).all() and (actual > 0.0).all()):
+            return None, results
+        return np.log(actual) - target, results
+
+    def residual(F):
+        # sum of the relative power and energy errors
+        return float(np.abs(np.exp(F) - 1.0).sum())
+
+    # initial guess, reduce the flow rate until the cycle can be evaluated
+    x = np.array([log(m_dot), log(r_f)])
+    F, results = evaluate(x)
+    count = 1
+    while F is None and count < max_iter:
+        x[0] = x[0] - log(2.0)
+        F, results = evaluate(x)
+        count = count + 1
+
+    # approximate Jacobian of [ln(kW), ln(kWh)] with respect to [ln(m_dot), ln(r_f)]
+    J = np.array([[1.0, 0.0],
+                  [0.0, 2.0]])
+
+    # brackets of [ln(m_dot), ln(r_f)]
+    lower = np.array([-np.inf, -np.inf])
+    upper = np.array([np.inf, np.inf])
+    bisected = [False, False]
+
+    error = residual(F) if F is not None else np.inf
+    while error > tol and count < max_iter and F is not None:
+        if debug:
+            print("\nIteration : " + str(count))
+            print("m_dot       : " + str(round(exp(x[0]), 3)))
+            print("r_f         : " + str(round(exp(x[1]), 3)))
+            print("error       : " + str(error))
+
+        # update brackets, discarding bounds contradicted by the current cycle. Bounds move as the other variable
+        # changes, so the far bound is also discarded if a bisection did not cross the root
+        for i in range(2):
+            if F[i] < 0.0:  # too little power/energy
+                if upper[i] <= x[i] or (bisected[i] and lower[i] < x[i]):
+                    upper[i] = np.inf
+                lower[i] = x[i]
+            else:
+                if lower[i] >= x[i] or (bisected[i] and upper[i] > x[i]):
+                    lower[i] = -np.inf
+                upper[i] = x[i]
+
+        # quasi-Newton step, limited in size
+        try:
+            dx = -np.linalg.solve(J, F)
+        except np.linalg.LinAlgError:
+            dx = -F / np.diag(J)
+        if np.abs(dx).max() > max_step:
+            dx = dx * max_step / np.abs(dx).max()
+
+        # bisect brackets that the step would leave
+        bisected = [False, False]
+        for i in range(2):
+            if not lower[i] < x[i] + dx[i] < upper[i] and np.isfinite(lower[i]) and np.isfinite(upper[i]):
+                dx[i] = 0.5 * (lower[i] + upper[i]) - x[i]
+                bisected[i] = True
+
+        # evaluate step, backtracking if the cycle cannot be evaluated
+        for i in range(max_backtrack):
+            F_new, results_new = evaluate(x + dx)
+            count = count + 1
+            if F_new is not None or count >= max_iter:
+                break
+            dx = 0.5 * dx
+        if F_new is None:
+            break
+
+        # Broyden update of the Jacobian
+        dF = F_new - F
+        if np.dot(dx, dx) > 0.0:
+            J = J + np.outer(dF - J.dot(dx), dx) / np.dot(dx, dx)
+
+        x = x + dx
+        F = F_new
+        results = results_new
+        error = residual(F)
+
+    if results is None:  # no cycle could be evaluated
+        results = pd.Series(dtype=object)
+        results['RTE'] = 0.0
+    converged = bool(error <= tol)
+    if not converged:  # sizing unsuccessful
+        results['errors'] = 'true'
+
+    results['m_dot'] = exp(x[0])
+    results['r_f'] = exp(x[1])
+    results['iterations'] = count
+    results['converged'] = converged
+    results['residual'] = error
+    return results
+
+
+def site_points(sites, features=SITE_FEATURES, log_features=SITE_LOG_FEATURES):
+    """
+    scaled feature vectors of sites, used to measure how similar sites are
+    :param sites: DataFrame, one row per site, columns of features that are missing are ignored
+    :param features: columns to use
+    :param log_features: columns compared on a log scale
+    :return: NumPy array (n_sites, n_features), each feature scaled to unit standard deviation
+    """
+    columns = [feature for feature in features if feature in sites.columns]
+    points = np.zeros((len(sites), len(columns)))
+    for i, column in enumerate(columns):
+        values = sites[column].to_numpy(dtype=float)
+        if column in log_features:
+            values = np.log(np.maximum(values, 1e-12))
+        std = values.std()
+        points[:, i] = (values - values.mean()) / std if std > 0.0 else 0.0
+    return points
+
+
+def locality_order(sites, features=SITE_FEATURES, log_features=SITE_LOG_FEATURES):
+    """
+    orders sites so that similar sites are next to each other (the leaf order of a KD-tree over site_points)
+    :return: NumPy array of positions (0 to n_sites - 1) into sites
+    """
+    if len(sites) == 0:
+        return np.zeros(0, dtype=int)
+    tree = cKDTree(site_points(sites, features, log_features), leafsize=8)
+    return tree.indices
+
+
+def storage_per_area(inputs):
+    """
+    approximate air storage per unit formation area, used to scale r_f between sites
+    :param inputs: inputs of a CAES architecture
+    :return: pore volume per area times operating pressure range [m * MPa]
+    """
+    p_store_range = inputs['safety_factor'] * (inputs['p_frac_grad'] - inputs['p_hydro_grad']) * inputs['depth'] * 1e-3
+    return inputs['h'] * inputs['phi'] * (1.0 - inputs['Slr']) * p_store_range
+
+
+def size_sites(sites, get_inputs, cls=ICAES2, features=SITE_FEATURES, log_features=SITE_LOG_FEATURES, n_neighbors=8,
+               m_dot=10.0, r_f=10.0, debug=False, **kwargs):
+    """
+    Sizes a system at every site, each solve is warm-started from the nearest site that has already been sized
+
+    Sites are processed in locality_order. A KD-tree over site_points is searched for the n_neighbors nearest sites and
+    the converged m_dot and r_f of the closest one that has been sized successfully is used as the initial guess,
+    otherwise the guess from the previously sized site (or m_dot and r_f) is used. The r_f guess is scaled by the
+    ratio of storage_per_area of the two sites.
+
+    :param sites: DataFrame, one row per site, with columns capacity_MW, duration_hr and the entries used by get_inputs
+    :param get_inputs: function of a site (row of sites), returns the inputs of cls
+    :param cls: CAES architecture to size
+    :param features: columns used to find similar sites, see site_points
+    :param log_features: columns compared on a log scale
+    :param n_neighbors: number of nearest sites searched for a seed
+    :param m_dot: initial guess of the mass flow rate if no site has been sized yet [kg/s]
+    :param r_f: initial guess of the formation radius if no site has been sized yet [m]
+    :param debug: print each iteration
+    :param kwargs: passed to size_system (e.g. tol, max_iter)
+    :return: DataFrame, results of size_system for each site (same index as sites) with the additional entries
+        solve_time - time to size the site [s]
+        seed_site - index of the site used as initial guess (NaN if none)
+    """
+    points = site_points(sites, features, log_features)
+    order = locality_order(sites, features, log_features)
+    tree = cKDTree(points, leafsize=8) if len(sites) > 0 else None
+    n_neighbors = min(n_neighbors, len(sites))
+
+    # converged m_dot and r_f of each site, NaN until sized
+    solved = np.full((len(sites), 2), np.nan)
+    # sites with different capacity or duration cannot be used as seeds
+    targets = sites[['capacity_MW', 'duration_hr']].to_numpy(dtype=float)
+
+    # storage per unit formation area of each site, [m_dot, r_f, storage] of the last site sized per target
+    storage = np.full(len(sites), np.nan)
+    seed_previous = {}
+
+    output = [None] * len(sites)
+    for position in order:
+        start = time.time()
+        site = sites.iloc[position]
+        inputs = get_inputs(site)
+        storage[position] = storage_per_area(inputs)
+        target = (targets[position, 0], targets[position, 1])
+
+        # nearest sized site with the same capacity and duration
+        seed_site = np.nan
+        seed = seed_previous.get(target, (m_dot, r_f, np.nan))
+        if n_neighbors > 1:
+            distances, neighbors = tree.query(points[position], k=n_neighbors)
+            for neighbor in neighbors:
+                if not np.isnan(solved[neighbor, 0]) and (targets[neighbor] == targets[position]).all():
+                    seed = (solved[neighbor, 0], solved[neighbor, 1], storage[neighbor])
+                    seed_site = sites.index[neighbor]
+                    break
+
+        # same stored energy: r_f^2 scales inversely with the storage per unit area
+        m_dot_seed, r_f_seed, storage_seed = seed
+        if storage_seed > 0.0 and storage[position] > 0.0:
+            r_f_seed = r_f_seed * (storage_seed / storage[position]) ** 0.5
+
+        results = size_system(target[0], target[1], inputs, cls=cls, m_dot=m_dot_seed, r_f=r_f_seed, debug=debug,
+                              **kwargs)
+        if results['converged']:
+            solved[position] = [results['m_dot'], results['r_f']]
+            seed_previous[target] = (results['m_dot'], results['r_f'], storage[position])
+
+        results['solve_time'] = time.time() - start
+        results['seed_site'] = seed_site
+        output[position] = results
+
+    return pd.DataFrame(output, index=sites.index)
@@ -0,0 +1,198 @@
+import numpy as np
+
+
+def stage_inputs(inputs, name, default=1.0):
+    """
+    parameter of each stage of a compressor/expander, from inputs[name] (list or array of any length) if it is given
+    and not empty, otherwise from the numbered entries name1, name2, ... (stops at the first missing or negative entry)
+    :param inputs: pandas Series of inputs, e.g. from ICAES2.get_default_inputs()
+    :param name: parameter name, e.g. 'n_cmp' or 'ML_exp'
+    :param default: value of a single stage if there are no entries
+    :return: NumPy array, one entry per stage
+    """
+    if name in inputs.index and np.size(inputs[name]) > 0:
+        return np.array(inputs[name], dtype=float).ravel()
+    values = []
+    i = 1
+    while name + str(i) in inputs.index and inputs[name + str(i)] >= 0:
+        values.append(inputs[name + str(i)])
+        i = i + 1
+    if len(values) == 0:
+        values = [default]
+    return np.array(values, dtype=float)
+
+
+def interstage_dp(inputs, name, n_stages, include=True):
+    """
+    fractional pressure drop after each stage, from inputs[name] (list or array, one entry between each pair of
+    stages) if it is given and not empty, otherwise from the numbered entries name12, name23, ... Negative entries are
+    unused (0.0)
+    :param inputs: pandas Series of inputs
+    :param name: parameter name, e.g. 'delta_p_cmp'
+    :param n_stages: number of stages [-]
+    :param include: False - no interstage pressure drops
+    :return: NumPy array, one entry per stage (the last entry follows the final stage)
+    """
+    delta_p = np.zeros(n_stages)
+    if not include:
+        return delta_p
+    if name in inputs.index and np.size(inputs[name]) > 0:
+        values = np.array(inputs[name], dtype=float).ravel()[:n_stages]
+    else:
+        values = np.array([inputs.get(name + str(i + 1) + str(i + 2), -1.0) for i in range(n_stages)], dtype=float)
+    delta_p[:len(values)] = np.where(values > 0.0, values, 0.0)
+    return delta_p
+
+
+def design_pressure_ratios(PR, PR_total, delta_p):
+    """
+    design pressure ratio of each stage, PR if one is given per stage, otherwise the total pressure ratio (increased
+    for the interstage pressure drops) divided equally
+    :param PR: list of pressure ratios [-], may be empty
+    :param PR_total: ratio of the machine design pressure to atmospheric pressure [-]
+    :param delta_p: interstage pressure drop of each stage [-]
+    :return: NumPy array, one entry per stage [-]
+    """
+    n_stages = len(delta_p)
+    if len(PR) == n_stages:
+        return np.array(PR, dtype=float)
+    PR_equal = (PR_total * np.prod(1.0 + delta_p)) ** (1. / n_stages)
+    return np.full(n_stages, PR_equal)
+
+
+def free_pressure_ratios(p_in, p_out, PR_design, PR_design_cum, expansion=False):
+    """
+    stage pressure ratios of 'free' machinery, design ratios until the outlet pressure is reached, the stage that
+    reaches it takes the remaining ratio and later stages 1.0 (interstage pressure drops are not included). stages are
+    along the last axis, pressures may be arrays over a leading (system) axis
+    :param p_in: machine inlet pressure [MPa]
+    :param p_out: machine outlet pressure [MPa]
+    :param PR_design: design pressure ratio of each stage [-]
+    :param PR_design_cum: cumulative product of PR_design along the last axis (precomputed) [-]
+    :param expansion: False - compression, True - expansion
+    :return: NumPy array, one entry per stage along the last axis [-]
+    """
+    p_in = np.asarray(p_in)[..., np.newaxis]
+    p_out = np.asarray(p_out)[..., np.newaxis]
+    if expansion:
+        p_stg_out = np.maximum(p_in / PR_design_cum, p_out)
+        return np.maximum(p_in / PR_design_cum * PR_design, p_out) / p_stg_out
+    else:
+        p_stg_out = np.minimum(p_in * PR_design_cum, p_out)
+        return p_stg_out / np.minimum(p_in * PR_design_cum / PR_design, p_out)
+
+
+def polytropic_stages(p_in, T_in, PRs, delta_p, exponent, expansion=False):
+    """
+    inlet and outlet states of a series of polytropic stages, with cumulative products over the stages. stages are
+    along the last axis, inlet states may be arrays over a leading (system) axis
+    :param p_in: inlet pressure of the first stage [MPa]
+    :param T_in: inlet temperature of the first stage [K]
+    :param PRs: pressure ratio of each stage (> 1) [-]
+    :param delta_p: interstage pressure drop after each stage [-]
+    :param exponent: (n - 1) / n of each stage, n - polytropic index [-]
+    :param expansion: False - compression (p_out = p_in * PR), True - expansion (p_out = p_in / PR)
+    :return: NumPy arrays (one entry per stage along the last axis) p_in [MPa], T_in [K], p_out [MPa], T_out [K]
+    """
+    p_in = np.asarray(p_in)[..., np.newaxis]
+    T_in = np.asarray(T_in)[..., np.newaxis]
+    p_ratio = 1.0 / PRs if expansion else PRs
+    T_ratio = p_ratio ** exponent
+    # pressure ratio from the machine inlet to the inlet of the next stage
+    p_next = p_ratio * (1.0 - delta_p)
+    p_ins = p_in * np.cumprod(p_next, axis=-1) / p_next
+    T_outs = T_in * np.cumprod(T_ratio, axis=-1)
+    return p_ins, T_outs / T_ratio, p_ins * p_ratio, T_outs
+
+
+def stage_keys(prefix, entries, n_stages):
+    """
+    names of the time series entries of each stage, e.g. 'cmp_w_stg0', in the order the values are recorded
+    :param prefix: 'cmp_' or 'exp_'
+    :param entries: entry names, e.g. ['n', 'w_stg']
+    :param n_stages: number of stages [-]
+    :return: tuple of names, all stages of the first entry, then all stages of the second entry, ...
+    """
+    return tuple(prefix + entry + str(n) for entry in entries for n in range(n_stages))
+
+
+class Stages:
+    """
+    Per-stage constants of a compressor or expander, evaluated once per time step
+
+    Machines with up to SCALAR_STAGES stages are evaluated with Python floats, for arrays that short NumPy's per-call
+    overhead exceeds the arithmetic. Longer machines use free_pressure_ratios and polytropic_stages. Results are
+    returned as lists either way, ready to be recorded as a single block.
+    """
+    SCALAR_STAGES = 8
+
+    def __init__(self, PR, delta_p, exponent, work_factor, expansion=False):
+        """
+        :param PR: design pressure ratio of each stage (NumPy array) [-]
+        :param delta_p: interstage pressure drop after each stage (NumPy array) [-]
+        :param exponent: (n - 1) / n of each stage (NumPy array) [-]
+        :param work_factor: work per kelvin of each stage (NumPy array) [kJ/kg-K]
+        :param expansion: False - compression, True - expansion
+        """
+        self.n_stages = len(PR)
+        self.expansion = expansion
+        self.scalar = self.n_stages <= self.SCALAR_STAGES
+        self.arrays = (np.asarray(PR), np.cumprod(PR), np.asarray(delta_p), np.asarray(exponent))
+        self.PR, self.PR_cum, self.delta_p, self.exponent = [a.tolist() for a in self.arrays]
+        self.work_factor = np.asarray(work_factor).tolist()
+
+    def free_pressure_ratios(self, p_in, p_out):
+        """
+        stage pressure ratios of 'free' machinery, see free_pressure_ratios
+        :param p_in: machine inlet pressure [MPa]
+        :param p_out: machine outlet pressure [MPa]
+        :return: list, one entry per stage [-]
+        """
+        if not self.scalar:
+            return free_pressure_ratios(p_in, p_out, self.arrays[0], self.arrays[1], self.expansion).tolist()
+        PRs = []
+        if self.expansion:
+            for PR, PR_cum in zip(self.PR, self.PR_cum):
+                p_stg_out = max(p_in / PR_cum, p_out)
+                PRs.append(max(p_in / PR_cum * PR, p_out) / p_stg_out)
+        else:
+            for PR, PR_cum in zip(self.PR, self.PR_cum):
+                p_stg_out = min(p_in * PR_cum, p_out)
+                PRs.append(p_stg_out / min(p_in * PR_cum / PR, p_out))
+        return PRs
+
+    def states(self, p_in, T_in, PRs):
+        """
+        inlet and outlet states of each stage, see polytropic_stages
+        :param p_in: inlet pressure of the first stage [MPa]
+        :param T_in: inlet temperature of the first stage [K]
+        :param PRs: pressure ratio of each stage (> 1) [-]
+        :return: lists (one entry per stage) p_in [MPa], T_in [K], p_out [MPa], T_out [K]
+        """
+        if not self.scalar:
+            states = polytropic_stages(p_in, T_in, np.asarray(PRs), self.arrays[2], self.arrays[3], self.expansion)
+            return [values.tolist() for values in states]
+        p_ins, T_ins, p_outs, T_outs = [], [], [], []
+        p_cum = 1.0
+        T_cum = 1.0
+        for PR, delta_p, exponent in zip(PRs, self.delta_p, self.exponent):
+            p_ratio = 1.0 / PR if self.expansion else PR
+            T_ratio = p_ratio ** exponent
+            p_next = p_ratio * (1.0 - delta_p)
+            p_cum = p_cum * p_next
+            T_cum = T_cum * T_ratio
+            p_stg_in = p_in * p_cum / p_next
+            T_stg_out = T_in * T_cum
+            p_ins.append(p_stg_in)
+            T_ins.append(T_stg_out / T_ratio)
+            p_outs.append(p_stg_in * p_ratio)
+            T_outs.append(T_stg_out)
+        return p_ins, T_ins, p_outs, T_outs
+
+    def work(self, T_in, T_out):
+        """
+        :param T_in: inlet temperature of each stage [K]
+        :param T_out: outlet temperature of each stage [K]
+        :return: list, work of each stage [kJ/kg]
+        """
+        return [factor * (T_stg_in - T_stg_out) for factor, T_stg_in, T_stg_out in zip(self.work_factor, T_in, T_out)]
@@ -0,0 +1,220 @@
+import itertools
+import numpy as np
+import pandas as pd
+from scipy.spatial import Delaunay
+from scipy.stats import qmc
+from .sensitivity import parameter_bounds, scale
+
+
+def multi_indices(d, degree):
+    """
+    exponents of the polynomial terms of total degree up to degree, ordered by total degree
+    :param d: number of inputs [-]
+    :param degree: total degree [-]
+    :return: NumPy array, one row per term, one column per input
+    """
+    terms = [index for index in itertools.product(range(degree + 1), repeat=d) if sum(index) <= degree]
+    terms.sort(key=lambda index: (sum(index), tuple(-i for i in index)))
+    return np.array(terms, dtype=int).reshape(-1, d)
+
+
+def term_parents(terms):
+    """
+    each term (except the constant) is the product of a lower degree term and one polynomial of one input, so the basis
+    is built with one multiplication per term
+    :param terms: exponents of each term, see multi_indices
+    :return parent: position of the lower degree term (the term with its last non-zero exponent removed)
+    :return inputs: input of the polynomial
+    :return orders: order of the polynomial
+    """
+    position = {tuple(term): i for i, term in enumerate(terms)}
+    parent = np.zeros(len(terms), dtype=int)
+    inputs = np.zeros(len(terms), dtype=int)
+    orders = np.zeros(len(terms), dtype=int)
+    for i, term in enumerate(terms):
+        nonzero = np.flatnonzero(term)
+        if len(nonzero) > 0:
+            j = nonzero[-1]
+            lower = term.copy()
+            lower[j] = 0
+            parent[i] = position[tuple(lower)]
+            inputs[i] = j
+            orders[i] = term[j]
+    return parent, inputs, orders
+
+
+class PolynomialSurrogate:
+    """
+    emulator of model outputs, a polynomial chaos expansion (Legendre polynomials of the inputs scaled to [-1, 1])
+    fitted by least squares to a set of model runs
+
+    Queries inside the training region are answered by the polynomial. Queries outside it are run with model, if one is
+    given. The training region is the bounding box of the training inputs ('box') or their convex hull ('convex', only
+    practical for a few inputs). Failed runs (NaN outputs) are not used for training.
+    """
+
+    def __init__(self, inputs, outputs, degree=2, log_inputs=(), folds=5, hull='box', model=None, bounds=None,
+                 seed=None):
+        """
+        :param inputs: DataFrame, training inputs, one column per input
+        :param outputs: DataFrame, training outputs (same index as inputs), one column per output
+        :param degree: total degree of the polynomial [-]
+        :param log_inputs: inputs that are fitted in log10 (e.g. permeability)
+        :param folds: number of folds for cross-validation, 0 - none [-]
+        :param hull: training region, 'box' or 'convex'
+        :param model: function of a DataFrame of inputs that returns a DataFrame of outputs, used outside the training
+            region, None - the polynomial is used everywhere
+        :param bounds: box of the training region (hull 'box'), see sensitivity.parameter_bounds, None - the range of
+            the training inputs
+        :param seed: seed of the cross-validation folds, None - not repeatable
+        """
+        self.input_names = list(inputs.columns)
+        self.output_names = list(outputs.columns)
+        self.degree = degree
+        self.log_inputs = [name for name in log_inputs if name in self.input_names]
+        self.hull = hull if hull in ['box', 'convex'] else 'box'
+        self.model = model
+
+        x = self.transform(inputs)
+        if bounds is None:
+            self.low = x.min(axis=0)
+            self.high = x.max(axis=0)
+        else:
+            names, low, high = parameter_bounds(bounds)
+            box = pd.DataFrame([low, high], columns=names)
+            self.low = self.transform(box)[0]
+            self.high = self.transform(box)[1]
+        self.terms = multi_indices(len(self.input_names), degree)
+        self.parent, self.term_inputs, self.term_orders = term_parents(self.terms)
+        self.delaunay = Delaunay(x) if self.hull == 'convex' else None
+        if len(x) < len(self.terms):
+            print('Warning - ' + str(len(x)) + ' training runs for ' + str(len(self.terms)) +
+                  ' polynomial terms, reduce the degree or add runs')
+
+        y = outputs[self.output_names].to_numpy(dtype=float)
+        basis = self.basis(x)
+        self.coefficients = self.fit(basis, y)
+
+        # cross-validation
+        self.cv = pd.DataFrame(index=self.output_names, columns=['rmse', 'nrmse', 'r2'], dtype=float)
+        if folds > 1:
+            fold = np.random.default_rng(seed).permutation(len(x)) % folds
+            prediction = np.full(y.shape, np.nan)
+            for k in range(folds):
+                prediction[fold == k] = basis[fold == k] @ self.fit(basis[fold != k], y[fold != k])
+            for j, name in enumerate(self.output_names):
+                valid = ~np.isnan(y[:, j])
+                error = prediction[valid, j] - y[valid, j]
+                rmse = np.sqrt(np.mean(error ** 2))
+                std = np.std(y[valid, j])
+                self.cv.loc[name, 'rmse'] = rmse
+                self.cv.loc[name, 'nrmse'] = rmse / std
+                self.cv.loc[name, 'r2'] = 1.0 - rmse ** 2 / std ** 2
+
+    def transform(self, inputs):
+        # inputs as a float array, with log_inputs in log10
+        x = inputs[self.input_names].to_numpy(dtype=float).copy()
+        for name in self.log_inputs:
+            j = self.input_names.index(name)
+            x[:, j] = np.log10(x[:, j])
+        return x
+
+    def basis(self, x):
+        """
+        :param x: transformed inputs, NumPy array (samples, inputs)
+        :return: NumPy array (samples, terms), value of each polynomial term
+        """
+        span = np.where(self.high > self.low, self.high - self.low, 1.0)
+        z = (2.0 * (x - self.low) / span - 1.0).T
+        # Legendre polynomials of each order for each input by recurrence, (inputs, degree + 1, samples)
+        P = np.empty((z.shape[0], self.degree + 1, z.shape[1]))
+        P[:, 0] = 1.0
+        if self.degree > 0:
+            P[:, 1] = z
+        for order in range(2, self.degree + 1):
+            P[:, order] = ((2 * order - 1) * z * P[:, order - 1] - (order - 1) * P[:, order - 2]) / order
+        values = np.empty((len(self.terms), z.shape[1]))
+        values[0] = 1.0
+        for i in range(1, len(self.terms)):
+            np.multiply(values[self.parent[i]], P[self.term_inputs[i], self.term_orders[i]], out=values[i])
+        return values.T
+
+    def fit(self, basis, y):
+        # least squares coefficients of each output, NaN outputs are skipped
+        coefficients = np.zeros((basis.shape[1], y.shape[1]))
+        for j in range(y.shape[1]):
+            valid = ~np.isnan(y[:, j])
+            coefficients[:, j] = np.linalg.lstsq(basis[valid], y[valid, j], rcond=None)[0]
+        return coefficients
+
+    def in_hull(self, inputs):
+        """
+        :param inputs: DataFrame of inputs
+        :return: NumPy array, True for inputs inside the training region
+        """
+        x = self.transform(inputs)
+        if self.delaunay is not None:
+            return self.delaunay.find_simplex(x) >= 0
+        return np.all((x >= self.low) & (x <= self.high), axis=1)
+
+    def predict(self, inputs, chunksize=4096):
+        """
+        outputs of the polynomial, evaluated in chunks that fit in the processor cache
+        :param inputs: DataFrame of inputs
+        :param chunksize: samples per chunk [-]
+        :return: DataFrame of outputs (same index as inputs)
+        """
+        x = self.transform(inputs)
+        y = np.empty((len(x), len(self.output_names)))
+        for start in range(0, len(x), chunksize):
+            y[start:start + chunksize] = self.basis(x[start:start + chunksize]) @ self.coefficients
+        return pd.DataFrame(y, index=inputs.index, columns=self.output_names)
+
+    def evaluate(self, inputs):
+        """
+        outputs of the polynomial inside the training region and of model outside it
+        :param inputs: DataFrame of inputs
+        :return: DataFrame of outputs (same index as inputs), column 'surrogate' is True where the polynomial was used
+            and column 'extrapolated' is True where it was used outside the training region (model is None)
+        """
+        results = self.predict(inputs)
+        inside = self.in_hull(inputs)
+        if self.model is not None and not inside.all():
+            outside = inputs.loc[~inside, self.input_names]
+            results.loc[~inside, self.output_names] = self.model(outside)[self.output_names].to_numpy(dtype=float)
+            results['surrogate'] = inside
+            results['extrapolated'] = False
+        else:
+            results['surrogate'] = True
+            results['extrapolated'] = ~inside
+        return results
+
+
+def train_surrogate(model, bounds, n=256, outputs=None, seed=None, **kwargs):
+    """
+    runs model over a Latin hypercube design and fits a PolynomialSurrogate (model is used outside the training region)
+    :param model: function of a DataFrame of inputs that returns a DataFrame of outputs, e.g.
+        functools.partial(sensitivity.evaluate, base_inputs=...) for ICAES2 performance
+    :param bounds: inputs and their ranges, see sensitivity.parameter_bounds
+    :param n: number of training runs [-]
+    :param outputs: outputs to emulate, None - every numeric output of model
+    :param seed: seed of the design and cross-validation, None - not repeatable
+    :param kwargs: passed to PolynomialSurrogate (degree, log_inputs, folds, hull)
+    :return: PolynomialSurrogate
+    """
+    names, low, high = parameter_bounds(bounds)
+    log_inputs = kwargs.get('log_inputs', ())
+    if len(log_inputs) > 0:
+        # log inputs are sampled evenly in log10
+        low = np.array([np.log10(v) if name in log_inputs else v for name, v in zip(names, low)])
+        high = np.array([np.log10(v) if name in log_inputs else v for name, v in zip(names, high)])
+    unit = qmc.LatinHypercube(d=len(names), seed=seed).random(n)
+    inputs = scale(unit, dict(zip(names, zip(low, high))))
+    for name in log_inputs:
+        if name in names:
+            inputs[name] = 10.0 ** inputs[name]
+
+    results = model(inputs)
+    if outputs is None:
+        outputs = [name for name in results.columns if pd.api.types.is_numeric_dtype(results[name])]
+    return PolynomialSurrogate(inputs, results[list(outputs)], model=model, bounds=bounds, seed=seed, **kwargs)
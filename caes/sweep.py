@@ -0,0 +1,310 @@
+import os
+import math
+import pickle
+import sqlite3
+import hashlib
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .fluid_properties import air_property_backend, AbstractStateProps
+
+
+def get_n_jobs(n_jobs=None, default=1):
+    """
+    number of processes to use
+    :param n_jobs: number of processes, None - NUM_PROCS environment variable (e.g. defined in an sbatch script), or
+        default if it is not defined. -1 - all cpus
+    :param default: number of processes if n_jobs is None and NUM_PROCS is not defined
+    :return: number of processes [-]
+    """
+    if n_jobs is None:
+        try:
+            n_jobs = int(os.getenv('NUM_PROCS'))
+        except (TypeError, ValueError):
+            n_jobs = default
+    if n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    return n_jobs
+
+
+def init_worker(property_backends=('HEOS',), property_table_tol=1e-3):
+    """
+    prepares a process for running cases, CoolProp fluids and property tables are loaded once so the first case in
+    each process is not slower than the rest
+    :param property_backends: air property backends to warm up (see air_property_backend)
+    :param property_table_tol: allowable relative error of the 'table' backend [-]
+    """
+    for name in property_backends:
+        air_property_backend(name, tol=property_table_tol).props(('D', 'V'), 300.0, 1.0)
+    AbstractStateProps('HEOS', 'Water').props(('CPMASS', 'D'), 300.0, 0.1)
+
+
+def run_chunk(fn, chunk, **kwargs):
+    """
+    runs fn for each row of chunk
+    :return: list of results of fn
+    """
+    return [fn(chunk.iloc[i], **kwargs) for i in range(len(chunk))]
+
+
+def row_key(row):
+    """
+    key of an input row, a hash of its entries. Floats are compared to 12 significant digits so that inputs read back
+    from a csv file give the same key
+    :param row: Pandas Series
+    :return: hexadecimal string
+    """
+    entries = []
+    for name, value in row.items():
+        if isinstance(value, (float, np.floating)):
+            value = '%.12g' % value
+        entries.append(str(name) + '=' + str(value))
+    return hashlib.sha1('\x1f'.join(entries).encode('utf-8')).hexdigest()
+
+
+class SweepCheckpoint:
+    """
+    results of completed cases stored in a SQLite database, keyed by row_key of the inputs
+
+    Results are written as each chunk completes, so a sweep that is stopped (e.g. a preempted job) can be restarted
+    with the same inputs and only the remaining cases are run.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: database file, created if it does not exist
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result BLOB)')
+        self.connection.commit()
+
+    def load(self, keys):
+        """
+        :param keys: keys of the cases of interest
+        :return: dictionary of key: result, for the cases that have been completed
+        """
+        completed = {}
+        keys = list(set(keys))
+        for start in range(0, len(keys), 500):  # SQLite limits the number of parameters per query
+            batch = keys[start:start + 500]
+            query = 'SELECT key, result FROM results WHERE key IN (' + ','.join('?' * len(batch)) + ')'
+            for key, result in self.connection.execute(query, batch):
+                completed[key] = pickle.loads(result)
+        return completed
+
+    def save(self, keys, results):
+        """
+        stores the results of completed cases
+        :param keys: keys of the cases
+        :param results: results of fn for each case
+        """
+        entries = [(key, pickle.dumps(dict(result))) for key, result in zip(keys, results)]
+        self.connection.executemany('INSERT OR REPLACE INTO results (key, result) VALUES (?, ?)', entries)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+def run(fn, inputs, n_jobs=None, chunksize=None, initializer=init_worker, initargs=(), checkpoint=None,
+        verbose=False, **kwargs):
+    """
+    runs fn for each row of inputs, in parallel
+
+    Rows are sent to the worker processes in chunks (one task per chunk instead of per row) and each worker is prepared
+    once by initializer. fn must be defined at module level so it can be sent to the workers.
+
+    :param fn: function of a row of inputs (Pandas Series), returns a Pandas Series (or dict) of results
+    :param inputs: DataFrame, one row per case
+    :param n_jobs: number of processes, see get_n_jobs, 1 runs in this process
+    :param chunksize: rows per task, default splits the rows into 4 tasks per process
+    :param initializer: function run once in each process before any case, None to skip
+    :param initargs: arguments of initializer
+    :param checkpoint: SQLite file to store results in as each chunk completes (see SweepCheckpoint), cases already
+        stored are not run again. None - results are not stored
+    :param verbose: print progress as chunks complete
+    :param kwargs: passed to fn
+    :return: DataFrame, results of fn for each row (same index as inputs), columns in the order they first appear
+    """
+    n_jobs = get_n_jobs(n_jobs)
+    n_rows = len(inputs)
+    results = [None] * n_rows
+
+    # cases completed in a previous run
+    store = None
+    if checkpoint is not None:
+        store = SweepCheckpoint(checkpoint)
+        keys = [row_key(inputs.iloc[i]) for i in range(n_rows)]
+        completed = store.load(keys)
+        for i, key in enumerate(keys):
+            results[i] = completed.get(key)
+        if verbose:
+            print('Cases completed previously: ' + str(len(completed)) + ' of ' + str(n_rows))
+    positions = np.array([i for i in range(n_rows) if results[i] is None], dtype=int)
+
+    if chunksize is None:
+        chunksize = max(1, math.ceil(len(positions) / (4 * n_jobs)))
+    chunks = [positions[start:start + chunksize] for start in range(0, len(positions), chunksize)]
+
+    def complete(chunk, output, count):
+        for i, result in zip(chunk, output):
+            results[i] = result
+        if store is not None:
+            store.save([keys[i] for i in chunk], output)
+        if verbose:
+            print('Completed chunk ' + str(count) + ' of ' + str(len(chunks)))
+
+    try:
+        if n_jobs == 1 or len(chunks) <= 1:
+            if initializer is not None and len(chunks) > 0:
+                initializer(*initargs)
+            for count, chunk in enumerate(chunks):
+                complete(chunk, run_chunk(fn, inputs.iloc[chunk], **kwargs), count + 1)
+        else:
+            with ProcessPoolExecutor(max_workers=min(n_jobs, len(chunks)), initializer=initializer,
+                                     initargs=initargs) as executor:
+                futures = {executor.submit(run_chunk, fn, inputs.iloc[chunk], **kwargs): chunk for chunk in chunks}
+                for count, future in enumerate(as_completed(futures)):
+                    complete(futures[future], future.result(), count + 1)
+    finally:
+        if store is not None:
+            store.close()
+
+    return results_frame(results, inputs.index)
+
+
+def results_frame(results, index):
+    """
+    combines the results of each row into a single DataFrame, each column is allocated once
+    :param results: list of Pandas Series or dicts, one per row
+    :param index: index of the rows
+    :return: DataFrame
+    """
+    columns = {}
+    for result in results:
+        for key in result.keys():
+            if key not in columns:
+                columns[key] = np.full(len(results), np.nan, dtype=object)
+    for i, result in enumerate(results):
+        for key, value in result.items():
+            columns[key][i] = value
+    return pd.DataFrame(columns, index=index).infer_objects()
+
+
+def confidence_intervals(values, percentiles=(5, 95), confidence=0.95):
+    """
+    estimates of the mean and percentiles of a sample, with the half-width of their confidence intervals. The mean uses
+    the normal approximation, percentiles use order statistics (no assumption on the distribution)
+    :param values: NumPy array, samples (NaN are ignored)
+    :param percentiles: percentiles of interest [%]
+    :param confidence: confidence level of the intervals [-]
+    :return: dictionary, 'mean', 'mean_hw' and for each percentile p, 'p<p>' and 'p<p>_hw'
+    """
+    from scipy import stats  # not needed by the worker processes of run
+
+    values = np.sort(np.asarray(values, dtype=float)[~np.isnan(values)])
+    n = len(values)
+    z = stats.norm.ppf(0.5 + confidence / 2.0)
+    intervals = {}
+    if n < 2:
+        intervals['mean'] = values.mean() if n > 0 else np.nan
+        intervals['mean_hw'] = np.inf
+        for p in percentiles:
+            intervals['p' + str(p)] = intervals['mean']
+            intervals['p' + str(p) + '_hw'] = np.inf
+        return intervals
+    intervals['mean'] = values.mean()
+    intervals['mean_hw'] = z * values.std(ddof=1) / n ** 0.5
+    for p in percentiles:
+        q = p / 100.0
+        spread = z * (n * q * (1.0 - q)) ** 0.5  # ranks, binomial approximation
+        lower = values[int(np.clip(np.floor(n * q - spread), 0, n - 1))]
+        upper = values[int(np.clip(np.ceil(n * q + spread), 0, n - 1))]
+        intervals['p' + str(p)] = np.percentile(values, p)
+        intervals['p' + str(p) + '_hw'] = (upper - lower) / 2.0
+    return intervals
+
+
+def run_adaptive(fn, sample, sites, outputs=('RTE', 'kWh_out'), tol=0.01, batch_size=20, min_samples=40,
+                 max_samples=1000, percentiles=(5, 95), confidence=0.95, seed=None, batched=False, n_jobs=None,
+                 checkpoint=None, verbose=False, **kwargs):
+    """
+    Monte Carlo analysis of each site, run in batches until the statistics of the outputs have converged
+
+    Each round, batch_size samples are drawn for every site that has not converged and all of them are run together,
+    so the processes only work on unconverged sites. A site has converged once the half-width of the confidence
+    interval of the mean and of each percentile of every output is within tol of the mean (relative), or max_samples
+    have been run. Failed cases (NaN outputs) are not counted.
+
+    :param fn: function of a row of inputs (Pandas Series), returns a Pandas Series of results including outputs, see
+        run. If batched, function of a DataFrame of inputs that returns a DataFrame of results (same index)
+    :param sample: function (site, n, rng) that returns a DataFrame of n samples of inputs for a site (row of sites),
+        rng is a NumPy random Generator
+    :param sites: DataFrame, one row per site
+    :param outputs: results of fn that are tracked [-]
+    :param tol: relative tolerance of the confidence interval half-widths [-]
+    :param batch_size: samples per site per round [-]
+    :param min_samples: samples run for each site before checking convergence [-]
+    :param max_samples: most samples run for a site [-]
+    :param percentiles: percentiles tracked [%]
+    :param confidence: confidence level of the intervals [-]
+    :param seed: seed of the random number generator, None - not repeatable
+    :param batched: True - fn evaluates a DataFrame, False - fn evaluates a row and is run with run
+    :param n_jobs: number of processes, see get_n_jobs
+    :param checkpoint: SQLite file of completed cases, see run (the same seed gives the same samples)
+    :param verbose: print progress after each round
+    :param kwargs: passed to fn
+    :return results: DataFrame, results of every case, column 'site' is the index of the site in sites
+    :return summary: DataFrame, one row per site, number of samples ('n'), 'converged' and confidence_intervals of
+        each output (columns '<output>_mean', '<output>_mean_hw', ...)
+    """
+    rng = np.random.default_rng(seed)
+    n_samples = pd.Series(0, index=sites.index)
+    converged = pd.Series(False, index=sites.index)
+    results = []
+    summary = pd.DataFrame(index=sites.index)
+
+    while not converged.all():
+        # samples of each unconverged site
+        batch = []
+        for site in sites.index[~converged]:
+            n = min(max(batch_size, min_samples - n_samples[site]), max_samples - n_samples[site])
+            site_inputs = sample(sites.loc[site], n, rng)
+            site_inputs.insert(0, 'site', site)
+            batch.append(site_inputs)
+            n_samples[site] = n_samples[site] + n
+        batch = pd.concat(batch, ignore_index=True)
+
+        if batched:
+            output = fn(batch, **kwargs)
+        else:
+            output = run(fn, batch, n_jobs=n_jobs, checkpoint=checkpoint, **kwargs)
+        output['site'] = batch['site'].values
+        results.append(output)
+
+        # convergence of each site
+        combined = pd.concat(results, ignore_index=True)
+        for site in sites.index[~converged]:
+            site_results = combined[combined['site'] == site]
+            done = n_samples[site] >= min_samples
+            for name in outputs:
+                values = site_results[name].values if name in site_results else np.full(len(site_results), np.nan)
+                intervals = confidence_intervals(values, percentiles, confidence)
+                for key, value in intervals.items():
+                    summary.loc[site, name + '_' + key] = value
+                scale = abs(intervals['mean'])
+                half_widths = [value for key, value in intervals.items() if key.endswith('_hw')]
+                if not np.all(np.array(half_widths) <= tol * scale):
+                    done = False
+            summary.loc[site, 'n'] = n_samples[site]
+            converged[site] = done or n_samples[site] >= max_samples
+            summary.loc[site, 'converged'] = done
+
+        if verbose:
+            print('Samples run: ' + str(int(n_samples.sum())) + ', sites converged: ' + str(int(converged.sum())) +
+                  ' of ' + str(len(sites)))
+
+    summary['n'] = summary['n'].astype(int)
+    summary['converged'] = summary['converged'].astype(bool)
+    return pd.concat(results, ignore_index=True), summary
@@ -0,0 +1,42 @@
+import unittest
+from caes import ICAES2
+
+
+class TestAdaptiveSteps(unittest.TestCase):
+
+    def run_cycle(self, solver, steps, step_tol=5e-4):
+        inputs = ICAES2.get_default_inputs()
+        inputs['record'] = 'summary'
+        inputs['solver'] = solver
+        inputs['steps'] = steps
+        inputs['step_tol'] = step_tol
+        system = ICAES2(inputs=inputs)
+        system.single_cycle()
+        return system, system.analyze_performance()
+
+    def test_tolerance(self):
+        reference = self.run_cycle('steps', 4000)[1]
+        # averages of fixed steps converge to first order only
+        fine = self.run_cycle('steps', 20000)[1]
+        for step_tol in [1e-3, 1e-4]:
+            system, results = self.run_cycle('adaptive', 10, step_tol)
+            self.assertEqual(results['steps_used'], system.steps_used)
+            self.assertGreater(results['steps_used'], 20)
+            for key in ['RTE', 'kWh_out']:
+                self.assertLess(abs(results[key] / reference[key] - 1.0), step_tol, msg=key)
+            # estimated error of the energy
+            self.assertAlmostEqual(system.step_error / abs(results['kWh_out'] / reference['kWh_out'] - 1.0), 1.0,
+                                   delta=0.3)
+            self.assertAlmostEqual(results['kW_in_avg'] / reference['kW_in_avg'], 1.0, places=2)
+            # averages over steps of differing mass are weighted by it
+            for key in ['dp_well_avg', 'dp_pipe_f_avg', 'T_cmp_out_avg', 'T_exp_out_avg']:
+                self.assertLess(abs(results[key] / fine[key] - 1.0), step_tol, msg=key)
+
+        # the store is filled and emptied to the same masses as with fixed steps
+        system, results = self.run_cycle('steps', 10)
+        self.assertAlmostEqual(system.m_store / self.run_cycle('adaptive', 10)[0].m_store, 1.0, places=9)
+        self.assertEqual(results['steps_used'], 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
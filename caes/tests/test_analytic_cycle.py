@@ -0,0 +1,69 @@
+import unittest
+from caes import CAES, ICAES2
+
+
+class TestAnalyticCycle(unittest.TestCase):
+
+    def setUp(self):
+        self.inputs = CAES.get_default_inputs()
+        self.inputs['include_aquifer_dp'] = False
+        self.inputs['include_pipe_dp_friction'] = False
+        self.inputs['include_pipe_heat_transfer'] = False
+        self.inputs['record'] = 'summary'
+        self.inputs['solver'] = 'analytic'
+
+    def compare(self, inputs):
+        # analytic results and time stepping with many steps agree to O(1/steps)
+        analytic = CAES(inputs=inputs)
+        analytic.single_cycle()
+        results = analytic.analyze_performance()
+        self.assertIsNotNone(analytic.analytic_results)
+
+        inputs = inputs.copy()
+        inputs['solver'] = 'steps'
+        inputs['steps'] = 2000
+        stepped = CAES(inputs=inputs)
+        stepped.single_cycle()
+        expected = stepped.analyze_performance()
+        self.assertIsNone(stepped.analytic_results)
+
+        for key in ['RTE', 'kWh_in', 'kWh_out', 'kW_in_avg', 'kW_out_avg', 'MWh_cushion_gas', 'T_exp_out_avg']:
+            self.assertAlmostEqual(results[key] / expected[key], 1.0, places=4, msg=key)
+        self.assertEqual(results['errors'], expected['errors'])
+
+    def test_no_losses(self):
+        self.inputs['include_pipe_dp_gravity'] = False
+        self.compare(self.inputs)
+
+    def test_pipe_gravity(self):
+        self.compare(self.inputs)
+
+    def test_availability(self):
+        # the closed form is opt-in, time stepping by default
+        inputs = self.inputs.copy()
+        inputs['solver'] = CAES.get_default_inputs()['solver']
+        system = CAES(inputs=inputs)
+        system.single_cycle()
+        self.assertIsNone(system.analytic_results)
+
+        # results of an earlier closed form cycle are not reported for a time stepped cycle
+        system = CAES(inputs=self.inputs)
+        system.single_cycle()
+        self.assertIsNotNone(system.analytic_results)
+        system.solver = 'steps'
+        system.single_cycle()
+        self.assertIsNone(system.analytic_results)
+
+        # losses without a closed form use time stepping
+        self.inputs['include_aquifer_dp'] = True
+        self.assertFalse(CAES(inputs=self.inputs).analytic_available())
+
+        # machinery that is not isothermal
+        inputs = ICAES2.get_default_inputs()
+        for key in ['include_aquifer_dp', 'include_pipe_dp_friction', 'include_pipe_heat_transfer']:
+            inputs[key] = False
+        self.assertFalse(ICAES2(inputs=inputs).analytic_available())
+
+
+if __name__ == '__main__':
+    unittest.main()
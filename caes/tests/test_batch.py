@@ -0,0 +1,53 @@
+import unittest
+import pandas as pd
+from caes import ICAES2, ICAES2Batch
+
+
+class TestICAES2Batch(unittest.TestCase):
+
+    def setUp(self):
+        self.inputs = pd.DataFrame({'depth': [1402.35, 1000.0, 2500.0],
+                                    'k': [38.67, 10.0, 200.0],
+                                    'm_dot': [574.36, 300.0, 800.0],
+                                    'n_cmp1': [1.1, 1.05, 1.2],
+                                    'steps': [20.0, 20.0, 20.0]})
+
+    def test_matches_ICAES2(self):
+        batch = ICAES2Batch(self.inputs, property_backend='HEOS')
+        batch.single_cycle()
+        results = batch.analyze_performance()
+
+        for i, row in self.inputs.iterrows():
+            inputs = ICAES2.get_default_inputs()
+            for key, value in row.items():
+                inputs[key] = value
+            inputs['record'] = 'summary'
+            system = ICAES2(inputs)
+            system.single_cycle()
+            expected = system.analyze_performance()
+
+            self.assertEqual(results.loc[i, 'errors'], expected['errors'])
+            for key in ['RTE', 'kWh_in', 'kWh_out', 'kW_in_avg', 'dp_well_avg', 'T_cmp_out_avg']:
+                self.assertAlmostEqual(results.loc[i, key] / expected[key], 1.0, places=9)
+
+    def test_inactive_systems(self):
+        # a system without flow is not simulated, the others are unaffected
+        self.inputs['m_dot'] = [574.36, 0.0, 800.0]
+        batch = ICAES2Batch(self.inputs)
+        self.assertEqual(batch.air_props.backend, ICAES2.get_default_inputs()['property_backend'])
+        batch.single_cycle()
+        results = batch.analyze_performance()
+        self.assertEqual(results.loc[1, 'errors'], 'true')
+        self.assertEqual(batch.n_rows[1], 1)
+        others = ICAES2Batch(self.inputs.loc[[0, 2]])
+        others.single_cycle()
+        self.assertEqual(results.loc[[0, 2], 'RTE'].tolist(), others.analyze_performance()['RTE'].tolist())
+
+    def test_uniform_inputs(self):
+        self.inputs['steps'] = [20.0, 20.0, 10.0]
+        with self.assertRaises(ValueError):
+            ICAES2Batch(self.inputs, property_backend='HEOS')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+from caes import CAES, ICAES2
+
+
+class TestCompiledConstants(unittest.TestCase):
+
+    def test_changed_attribute(self):
+        # changing an input attribute after construction gives the same time step as setting it through the inputs
+        inputs = CAES.get_default_inputs()
+        inputs['r_w'] = 0.4
+        reference = CAES(inputs=inputs)
+        reference.update(m_dot=reference.m_dot, delta_t=1.0)
+
+        system = CAES(inputs=CAES.get_default_inputs())
+        system.r_w = 0.4
+        self.assertIsNone(system.constants)
+        system.update(m_dot=reference.m_dot, delta_t=1.0)
+        self.assertAlmostEqual(system.constants.d_pipe, 0.8)
+        for attribute in ['dp_pipe_f', 'p1', 'pwr']:
+            self.assertEqual(system.data.loc[0, attribute], reference.data.loc[0, attribute])
+
+    def test_stage_constants(self):
+        # stage constants are recompiled along with the system constants
+        system = ICAES2(inputs=ICAES2.get_default_inputs())
+        work_factor = system.work_factor_cmp[0]
+        system.M = 2.0 * system.M
+        system.update(m_dot=system.m_dot, delta_t=1.0)
+        self.assertAlmostEqual(system.work_factor_cmp[0], 0.5 * work_factor)
+        self.assertAlmostEqual(system.constants.R_M, system.R / system.M)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+import numpy as np
+from caes import size_caes_cmp
+
+
+class TestSizeCaesCmp(unittest.TestCase):
+
+    def test_array(self):
+        # sizing several operating points in one call is the same as sizing each separately
+        m_dot = np.array([0.5, 50.0, 500.0])
+        p_out = np.array([10.0, 100.0, 50.0])
+        designs = size_caes_cmp(p_out=p_out, m_dot=m_dot, RPM_low=900, RPM_high=30000, RPM_cases=12)
+        for i in range(3):
+            design = size_caes_cmp(p_out=p_out[i], m_dot=m_dot[i], RPM_low=900, RPM_high=30000, RPM_cases=12)
+            point = designs[designs['point'] == i]
+            self.assertEqual(len(point), len(design))
+            np.testing.assert_allclose(point['D'].to_numpy(), design['D'].to_numpy(), rtol=1e-12)
+            self.assertEqual(point['type'].tolist(), design['type'].tolist())
+
+    def test_classification(self):
+        designs = size_caes_cmp(p_out=100.0, m_dot=50.0, RPM_low=900, RPM_high=30000, RPM_cases=12)
+        self.assertTrue((designs.loc[designs['type'] == 'Radial', 'Ns'] < designs.loc[designs['type'] == 'Mixed',
+                                                                                      'Ns'].min()).all())
+        self.assertTrue((designs.loc[designs['type'] == 'Axial', 'Ns'] > designs.loc[designs['type'] == 'Mixed',
+                                                                                     'Ns'].max()).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import tempfile
+import numpy as np
+from caes.fluid_properties import PropsSIAir, AbstractStateProps, TabulatedAir, PROPERTIES
+
+
+class TestAbstractStateProps(unittest.TestCase):
+
+    def test_matches_PropsSI(self):
+        state = AbstractStateProps('HEOS', 'Air')
+        ref = PropsSIAir()
+        for T, p in [(290.0, 0.101325), (320.0, 15.0), (320.0, 15.0), (450.0, 20.0)]:
+            for value, expected in zip(state.props(PROPERTIES, T, p), ref.props(PROPERTIES, T, p)):
+                self.assertAlmostEqual(value / expected, 1.0, places=12)
+
+    def test_array(self):
+        state = AbstractStateProps('HEOS', 'Air')
+        rho, = state.props_array(['D'], np.array([300.0, 310.0]), 10.0)
+        self.assertEqual(rho[1], state.props(['D'], 310.0, 10.0)[0])
+
+
+class TestTabulatedAir(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.table_dir = tempfile.TemporaryDirectory()
+        cls.table = TabulatedAir(T_min=280.0, T_max=340.0, p_min=5.0, p_max=20.0, tol=1e-4,
+                                 table_dir=cls.table_dir.name)
+        cls.ref = PropsSIAir()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.table_dir.cleanup()
+
+    def test_accuracy(self):
+        for T, p in [(280.0, 5.0), (301.3, 7.7), (333.3, 19.9), (340.0, 20.0)]:
+            for value, expected in zip(self.table.props(PROPERTIES, T, p), self.ref.props(PROPERTIES, T, p)):
+                self.assertAlmostEqual(value / expected, 1.0, places=4)
+
+    def test_fallback(self):
+        self.assertEqual(self.table.props(['D', 'V'], 400.0, 10.0), self.ref.props(['D', 'V'], 400.0, 10.0))
+
+    def test_array(self):
+        T = np.array([290.0, 310.0, 400.0])
+        p = np.array([6.0, 15.0, 10.0])
+        rho, Z = self.table.props_array(['D', 'Z'], T, p)
+        for i in range(len(T)):
+            self.assertAlmostEqual(rho[i], self.table.props(['D'], T[i], p[i])[0], places=9)
+            self.assertAlmostEqual(Z[i], self.table.props(['Z'], T[i], p[i])[0], places=12)
+
+    def test_reload(self):
+        table = TabulatedAir(T_min=280.0, T_max=340.0, p_min=5.0, p_max=20.0, tol=1e-4, table_dir=self.table_dir.name)
+        self.assertIs(table.coeffs, self.table.coeffs)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+import subprocess
+import sys
+
+# modules that simulations do not need
+HEAVY_MODULES = ['matplotlib', 'seaborn', 'scipy']
+
+
+def loaded_modules(statement):
+    # top-level modules loaded by statement, in a new interpreter
+    code = statement + '\nimport sys\nprint(" ".join(sorted(set(m.split(".")[0] for m in sys.modules))))'
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    return output.split()
+
+
+class TestImports(unittest.TestCase):
+
+    def test_simulation_imports(self):
+        for statement in ['from caes import ICAES2', 'from caes import ICAES2Batch, sweep']:
+            modules = loaded_modules(statement)
+            for module in HEAVY_MODULES:
+                self.assertNotIn(module, modules, statement + ' imports ' + module)
+
+    def test_lazy_attributes(self):
+        import caes
+        self.assertIs(caes.ICAES2, caes.icaes2.ICAES2)
+        self.assertTrue(callable(caes.size_caes_cmp))
+        self.assertIn('ICAES2Batch', dir(caes))
+        with self.assertRaises(AttributeError):
+            caes.not_defined
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import numpy as np
+import pandas as pd
+from caes import monteCarloSamples
+
+
+class TestMonteCarloSamples(unittest.TestCase):
+
+    def setUp(self):
+        # same layout as the Excel sheets read by monteCarloInputs
+        self.df_xls = pd.DataFrame({'Distribution': ['C', 'U', 'N', 'LN', 'T'],
+                                    'Average': [2.0, np.nan, 10.0, 1.0, 0.5],
+                                    'Low': [np.nan, 1.0, np.nan, np.nan, 0.0],
+                                    'High': [np.nan, 3.0, np.nan, np.nan, 2.0],
+                                    'Stdev': [np.nan, np.nan, 0.5, 0.25, np.nan]},
+                                   index=['const', 'uni', 'norm', 'lognorm', 'tri'])
+
+    def test_methods(self):
+        for method in ['random', 'lhs', 'sobol']:
+            df = monteCarloSamples(self.df_xls, 256, method=method, seed=1)
+            self.assertEqual(df.shape, (256, 5))
+            self.assertTrue((df['const'] == 2.0).all())
+            self.assertTrue(df['uni'].between(1.0, 3.0).all())
+            self.assertTrue(df['tri'].between(0.0, 2.0).all())
+            self.assertAlmostEqual(df['norm'].mean(), 10.0, delta=0.1)
+            self.assertAlmostEqual(np.log(df['lognorm']).mean(), 1.0, delta=0.05)
+
+            # same seed, same samples
+            again = monteCarloSamples(self.df_xls, 256, method=method, seed=1)
+            pd.testing.assert_frame_equal(df, again)
+
+    def test_lhs_strata(self):
+        # one sample in each of the equal probability intervals
+        df = monteCarloSamples(self.df_xls, 50, method='lhs', seed=3)
+        counts = np.bincount(((df['uni'] - 1.0) / 2.0 * 50).astype(int), minlength=50)
+        self.assertTrue((counts == 1).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
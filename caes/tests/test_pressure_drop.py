@@ -0,0 +1,90 @@
+import unittest
+import numpy as np
+from math import log10
+from caes import friction_coeff, friction_coeff_array, pipe_fric_dp, pipe_grav_dp, aquifer_dp
+from caes import pipe_heat_transfer_subsurface, pipe_heat_transfer_ocean, WellboreThermalModel
+
+
+def colebrook_residual(f, Re, epsilon, d):
+    # |LHS - RHS| of the Colebrook equation
+    return abs(1.0 / f ** 0.5 + 2.0 * log10((epsilon / d) / 3.7 + 2.51 / (Re * f ** 0.5)))
+
+
+class TestFrictionCoeff(unittest.TestCase):
+
+    def test_colebrook(self):
+        for Re in [5.0e3, 1.0e5, 1.0e7, 1.0e9]:
+            for epsilon in [0.0, 0.002e-3, 0.1e-3]:
+                f = friction_coeff(Re=Re, epsilon=epsilon, d=0.41)
+                self.assertLess(colebrook_residual(f, Re, epsilon, 0.41), 1e-6)
+
+    def test_array(self):
+        Re = np.array([[0.0, 1000.0, 1.0e5], [1.0e6, 1.0e7, 1.0e8]])
+        f, iterations = friction_coeff_array(Re=Re, epsilon=0.002e-3, d=0.41)
+        self.assertEqual(f.shape, Re.shape)
+        self.assertEqual(f[0, 0], 0.0)
+        self.assertEqual(f[0, 1], 64.0 / 1000.0)
+        self.assertEqual(iterations[0, 1], 0)
+        for index in np.ndindex(Re.shape):
+            self.assertEqual(f[index], friction_coeff(Re=Re[index], epsilon=0.002e-3, d=0.41))
+        self.assertLessEqual(iterations.max(), 3)
+
+    def test_pipe_fric_dp_array(self):
+        m_dot = np.array([-400.0, 0.0, 200.0])
+        dp, f = pipe_fric_dp(epsilon=0.002e-3, d=0.41, depth=1400.0, m_dot=m_dot, rho=150.0, mu=2.0e-5)
+        self.assertEqual(dp[1], 0.0)
+        for i in [0, 2]:
+            dp_scalar, f_scalar = pipe_fric_dp(epsilon=0.002e-3, d=0.41, depth=1400.0, m_dot=m_dot[i], rho=150.0,
+                                               mu=2.0e-5)
+            self.assertAlmostEqual(dp[i], dp_scalar, places=12)
+
+
+class TestArrayInputs(unittest.TestCase):
+
+    def test_aquifer_dp(self):
+        Q = np.array([0.5, 1.0, 1.0e4])
+        k = np.array([10.0, 100.0, 0.01])
+        dp = aquifer_dp(Q=Q, k=k)
+        self.assertEqual(dp[2], 1e12)
+        for i in range(2):
+            self.assertAlmostEqual(dp[i], aquifer_dp(Q=Q[i], k=k[i]), places=12)
+
+    def test_pipe_grav_dp(self):
+        m_dot = np.array([-10.0, 0.0, 10.0])
+        dp = pipe_grav_dp(m_dot=m_dot, rho=150.0, z=1000.0)
+        for i in range(3):
+            self.assertEqual(dp[i], pipe_grav_dp(m_dot=m_dot[i], rho=150.0, z=1000.0))
+
+    def test_pipe_heat_transfer(self):
+        m_dot = np.array([-300.0, 100.0, 300.0])
+        Tm = np.array([280.0, 320.0, 350.0])
+        for function in [pipe_heat_transfer_subsurface, pipe_heat_transfer_ocean]:
+            delta_T = function(Tm=Tm, Ts=300.0, m_dot=m_dot)
+            for i in range(3):
+                self.assertAlmostEqual(delta_T[i], function(Tm=Tm[i], Ts=300.0, m_dot=m_dot[i]), places=12)
+
+
+class TestWellboreThermalModel(unittest.TestCase):
+
+    def test_functions(self):
+        # same temperature changes as the pipe heat transfer functions, sections in the direction of flow
+        wellbore = WellboreThermalModel(T_sub=300.0, T_ocean=290.0)
+        for Tm, m_dot in [(280.0, 300.0), (350.0, 100.0), (310.0, -200.0)]:
+            dT_ocean, dT_sub = wellbore.delta_T(Tm=Tm, m_dot=m_dot)
+            if m_dot > 0.0:
+                self.assertAlmostEqual(dT_ocean, pipe_heat_transfer_ocean(Tm=Tm, Ts=290.0, m_dot=m_dot), places=10)
+                self.assertAlmostEqual(dT_sub, pipe_heat_transfer_subsurface(Tm=Tm - dT_ocean, Ts=300.0, m_dot=m_dot),
+                                       places=10)
+            else:
+                self.assertAlmostEqual(dT_sub, pipe_heat_transfer_subsurface(Tm=Tm, Ts=300.0, m_dot=m_dot), places=10)
+                self.assertAlmostEqual(dT_ocean, pipe_heat_transfer_ocean(Tm=Tm - dT_sub, Ts=290.0, m_dot=m_dot),
+                                       places=10)
+
+            dT_ocean_array, dT_sub_array = wellbore.delta_T_array(np.array([Tm]), np.array([m_dot]), 0.033242, 169.11,
+                                                                  21.492e-6, 0.79960, 1236.8, injection=m_dot > 0.0)
+            self.assertAlmostEqual(dT_ocean_array[0], dT_ocean, places=12)
+            self.assertAlmostEqual(dT_sub_array[0], dT_sub, places=12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import numpy as np
+from caes.recorder import TimeSeriesRecorder, SummaryRecorder
+
+
+class TestTimeSeriesRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.recorder = TimeSeriesRecorder(['time', 'pwr', 'error_msg'], capacity=2)
+        for i in range(5):
+            s = self.recorder.new_row()
+            s['time'] = float(i)
+            s['pwr'] = s['pwr'] + 10.0 * i
+            if i == 3:
+                s['error_msg'] = 'Error'
+                s['extra'] = 1.0
+
+    def test_grows(self):
+        self.assertEqual(len(self.recorder), 5)
+        self.assertEqual(self.recorder.capacity, 8)
+
+    def test_column(self):
+        np.testing.assert_array_equal(self.recorder.column('pwr'), [0.0, 10.0, 20.0, 30.0, 40.0])
+
+    def test_dataframe(self):
+        df = self.recorder.to_dataframe()
+        self.assertEqual(list(df.columns), ['time', 'pwr', 'error_msg', 'extra'])
+        self.assertEqual(df.loc[3, 'error_msg'], 'Error')
+        self.assertEqual(df.loc[0, 'error_msg'], '')
+        self.assertTrue(np.isnan(df.loc[4, 'extra']))
+        self.assertEqual(df.loc[3, 'extra'], 1.0)
+
+    def test_set_block(self):
+        # entries written together keep their history when the recorder grows
+        recorder = TimeSeriesRecorder(['time', 'w0', 'w1'], capacity=2)
+        for i in range(5):
+            s = recorder.new_row()
+            s['time'] = float(i)
+            recorder.set_block(s, ('w0', 'w1'), [float(i), 2.0 * i])
+        np.testing.assert_array_equal(recorder.column('w1'), [0.0, 2.0, 4.0, 6.0, 8.0])
+        self.assertEqual(recorder.to_dataframe().loc[4, 'w0'], 4.0)
+
+
+class TestSummaryRecorder(unittest.TestCase):
+
+    def setUp(self):
+        attributes = ['m_air', 'pwr', 'error_msg']
+        self.recorders = [TimeSeriesRecorder(attributes), SummaryRecorder(attributes, weights=('m_air',))]
+        for recorder in self.recorders:
+            for m_air, pwr in zip([0.0, 2.0, 2.0, -1.0, -1.0, -1.0], [0.0, -5.0, -7.0, 3.0, 4.0, 5.0]):
+                s = recorder.new_row()
+                s['m_air'] = m_air
+                s['pwr'] = pwr
+            s['error_msg'] = 'Error'
+
+    def test_total(self):
+        for recorder in self.recorders:
+            self.assertAlmostEqual(recorder.total('pwr'), 0.0)
+
+    def test_mean(self):
+        for recorder in self.recorders:
+            self.assertAlmostEqual(recorder.mean('pwr', 'charge'), -6.0)
+            self.assertAlmostEqual(recorder.mean('pwr', 'discharge'), 4.0)
+            self.assertAlmostEqual(recorder.mean('pwr', 'flow'), 0.0)
+
+    def test_weighted_mean(self):
+        for recorder in self.recorders:
+            self.assertAlmostEqual(recorder.mean('pwr', 'charge', weights='m_air'), -6.0)
+            self.assertAlmostEqual(recorder.mean('pwr', 'flow', weights='m_air'), -12.0 / 7.0)
+        with self.assertRaises(ValueError):
+            self.recorders[1].mean('pwr', 'flow', weights='pwr')
+
+    def test_unique(self):
+        for recorder in self.recorders:
+            self.assertEqual(recorder.unique('error_msg'), {'', 'Error'})
+
+    def test_no_dataframe(self):
+        with self.assertRaises(ValueError):
+            self.recorders[1].to_dataframe()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import os
+import tempfile
+from caes import ICAES2, ResultCache, cached_performance
+from caes.result_cache import inputs_key
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.inputs = ICAES2.get_default_inputs()
+        self.inputs['steps'] = 10
+
+    def test_memory(self):
+        cache = ResultCache(maxsize=2)
+        results = cached_performance(self.inputs, ICAES2, cache)
+        results['RTE'] = -1.0  # results returned are copies
+        again = cached_performance(self.inputs, ICAES2, cache)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertGreater(again['RTE'], 0.0)
+
+        # a different input is a different system
+        self.inputs['m_dot'] = self.inputs['m_dot'] * 1.01
+        self.assertNotEqual(inputs_key(self.inputs, ICAES2), inputs_key(ICAES2.get_default_inputs(), ICAES2))
+        self.inputs['debug'] = not self.inputs['debug']  # ignored
+        key = inputs_key(self.inputs, ICAES2)
+        self.inputs['debug'] = not self.inputs['debug']
+        self.assertEqual(key, inputs_key(self.inputs, ICAES2))
+        self.inputs['record'] = 'summary'  # not ignored
+        self.assertNotEqual(key, inputs_key(self.inputs, ICAES2))
+
+    def test_disk(self):
+        with tempfile.TemporaryDirectory() as directory:
+            results = cached_performance(self.inputs, ICAES2, ResultCache(directory=directory))
+            cache = ResultCache(directory=directory)  # e.g. another process
+            again = cached_performance(self.inputs, ICAES2, cache)
+            self.assertEqual(cache.hits, 1)
+            self.assertEqual(again['RTE'], results['RTE'])
+
+            # files beyond max_bytes are removed
+            cache = ResultCache(directory=directory, max_bytes=0)
+            self.inputs['m_dot'] = self.inputs['m_dot'] * 1.01
+            cached_performance(self.inputs, ICAES2, cache)
+            self.assertEqual(len(os.listdir(directory)), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
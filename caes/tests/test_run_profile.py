@@ -0,0 +1,40 @@
+import unittest
+import numpy as np
+import pandas as pd
+from caes import ICAES2
+
+
+class TestRunProfile(unittest.TestCase):
+
+    def setUp(self):
+        self.inputs = ICAES2.get_default_inputs()
+        self.inputs['record'] = 'summary'
+        system = ICAES2(inputs=self.inputs)
+        # two days of 12 hours charging and 12 hours discharging, more than the storage holds
+        hours = pd.date_range('2020-01-01', periods=48, freq='H')
+        self.m_dot = pd.Series(np.where(hours.hour < 12, 1.0, -1.0) * system.m_dot, index=hours)
+
+    def test_limits(self):
+        system = ICAES2(inputs=self.inputs)
+        df = system.run_profile(self.m_dot)
+        self.assertTrue(df.index.equals(self.m_dot.index))
+        self.assertEqual(system.time, 48.0)
+        self.assertLess(df['m_dot'].abs().min(), system.m_dot)  # flow limited once the storage is full/empty
+        self.assertGreaterEqual(df['m_store'].min(), system.m_store_min * (1 - 1e-9))
+        self.assertLessEqual(df['p_store'].max(), system.p_store_max)
+        results = system.analyze_performance()
+        self.assertEqual(results['errors'], 'false')
+        self.assertAlmostEqual(results['kWh_out'] / df['energy_out'].sum(), 1.0, places=9)
+
+    def test_state_carried(self):
+        # one profile gives the same results as its two halves run one after the other
+        system = ICAES2(inputs=self.inputs)
+        df = system.run_profile(self.m_dot.to_numpy(), dt_series=1.0)
+        system = ICAES2(inputs=self.inputs)
+        halves = pd.concat([system.run_profile(self.m_dot.iloc[:24].to_numpy()),
+                            system.run_profile(self.m_dot.iloc[24:].to_numpy())], ignore_index=True)
+        np.testing.assert_allclose(halves.to_numpy(), df.to_numpy())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+import numpy as np
+from caes import sensitivity
+
+
+class TestSensitivity(unittest.TestCase):
+
+    def setUp(self):
+        self.bounds = {'a': (0.0, 1.0), 'b': (0.0, 1.0), 'c': (0.0, 1.0)}
+
+    def test_morris(self):
+        samples = sensitivity.morris_sample(self.bounds, trajectories=20, seed=0)
+        self.assertEqual(samples.shape, (20 * 4, 3))
+        y = 4.0 * samples['a'] - 2.0 * samples['b']  # linear, c has no effect
+        indices = sensitivity.morris_indices(self.bounds, samples, y)
+        np.testing.assert_allclose(indices['mu'], [4.0, -2.0, 0.0], atol=1e-12)
+        np.testing.assert_allclose(indices['mu_star'], [4.0, 2.0, 0.0], atol=1e-12)
+        np.testing.assert_allclose(indices['sigma'], [0.0, 0.0, 0.0], atol=1e-12)
+
+    def test_sobol(self):
+        samples = sensitivity.saltelli_sample(self.bounds, n=1024, seed=0)
+        self.assertEqual(samples.shape, (1024 * 5, 3))
+        y = samples['a'] + samples['b'] * samples['c']  # b and c interact
+        indices = sensitivity.sobol_indices(self.bounds, y, seed=0)
+        # exact: var(y) = 1/12 + 7/144, S1 = [1/12, 1/48, 1/48] / var, ST = [1/12, 7/144 - 1/48, 7/144 - 1/48] / var
+        var = 1.0 / 12.0 + 7.0 / 144.0
+        np.testing.assert_allclose(indices['S1'], np.array([1.0 / 12.0, 1.0 / 48.0, 1.0 / 48.0]) / var, atol=0.03)
+        np.testing.assert_allclose(indices['ST'], np.array([1.0 / 12.0, 1.0 / 36.0, 1.0 / 36.0]) / var, atol=0.03)
+
+    def test_model(self):
+        bounds = {'m_dot': (150.0, 250.0), 'loss_m_air': (0.0, 0.1)}
+        indices, results = sensitivity.morris(bounds, trajectories=2, outputs=['RTE'], seed=0,
+                                              base_inputs={'steps': 10})
+        self.assertEqual(len(results), 6)
+        self.assertLess(indices.loc['loss_m_air', 'RTE_mu'], 0.0)  # air leakage lowers RTE
+
+
+if __name__ == '__main__':
+    unittest.main()
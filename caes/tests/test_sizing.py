@@ -0,0 +1,42 @@
+import unittest
+import pandas as pd
+from caes import ICAES2, size_system, size_sites
+
+
+def site_inputs(site):
+    inputs = ICAES2.get_default_inputs()
+    inputs['steps'] = 20.0
+    inputs['depth'] = site['depth_m']
+    inputs['h'] = site['thickness_m']
+    return inputs
+
+
+class TestSizeSystem(unittest.TestCase):
+
+    def test_converges(self):
+        inputs = ICAES2.get_default_inputs()
+        inputs['steps'] = 20.0
+        results = size_system(200.0, 24.0, inputs, cls=ICAES2)
+
+        self.assertTrue(results['converged'])
+        self.assertLess(results['iterations'], 15)
+        self.assertAlmostEqual(results['kW_out_avg'] / 200.0e3, 1.0, places=5)
+        self.assertAlmostEqual(results['kWh_out'] / 4800.0e3, 1.0, places=5)
+
+
+class TestSizeSites(unittest.TestCase):
+
+    def test_warm_start(self):
+        sites = pd.DataFrame({'X (m)': [0.0, 1000.0, 2000.0], 'Y (m)': [0.0, 0.0, 0.0],
+                              'depth_m': [1400.0, 1450.0, 1500.0], 'thickness_m': [60.0, 62.0, 64.0],
+                              'capacity_MW': [200.0, 200.0, 200.0], 'duration_hr': [24.0, 24.0, 24.0]})
+        results = size_sites(sites, site_inputs, cls=ICAES2)
+
+        self.assertTrue(results['converged'].all())
+        self.assertEqual(results['seed_site'].isna().sum(), 1)
+        seeded = results[results['seed_site'].notna()]
+        self.assertLess(seeded['iterations'].max(), results['iterations'].max())
+
+
+if __name__ == '__main__':
+    unittest.main()
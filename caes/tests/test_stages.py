@@ -0,0 +1,93 @@
+import unittest
+import numpy as np
+import pandas as pd
+from caes import ICAES, ICAES2, ICAES2Batch
+from caes.stages import free_pressure_ratios, polytropic_stages, Stages
+
+
+class TestStages(unittest.TestCase):
+
+    def test_free_pressure_ratios(self):
+        PR = np.array([4.0, 4.0, 4.0])
+        np.testing.assert_allclose(free_pressure_ratios(0.1, 3.2, PR, np.cumprod(PR)), [4.0, 4.0, 2.0])
+        np.testing.assert_allclose(free_pressure_ratios(0.1, 1.0, PR, np.cumprod(PR)), [4.0, 2.5, 1.0])
+        np.testing.assert_allclose(free_pressure_ratios(1.0, 0.1, PR, np.cumprod(PR), expansion=True), [4.0, 2.5, 1.0])
+        # systems along a leading axis
+        PR = np.array([[4.0, 4.0, 4.0], [2.0, 3.0, 4.0]])
+        np.testing.assert_allclose(free_pressure_ratios(np.array([0.1, 0.1]), np.array([1.0, 3.2]), PR,
+                                                        np.cumprod(PR, axis=-1)), [[4.0, 2.5, 1.0], [2.0, 3.0, 4.0]])
+
+    def test_polytropic_stages(self):
+        # two stages with a 10 % pressure drop between them
+        p_in, T_in, p_out, T_out = polytropic_stages(0.1, 300.0, np.array([2.0, 3.0]), np.array([0.1, 0.0]),
+                                                     np.array([0.1, 0.2]))
+        np.testing.assert_allclose(p_in, [0.1, 0.18])
+        np.testing.assert_allclose(p_out, [0.2, 0.54])
+        np.testing.assert_allclose(T_in, [300.0, 300.0 * 2.0 ** 0.1])
+        np.testing.assert_allclose(T_out, [300.0 * 2.0 ** 0.1, 300.0 * 2.0 ** 0.1 * 3.0 ** 0.2])
+
+        # systems along a leading axis, each matching a single system
+        p_in = np.array([0.1, 1.0])
+        T_in = np.array([300.0, 400.0])
+        PRs = np.array([[2.0, 3.0], [3.0, 1.5]])
+        delta_p = np.array([[0.1, 0.0], [0.05, 0.0]])
+        exponent = np.array([[0.1, 0.2], [0.15, 0.1]])
+        for expansion in [False, True]:
+            states = polytropic_stages(p_in, T_in, PRs, delta_p, exponent, expansion)
+            for i in range(2):
+                np.testing.assert_allclose([values[i] for values in states],
+                                           polytropic_stages(p_in[i], T_in[i], PRs[i], delta_p[i], exponent[i],
+                                                             expansion), rtol=1e-14)
+
+    def test_scalar_path(self):
+        # the Python float path for short machines matches the NumPy path
+        for expansion in [False, True]:
+            stages = Stages(np.array([3.0, 2.5, 2.0]), np.array([0.02, 0.01, 0.0]), np.array([0.1, 0.15, 0.2]),
+                            np.array([2.0, 2.1, 2.2]), expansion=expansion)
+            p_in, p_out = (1.0, 0.1) if expansion else (0.1, 1.0)
+            results = []
+            for scalar in [True, False]:
+                stages.scalar = scalar
+                PRs = stages.free_pressure_ratios(p_in, p_out)
+                states = stages.states(p_in, 300.0, PRs)
+                results.append([PRs] + list(states) + [stages.work(states[1], states[3])])
+            np.testing.assert_allclose(results[0], results[1], rtol=1e-14)
+
+    def test_array_inputs(self):
+        # array inputs give the same results as the numbered inputs
+        numbered = ICAES2.get_default_inputs()
+        numbered['n_cmp2'] = 1.2
+        numbered['delta_p_cmp12'] = 0.02
+        numbered['steps'] = 10
+        arrays = ICAES2.get_default_inputs()
+        arrays['n_cmp'] = [1.1, 1.2]
+        arrays['delta_p_cmp'] = [0.02]
+        arrays['steps'] = 10
+        results = []
+        for inputs in [numbered, arrays]:
+            system = ICAES2(inputs=inputs)
+            system.single_cycle()
+            results.append(system.analyze_performance())
+        self.assertEqual(results[0]['RTE'], results[1]['RTE'])
+
+        # any number of stages, also in a batch
+        arrays['n_cmp'] = [1.1] * 7
+        arrays['n_exp'] = [1.1] * 6
+        arrays['record'] = 'summary'
+        system = ICAES2(inputs=arrays)
+        system.single_cycle()
+        self.assertEqual(len(system.PR_cmp), 7)
+        self.assertIn('exp_w_stg5', system.attributes_time_series)
+        batch = ICAES2Batch(pd.DataFrame({'n_cmp': [[1.1] * 7], 'n_exp': [[1.1] * 6], 'delta_p_cmp': [[0.02]],
+                                          'steps': [10]}),
+                            property_backend='HEOS')
+        batch.single_cycle()
+        self.assertAlmostEqual(batch.analyze_performance().loc[0, 'RTE'], system.analyze_performance()['RTE'], places=9)
+
+        inputs = ICAES.get_default_inputs()
+        inputs['ML_cmp'] = [2.0, 1.5, 1.0, 0.5, 0.5, 0.5]
+        self.assertEqual(ICAES(inputs=inputs).n_stages_cmp, 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import numpy as np
+import pandas as pd
+from caes.surrogate import PolynomialSurrogate, train_surrogate, multi_indices
+
+# inputs of every call to quadratic
+calls = []
+
+
+def quadratic(inputs):
+    calls.append(len(inputs))
+    return pd.DataFrame({'y': 1.0 + inputs['a'] * inputs['b'] - 2.0 * np.log10(inputs['k']) ** 2}, index=inputs.index)
+
+
+class TestSurrogate(unittest.TestCase):
+
+    def test_multi_indices(self):
+        terms = multi_indices(3, 2)
+        self.assertEqual(len(terms), 10)
+        self.assertTrue((terms.sum(axis=1) <= 2).all())
+        self.assertTrue((terms[0] == 0).all())
+
+    def test_train(self):
+        del calls[:]
+        bounds = {'a': (0.0, 2.0), 'b': (-1.0, 1.0), 'k': (1.0, 1000.0)}
+        surrogate = train_surrogate(quadratic, bounds, n=40, seed=0, degree=2, log_inputs=['k'])
+        self.assertEqual(calls, [40])
+        self.assertLess(surrogate.cv.loc['y', 'nrmse'], 1e-10)  # exact, quadratic in a, b and log10(k)
+
+        # inside the training region the polynomial is used, outside the model is run
+        queries = pd.DataFrame({'a': [0.5, 1.0, 5.0], 'b': [0.0, 0.5, 0.0], 'k': [10.0, 100.0, 10.0]})
+        results = surrogate.evaluate(queries)
+        self.assertEqual(results['surrogate'].tolist(), [True, True, False])
+        self.assertEqual(calls, [40, 1])
+        np.testing.assert_allclose(results['y'], quadratic(queries)['y'], atol=1e-9)
+
+    def test_convex_hull(self):
+        inputs = pd.DataFrame({'a': [0.0, 1.0, 0.0, 0.5], 'b': [0.0, 0.0, 1.0, 0.2]})
+        outputs = pd.DataFrame({'y': inputs['a'] + inputs['b']})
+        surrogate = PolynomialSurrogate(inputs, outputs, degree=1, folds=0, hull='convex')
+        queries = pd.DataFrame({'a': [0.2, 0.9], 'b': [0.2, 0.9]})  # both inside the box, only the first in the hull
+        self.assertEqual(surrogate.in_hull(queries).tolist(), [True, False])
+
+        # without a model the polynomial is used everywhere, queries outside the hull are flagged
+        results = surrogate.evaluate(queries)
+        self.assertEqual(results['surrogate'].tolist(), [True, True])
+        self.assertEqual(results['extrapolated'].tolist(), [False, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
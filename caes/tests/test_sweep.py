@@ -0,0 +1,96 @@
+import unittest
+import os
+import tempfile
+import pandas as pd
+from caes import ICAES2, sweep
+
+
+def single_cycle(sweep_input, steps=20):
+    # single cycle of ICAES2, returns inputs and RTE
+    inputs = ICAES2.get_default_inputs()
+    inputs['steps'] = steps
+    inputs['record'] = 'summary'
+    inputs['m_dot'] = sweep_input['m_dot']
+    system = ICAES2(inputs=inputs)
+    system.single_cycle()
+    results = system.analyze_performance()
+    return pd.Series({'m_dot': sweep_input['m_dot'], 'RTE': results['RTE'], 'case': sweep_input['case']})
+
+
+# rows evaluated by count_cases, the row with case == stop raises an error
+evaluated = []
+
+
+def count_cases(sweep_input, stop=None):
+    if sweep_input['case'] == stop:
+        raise RuntimeError('stopped')
+    evaluated.append(sweep_input['case'])
+    return pd.Series({'case': sweep_input['case'], 'result': 2.0 * sweep_input['m_dot']})
+
+
+def site_sample(site, n, rng):
+    # normally distributed inputs, the spread is set by each site
+    return pd.DataFrame({'x': rng.normal(loc=1.0, scale=site['spread'], size=n)})
+
+
+def batch_output(inputs):
+    return pd.DataFrame({'RTE': inputs['x']}, index=inputs.index)
+
+
+class TestSweep(unittest.TestCase):
+
+    def test_run(self):
+        inputs = pd.DataFrame({'m_dot': [50.0, 100.0, 150.0, 200.0, 250.0], 'case': list('abcde')},
+                              index=[10, 11, 12, 13, 14])
+        serial = sweep.run(single_cycle, inputs, n_jobs=1, steps=10)
+        parallel = sweep.run(single_cycle, inputs, n_jobs=2, chunksize=2, steps=10)
+        pd.testing.assert_frame_equal(serial, parallel)
+        self.assertEqual(serial.index.tolist(), inputs.index.tolist())
+        self.assertEqual(serial['case'].tolist(), list('abcde'))
+        self.assertEqual(serial['RTE'].dtype, float)
+
+    def test_checkpoint(self):
+        # a stopped sweep is resumed without evaluating the completed cases again
+        inputs = pd.DataFrame({'m_dot': [50.0, 100.0, 150.0, 200.0, 250.0], 'case': list('abcde')})
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = os.path.join(directory, 'checkpoint.sqlite')
+            del evaluated[:]
+            with self.assertRaises(RuntimeError):
+                sweep.run(count_cases, inputs, n_jobs=1, chunksize=2, checkpoint=checkpoint, stop='d')
+            self.assertEqual(evaluated, list('abc'))
+
+            del evaluated[:]
+            results = sweep.run(count_cases, inputs, n_jobs=1, chunksize=2, checkpoint=checkpoint)
+            self.assertEqual(evaluated, list('cde'))  # the chunk with the error (c, d) is repeated
+            self.assertEqual(results['result'].tolist(), [100.0, 200.0, 300.0, 400.0, 500.0])
+
+            # inputs read back from a csv file match the stored cases
+            inputs.to_csv(os.path.join(directory, 'inputs.csv'))
+            del evaluated[:]
+            sweep.run(count_cases, pd.read_csv(os.path.join(directory, 'inputs.csv'), index_col=0), n_jobs=1,
+                      checkpoint=checkpoint)
+            self.assertEqual(evaluated, [])
+
+    def test_run_adaptive(self):
+        sites = pd.DataFrame({'spread': [0.01, 0.05]}, index=['narrow', 'wide'])
+        results, summary = sweep.run_adaptive(batch_output, site_sample, sites, outputs=['RTE'], tol=0.01,
+                                              batch_size=20, min_samples=40, max_samples=2000, seed=0, batched=True)
+        # the wide site needs more samples to converge
+        self.assertTrue(summary['converged'].all())
+        self.assertEqual(summary.loc['narrow', 'n'], 40)
+        self.assertGreater(summary.loc['wide', 'n'], 40)
+        self.assertEqual(len(results), summary['n'].sum())
+        self.assertLessEqual(summary.loc['wide', 'RTE_mean_hw'], 0.01 * summary.loc['wide', 'RTE_mean'])
+
+        # same seed, same results
+        again, _ = sweep.run_adaptive(batch_output, site_sample, sites, outputs=['RTE'], tol=0.01, seed=0,
+                                      batched=True, max_samples=2000)
+        pd.testing.assert_frame_equal(results, again)
+
+    def test_get_n_jobs(self):
+        self.assertEqual(sweep.get_n_jobs(3), 3)
+        self.assertGreaterEqual(sweep.get_n_jobs(-1), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+import numpy as np
+from caes import size_caes_trb
+
+
+class TestSizeCaesTrb(unittest.TestCase):
+
+    def test_array(self):
+        # sizing several operating points in one call is the same as sizing each separately
+        m_dot = np.array([1.0, 10.0, 100.0])
+        p_in = np.array([100.0, 50.0, 100.0])
+        designs = size_caes_trb(p_in=p_in, t_in=25.0, t_out=25.0, m_dot=m_dot, RPM_low=900, RPM_high=30000,
+                                RPM_cases=12)
+        self.assertGreater(len(designs), 0)
+        for i in range(3):
+            design = size_caes_trb(p_in=p_in[i], t_in=25.0, t_out=25.0, m_dot=m_dot[i], RPM_low=900, RPM_high=30000,
+                                   RPM_cases=12)
+            point = designs[designs['point'] == i]
+            self.assertEqual(len(point), len(design))
+            np.testing.assert_allclose(point['D'].to_numpy(), design['D'].to_numpy(), rtol=1e-12)
+            self.assertEqual(point['type'].tolist(), design['type'].tolist())
+
+    def test_classification(self):
+        # the expander chart spans radial, mixed and axial designs
+        designs = size_caes_trb(p_in=50.0, t_in=25.0, t_out=25.0, m_dot=10.0, RPM_low=900, RPM_high=30000,
+                                RPM_cases=12)
+        self.assertEqual(set(designs['type']), {'Radial', 'Mixed', 'Axial'})
+        self.assertTrue((designs.loc[designs['type'] == 'Radial', 'Ns'] < 0.52).all())
+        self.assertTrue((designs.loc[designs['type'] == 'Axial', 'Ns'] > 0.65).all())
+
+    def test_piston(self):
+        designs = size_caes_trb(piston=True)
+        self.assertEqual(len(designs), 0)
+        self.assertIn('type', designs.columns)
+
+
+if __name__ == '__main__':
+    unittest.main()
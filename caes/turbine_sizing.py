@@ -5,51 +5,109 @@ import pandas as pd
 import numpy as np
 import math
 
+# sizing rules and specific speed chart inputs of each machine type, piston expanders do not have a chart
+TRB_MAPS = {
+    'piston': {
+        'PR_stg_min': 1.5,
+        'PR_stg_max': 10.0,
+        'Ns': np.array([]),
+        'Ds': np.array([]),
+        'eff': np.array([]),
+    },
+    'radial-mixed-axial': {
+        'PR_stg_min': 1.5,
+        'PR_stg_max': 3.6,
+        'Ns': np.array([0.133572762, 0.212011551, 0.512807173, 0.654492961, 0.846899073, 1.025182722]),
+        'Ds': np.array([10.09832427, 7.420479838, 3.489818315, 3.010946394, 2.563377933, 2.212805889]),
+        'eff': np.array([0.7, 0.8, 0.9, 0.9, 0.8, 0.7]),
+        # for classification, the peak efficiency range of the chart (Ns 0.51 to 0.65) is mixed flow, radial inflow
+        # turbines are below it and axial turbines above it
+        'Ns_radial': 0.512807173,  # less than this is radial
+        'Ns_axial': 0.654492961,  # more than this is axial, remainer is mixed
+    },
+}
+
+# columns of size_caes_trb results
+TRB_VARIABLES = ['point', 'p_in', 't_in', 't_out', 'p_out', 'm_dot', 'V3', 'Nstg', 'PR_stg', 'RPM', 'H_ad',
+                 'g', 'Ns', 'Ds', 'D', 'eff', 'type']
 
-def size_caes_trb(p_in=1.01325, t_in=400.0, t_out=20.0, p_out=1.01325, m_dot=2.2, RPM_low=10000, RPM_high=50000,
-                 RPM_cases=5, piston=False, debug=False):
+# interpolants of the specific speed charts, created once per machine type
+_trb_interpolants = {}
+
+
+def trb_interpolants(machine_type):
+    """
+    interpolants of the specific speed chart of a machine type, cached
+    :param machine_type: key of TRB_MAPS
+    :return f_Ds: specific diameter as a function of specific speed
+    :return f_eff: efficiency as a function of specific speed
+    """
+    if machine_type not in _trb_interpolants:
+        chart = TRB_MAPS[machine_type]
+        _trb_interpolants[machine_type] = (interp1d(chart['Ns'], chart['Ds']), interp1d(chart['Ns'], chart['eff']))
+    return _trb_interpolants[machine_type]
+
+
+def classify_trb(Ns, piston=False):
+    """
+    machine type of each design
+    :param Ns: specific speed [-], NumPy array
+    :param piston: True - piston expanders, False - radial/mixed/axial expanders
+    :return: NumPy array of 'Piston', 'Radial', 'Mixed' or 'Axial'
+    """
     if piston:
-        # Sizing Rules
-        PR_stg_min = 1.5
-        PR_stg_max = 10.0
-
-        # Specific Speed Chart Inputs
-        Ns_ideal = np.array([])
-        Ds_ideal = np.array([])
-        eff_ideal = np.array([])
-
-    else:  # radial/mixed/axial
-
-        # Sizing Rules
-        PR_stg_min = 1.5
-        PR_stg_max = 3.6
+        return np.full(np.shape(Ns), 'Piston', dtype=object)
+    chart = TRB_MAPS['radial-mixed-axial']
+    types = np.where(Ns < chart['Ns_radial'], 'Radial', np.where(chart['Ns_axial'] < Ns, 'Axial', 'Mixed'))
+    return types.astype(object)
 
-        # Specific Speed Chart Inputs
-        Ns_ideal = np.array([0.133572762, 0.212011551, 0.512807173, 0.654492961, 0.846899073, 1.025182722])
-        Ds_ideal = np.array([10.09832427, 7.420479838, 3.489818315, 3.010946394, 2.563377933, 2.212805889])
-        eff_ideal = np.array([0.7, 0.8, 0.9, 0.9, 0.8, 0.7])
 
-    # Convert Inputs
+def size_caes_trb(p_in=1.01325, t_in=400.0, t_out=20.0, p_out=1.01325, m_dot=2.2, RPM_low=10000, RPM_high=50000,
+                  RPM_cases=5, piston=False, debug=False):
+    """
+    Sizes expanders using specific speed charts, every operating point, number of stages and RPM is evaluated at once
+
+    p_in, t_in, t_out, p_out and m_dot may be NumPy arrays (broadcast together), each element is an operating point
+
+    :param p_in: inlet pressure [bar]
+    :param t_in: inlet temperature [C]
+    :param t_out: outlet temperature [C]
+    :param p_out: outlet pressure [bar]
+    :param m_dot: mass flow rate [kg/s]
+    :param RPM_low: lowest speed considered [rev/min]
+    :param RPM_high: highest speed considered [rev/min]
+    :param RPM_cases: number of speeds considered [-]
+    :param piston: True - piston expanders (no specific speed chart is available, no designs are returned),
+        False - radial/mixed/axial expanders
+    :param debug: debug option [Boolean]
+    :return: DataFrame with columns TRB_VARIABLES, one row per feasible design (specific speed within the chart), the
+        column point is the position of the operating point (0 for scalar inputs)
+    """
+    machine_type = 'piston' if piston else 'radial-mixed-axial'
+    chart = TRB_MAPS[machine_type]
+    Ns_ideal = chart['Ns']
+    if len(Ns_ideal) == 0:
+        print('Warning - no specific speed chart for ' + machine_type + ' expanders, no designs sized')
+        return pd.DataFrame(columns=TRB_VARIABLES)
+    f_Ds, f_eff = trb_interpolants(machine_type)
+
+    # Convert Inputs, one entry per operating point
+    p_in, t_in, t_out, p_out, m_dot = np.broadcast_arrays(*[np.atleast_1d(np.asarray(x, dtype=float))
+                                                            for x in (p_in, t_in, t_out, p_out, m_dot)])
     p_in = p_in * 1E5  # from bar to Pa
     t_in = t_in + 273.15  # from C to K
     t_out = t_out + 273.15  # from C to K
     p_out = p_out * 1E5  # from bar to Pa
 
-    # Interpolate Specific Speed Chart Inputs
-    f_Ds = interp1d(Ns_ideal, Ds_ideal)
-    f_eff = interp1d(Ns_ideal, eff_ideal)
-
-    # Determine range of stages to consider
+    # Determine range of stages to consider for each operating point
     PR = p_in / p_out
-    Nstg_low = math.ceil(math.log(PR) / math.log(PR_stg_max))
-    Nstg_high = math.floor(math.log(PR) / math.log(PR_stg_min))
-    Nstgs = np.arange(Nstg_low, Nstg_high, 1)
-    if len(Nstgs) == 0:
-        Nstgs = [Nstg_low]
+    Nstg_low = np.ceil(np.log(PR) / math.log(chart['PR_stg_max'])).astype(int)
+    Nstg_high = np.floor(np.log(PR) / math.log(chart['PR_stg_min'])).astype(int)
+    Nstgs = np.arange(Nstg_low.min(), max(Nstg_high.max(), Nstg_low.max() + 1), 1)
     if debug:
         print('Range of Stages Considered')
-        print('Nstg_low  :' + str(round(Nstg_low, 0)))
-        print('Nstg_high :' + str(round(Nstg_high, 0)))
+        print('Nstg_low  :' + str(Nstg_low))
+        print('Nstg_high :' + str(Nstg_high))
         print('Nstgs     :' + str(Nstgs) + '\n')
 
     # RPMs to consider
@@ -71,87 +129,54 @@ def size_caes_trb(p_in=1.01325, t_in=400.0, t_out=20.0, p_out=1.01325, m_dot=2.2
     if debug:
         print('Constants and Fluid Properties:')
         print('g     :' + str(round(g, 3)) + ' (m/s^2)')
-        print('CP    :' + str(round(CP, 3)) + ' (kJ/kg-K)')
-        print('CV    :' + str(round(CV, 3)) + ' (kJ/kg-K)')
-        print('kappa :' + str(round(kappa, 3)) + ' (-)')
+        print('CP    :' + str(np.round(CP, 3)) + ' (kJ/kg-K)')
+        print('CV    :' + str(np.round(CV, 3)) + ' (kJ/kg-K)')
+        print('kappa :' + str(np.round(kappa, 3)) + ' (-)')
         print('MW    :' + str(round(MW, 3)) + ' (kg/kmol)')
         print('R_bar :' + str(round(R_bar, 3)) + ' (kJ/kmol-K)')
         print('R     :' + str(round(R, 3)) + ' (J/kg-K)')
-        print('D3    :' + str(round(D3, 3)) + ' (kg/m^3)')
-        print('V3    :' + str(round(V3, 3)) + ' (m^3/s)\n')
-        print('Begin Cases')
+        print('D3    :' + str(np.round(D3, 3)) + ' (kg/m^3)')
+        print('V3    :' + str(np.round(V3, 3)) + ' (m^3/s)\n')
+
+    # grid of cases, axes are (operating point, Nstg, RPM)
+    point = np.arange(len(PR))[:, None, None]
+    Nstg = Nstgs[None, :, None]
+    RPM = RPMs[None, None, :]
+    omega = 2 * pi / 60.0 * RPM  # rad/s
+    PR, kappa, t_in, V3 = [x[:, None, None] for x in (PR, kappa, t_in, V3)]
+
+    # stages considered, Nstg_low up to (not including) Nstg_high, or only Nstg_low if that range is empty
+    considered = (Nstg >= Nstg_low[:, None, None]) & (
+            (Nstg < Nstg_high[:, None, None]) | (Nstg == Nstg_low[:, None, None]))
+
+    # Balje Calculations (Ideal gas)
+    PR_stg = PR ** (1.0 / Nstg)
+    H_ad = kappa / (kappa - 1.0) * R * t_in * (1.0 - (1.0 / PR_stg) ** ((kappa - 1.0) / kappa))  # kJ/kg
+    Ns = (omega * V3 ** 0.5) / H_ad ** 0.75
+
+    # Check if within the interpolation limits
+    shape = Ns.shape
+    sized = considered & (Ns_ideal.min() <= Ns) & (Ns <= Ns_ideal.max())
+    point, Nstg, PR_stg, RPM, H_ad, Ns, t_in, V3 = [np.broadcast_to(x, shape)[sized] for x in
+                                                    (point, Nstg, PR_stg, RPM, H_ad, Ns, t_in, V3)]
+
+    eff = f_eff(Ns)
+    Ds = f_Ds(Ns)
+    D = (Ds * (V3) ** 0.5) / (g * H_ad) ** 0.25
 
-    # DataFrame to hold results
-    variables = ['p_in', 't_out', 'p_out', 'm_dot', 'V3', 'Nstg', 'PR_stg', 'RPM', 'H_ad',
-                 'g', 'Ns', 'Ds', 'D', 'eff', 'type']
-    df = pd.DataFrame(columns=variables)
-
-    # Perform Runs
-    for Nstg in Nstgs:
-
-        PR_stg = PR ** (1.0 / Nstg)
-
-        for RPM in RPMs:
-
-            # Balje Calculations (Ideal gas)
-            omega = 2 * pi / 60.0 * RPM  # rad/s
-            # omega = RPM
-            H_ad = kappa / (kappa - 1.0) * R * t_in * (1.0 - (1.0 / PR_stg) ** ((kappa - 1.0) / kappa))  # kJ/kg
-            Ns = (omega * V3 ** 0.5) / H_ad ** 0.75
-
-            # Print-out values, if debugging
-            if debug:
-                print('Nstg  :' + str(round(Nstg, 0)) + ' (-)')
-                print('PR_stg:' + str(round(PR_stg, 2)) + ' (-)')
-                print('RPM   :' + str(round(RPM, 0)) + ' (rev/min)')
-                print('omega :' + str(round(omega, 2)) + ' (rad/s)')
-                print('H_ad  :' + str(round(H_ad, 2)) + ' (kJ/kg)')
-                print('Ns    :' + str(round(Ns, 3)) + " (-)\n")
-
-            # Check if within the interpolation limits
-            if Ns_ideal.min() <= Ns <= Ns_ideal.max():
-                eff = f_eff(Ns)
-                Ds = f_Ds(Ns)
-                D = (Ds * (V3) ** 0.5) / (g * H_ad) ** 0.25
-
-                # Classify Machine Type
-                if piston:
-                    machine_type = 'Piston'
-                else:
-                    if Ns < Ns_radial[1]:
-                        machine_type = 'Radial'
-                    elif Ns_axial[0] < Ns:
-                        machine_type = 'Axial'
-                    else:
-                        machine_type = 'Mixed'
-
-                # Print-out values, if debugging
-                if debug:
-                    print("Successfully sized")
-                    print('Ds    :' + str(round(Ds, 3)))
-                    print('D     :' + str(round(D, 3)))
-                    print('eff   :' + str(round(eff, 3)))
-                    print('#================#\n')
-
-                # Save Values
-                s = pd.Series(index=['Nstg', 'PR_stg', 'RPM', 'H_ad', 'g', 'Ns', 'Ds', 'D', 'eff', 'type'])
-                s['Nstg'] = Nstg
-                s['PR_stg'] = PR_stg
-                s['RPM'] = RPM
-                s['H_ad'] = H_ad
-                s['g'] = g
-                s['Ns'] = Ns
-                s['Ds'] = Ds
-                s['D'] = D
-                s['eff'] = eff
-                s['type'] = machine_type
-                df = df.append(s, ignore_index=True)
-
-    # Store Inputs
-    df.loc[:, 'p_in'] = p_in / 1E5  # from Pa back to bar
-    df.loc[:, 't_out'] = t_out - 273.15  # from K back to C
-    df.loc[:, 'p_out'] = p_out / 1E5  # from Pa back to bar
-    df.loc[:, 'm_dot'] = m_dot  # kg/s
-    df.loc[:, 'V3'] = V3  # m3/s
+    if debug:
+        print('Cases evaluated       :' + str(int(considered.sum())))
+        print('Cases sized           :' + str(len(Ns)) + '\n')
+
+    # Store Inputs and results
+    df = pd.DataFrame({'point': point,
+                       'p_in': p_in[point] / 1E5,  # from Pa back to bar
+                       't_in': t_in - 273.15,  # from K back to C
+                       't_out': t_out[point] - 273.15,  # from K back to C
+                       'p_out': p_out[point] / 1E5,  # from Pa back to bar
+                       'm_dot': m_dot[point],  # kg/s
+                       'V3': V3,  # m3/s
+                       'Nstg': Nstg, 'PR_stg': PR_stg, 'RPM': RPM, 'H_ad': H_ad, 'g': g, 'Ns': Ns, 'Ds': Ds, 'D': D,
+                       'eff': eff, 'type': classify_trb(Ns, piston)}, columns=TRB_VARIABLES)
 
     return df
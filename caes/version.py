@@ -0,0 +1,2 @@
+# package version, keep the same as setup.py
+__version__ = '0.0.6'
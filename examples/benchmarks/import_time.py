@@ -0,0 +1,21 @@
+import subprocess
+import sys
+import time
+
+# =====================
+# time to import caes in a new interpreter, as paid by each worker process of a sweep
+# =====================
+statements = ['import numpy, pandas, CoolProp',  # dependencies of a simulation
+              'from caes import ICAES2',
+              'from caes import ICAES2, sweep',
+              'import caes; caes.plot_series']  # loads the plotting libraries
+repeats = 5
+
+if __name__ == '__main__':
+    for statement in statements:
+        times = []
+        for i in range(repeats):
+            start = time.time()
+            subprocess.run([sys.executable, '-c', statement], check=True, stderr=subprocess.DEVNULL)
+            times.append(time.time() - start)
+        print(statement.ljust(40) + ' best of ' + str(repeats) + ': ' + str(round(min(times), 3)) + ' s')
@@ -0,0 +1,28 @@
+import time
+import numpy as np
+from caes import CAES, ICAES, ICAES2
+
+# =====================
+# cost of one CAES.update time step, charging/discharging at the design flow rate
+# =====================
+systems = [CAES, ICAES, ICAES2]
+records = ['timeseries', 'summary']
+steps = 2000  # time steps per repeat, charge then discharge
+repeats = 5
+
+if __name__ == '__main__':
+    for cls in systems:
+        for record in records:
+            times = []
+            for i in range(repeats):
+                inputs = cls.get_default_inputs()
+                inputs['record'] = record
+                system = cls(inputs=inputs)
+                delta_t = (system.m_store_max - system.m_store_min) / 2.0 / steps / (system.m_dot * 3600)  # [hr]
+                m_dots = np.concatenate([np.full(steps // 2, system.m_dot), np.full(steps // 2, -system.m_dot)])
+                start = time.perf_counter()
+                for m_dot in m_dots:
+                    system.update(m_dot=m_dot, delta_t=delta_t)
+                times.append(time.perf_counter() - start)
+            print(cls.__name__.ljust(8) + record.ljust(12) + 'best of ' + str(repeats) + ': ' +
+                  str(round(min(times) / steps * 1e6, 1)) + ' us per step')
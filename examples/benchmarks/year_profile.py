@@ -0,0 +1,29 @@
+import time
+import numpy as np
+import pandas as pd
+from caes import ICAES2
+
+# =====================
+# time to simulate a year of hourly dispatch with run_profile
+# =====================
+records = ['timeseries', 'summary']
+property_backends = ['HEOS', 'table']
+
+if __name__ == '__main__':
+    hours = pd.date_range('2019-01-01', periods=8760, freq='H')
+    for record in records:
+        for property_backend in property_backends:
+            inputs = ICAES2.get_default_inputs()
+            inputs['record'] = record
+            inputs['property_backend'] = property_backend
+            system = ICAES2(inputs=inputs)
+
+            # daily cycle, charge overnight, hold, discharge in the afternoon and evening
+            m_dot = np.where(hours.hour < 8, 1.0, np.where(hours.hour < 14, 0.0, -1.0)) * system.m_dot
+            m_dot = pd.Series(m_dot, index=hours)
+
+            start = time.time()
+            df = system.run_profile(m_dot)
+            results = system.analyze_performance()
+            print(record.ljust(12) + property_backend.ljust(8) + str(round(time.time() - start, 2)) + ' s, RTE ' +
+                  str(round(results['RTE'], 4)) + ', MWh out ' + str(round(df['energy_out'].sum() / 1000.0, 1)))
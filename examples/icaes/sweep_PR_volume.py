@@ -1,7 +1,6 @@
-from caes import ICAES
+from caes import ICAES, sweep
 import pandas as pd
 import numpy as np
-from joblib import Parallel, delayed, parallel_backend
 import os
 import time
 import seaborn as sns
@@ -91,12 +90,7 @@ if __name__ == '__main__':
     n_cases = sweep_inputs.shape[0]
 
     # run each case using parallelization
-    with parallel_backend('multiprocessing', n_jobs=ncpus):
-        output = Parallel(n_jobs=ncpus, verbose=5)(
-            delayed(parameter_sweep)(sweep_inputs.loc[index])
-            for index in
-            range(n_cases))
-    df = pd.DataFrame(output)
+    df = sweep.run(parameter_sweep, sweep_inputs, n_jobs=ncpus, verbose=True)
 
     # ==============
     # plot results
@@ -1,7 +1,6 @@
-from caes import ICAES, plot_series
+from caes import ICAES, plot_series, sweep
 import pandas as pd
 import numpy as np
-from joblib import Parallel, delayed, parallel_backend
 import os
 import time
 import seaborn as sns
@@ -45,6 +44,7 @@ if __name__ == '__main__':
     # user inputs
     # ==============
     savename = "sweep_soln_settings.png"
+    step_tol = 1e-4  # tolerance of the adaptive solver, for comparison with fixed steps [-]
     # ------------------
     # integer inputs
     # ------------------
@@ -93,12 +93,7 @@ if __name__ == '__main__':
     n_cases = sweep_inputs.shape[0]
 
     # run each case using parallelization
-    with parallel_backend('multiprocessing', n_jobs=ncpus):
-        output = Parallel(n_jobs=ncpus, verbose=5)(
-            delayed(parameter_sweep)(sweep_inputs.loc[index])
-            for index in
-            range(n_cases))
-    df = pd.DataFrame(output)
+    df = sweep.run(parameter_sweep, sweep_inputs, n_jobs=ncpus, verbose=True)
 
     # ==============
     # plot results
@@ -114,3 +109,15 @@ if __name__ == '__main__':
     plot_series(df, x_var, x_label, x_convert, y_vars, y_labels, y_converts, scale='log')
     plt.savefig(savename, dpi=600)
     plt.close()
+
+    # ==============
+    # adaptive time stepping, steps chosen to meet step_tol
+    # ==============
+    inputs = ICAES.get_default_inputs()
+    inputs['solver'] = 'adaptive'
+    inputs['step_tol'] = step_tol
+    system = ICAES(inputs=inputs)
+    system.single_cycle()
+    results = system.analyze_performance()
+    print('adaptive, step_tol ' + str(step_tol) + ': ' + str(results['steps_used']) + ' steps, RTE ' +
+          str(round(results['RTE'], 5)) + ', kWh_out ' + str(round(results['kWh_out'], 1)))
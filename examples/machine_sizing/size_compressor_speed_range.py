@@ -40,23 +40,19 @@ types = ['piston', 'radial-mixed-axial']
 designs = pd.DataFrame()
 m_dot_dict = {}
 for machine_type in types:
-    for pwr in pwrs:
-        for RPM in RPMs:
-            # calculate flow rate for selected power rating
-            m_dot = pwr * 1E3 / w
-            m_dot_dict[m_dot] = pwr
-            design = size_caes_cmp(p_in=p_in, t_in=t_in - 273.15, p_out=p_out, m_dot=m_dot,
-                                   RPM_low=RPM, RPM_high=RPM, RPM_cases=1,
-                                   machine_type=machine_type, debug=False)
+    # calculate flow rate for each power rating, all are sized in one call
+    m_dots = np.array(pwrs) * 1E3 / w
+    m_dot_dict.update(zip(m_dots, pwrs))
+    for RPM in RPMs:
+        design = size_caes_cmp(p_in=p_in, t_in=t_in - 273.15, p_out=p_out, m_dot=m_dots,
+                               RPM_low=RPM, RPM_high=RPM, RPM_cases=1,
+                               machine_type=machine_type, debug=False)
 
-            # save power rating
-            design['pwr'] = pwr
+        # save power rating
+        design['pwr'] = np.array(pwrs)[design['point']]
 
-            # store results
-            if len(designs) == 0:
-                designs = design
-            else:
-                designs = designs.append(design, ignore_index=True)
+        # store results
+        designs = pd.concat([designs, design], ignore_index=True)
 
 # --------------
 # plot results
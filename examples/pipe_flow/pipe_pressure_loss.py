@@ -16,36 +16,21 @@ d = 0.41  # diameter [m]
 m_dots = np.arange(-500, 520, 20)  # flow rates [kg/s]
 pressures = np.arange(15.0, 20.0, 1.0)  # pressures [MPa]
 
-# dataframe to store results
-attributes = ['T', 'p', 'epsilon', 'depth', 'd', 'm_dot', 'rho', 'mu',  # inputs
-              'dp_grav', 'dp_fric', 'f']  # results
-df = pd.DataFrame(columns=attributes)
-
-# perform parameter sweep
-for m_dot in m_dots:
-    for p in pressures:
-        # fluid properties, inputs are degrees K and Pa
-        rho = CP.PropsSI('D', 'T', T, 'P', p * 1e6, "Air.mix")  # density [kg/m3]
-        mu = CP.PropsSI('V', 'T', T, 'P', p * 1e6, "Air.mix")  # viscosity [Pa*s]
-
-        # pressure drop
-        dp_grav = pipe_grav_dp(m_dot=m_dot, rho=rho, z=depth)
-        dp_fric, f = pipe_fric_dp(epsilon=epsilon, d=d, depth=depth, m_dot=m_dot, rho=rho, mu=mu)
-
-        # save results
-        s = pd.Series(index=attributes)
-        s['T'] = T
-        s['p'] = p
-        s['epsilon'] = epsilon
-        s['depth'] = depth
-        s['d'] = d
-        s['m_dot'] = m_dot
-        s['rho'] = rho
-        s['mu'] = mu
-        s['dp_grav'] = dp_grav
-        s['dp_fric'] = dp_fric
-        s['f'] = f
-        df = df.append(s, ignore_index=True)
+# grid of all combinations
+m_dot, p = [x.ravel() for x in np.meshgrid(m_dots, pressures, indexing='ij')]
+
+# fluid properties, inputs are degrees K and Pa
+rho = CP.PropsSI('D', 'T', T, 'P', p * 1e6, "Air.mix")  # density [kg/m3]
+mu = CP.PropsSI('V', 'T', T, 'P', p * 1e6, "Air.mix")  # viscosity [Pa*s]
+
+# pressure drop (friction for every grid point in one call)
+dp_grav = pipe_grav_dp(m_dot=m_dot, rho=rho, z=depth)
+dp_fric, f = pipe_fric_dp(epsilon=epsilon, d=d, depth=depth, m_dot=m_dot, rho=rho, mu=mu)
+
+# store results
+df = pd.DataFrame({'T': T, 'p': p, 'epsilon': epsilon, 'depth': depth, 'd': d, 'm_dot': m_dot, 'rho': rho,
+                   'mu': mu,  # inputs
+                   'dp_grav': dp_grav, 'dp_fric': dp_fric, 'f': f})  # results
 
 # plot
 sns.set_context('paper')
@@ -1,8 +1,6 @@
-from caes import ICAES2
+from caes import ICAES2, sweep
 import pandas as pd
-from joblib import Parallel, delayed, parallel_backend
 import time
-import os
 from datetime import datetime
 
 
@@ -98,18 +96,10 @@ if __name__ == '__main__':
     # save inputs
     inputs.to_csv('sensitivity_inputs.csv')
 
-    try:
-        ncpus = int(os.getenv('NUM_PROCS'))  # try to use variable defined in sbatch script
-    except:
-        ncpus = ncpus  # otherwise default to this number of cores
+    ncpus = sweep.get_n_jobs(default=ncpus)  # NUM_PROCS if defined in sbatch script, otherwise default
 
     # run each case using parallelization
-    with parallel_backend('multiprocessing', n_jobs=ncpus):
-        output = Parallel(n_jobs=ncpus, verbose=5)(
-            delayed(parameter_sweep)(inputs.loc[index])
-            for index in
-            range(n_cases))
-    df = pd.DataFrame(output)
+    df = sweep.run(parameter_sweep, inputs, n_jobs=ncpus, verbose=True)
 
     # save results
     df.to_csv('sensitivity_results.csv')
@@ -1,8 +1,8 @@
-from caes import ICAES2
+from caes import ICAES2, size_system, size_sites, locality_order, sweep
 import pandas as pd
+import numpy as np
 from joblib import Parallel, delayed, parallel_backend
 import time
-import os
 from datetime import datetime
 
 
@@ -15,6 +15,34 @@ from datetime import datetime
 # permeability_mD - formation permaeability in milliDarcies, value > 0
 
 
+# =====================
+# function to create system inputs for an entry in input file (XLSX_filename)
+# =====================
+def site_inputs(sweep_input):
+    inputs = ICAES2.get_default_inputs()
+    # user inputs
+    inputs['depth'] = sweep_input['depth_m']  # porosity depth [m]
+    inputs['h'] = sweep_input['thickness_m']  # porosity thickness [m]
+    inputs['phi'] = sweep_input['porosity']  # formation porosity [-]
+    inputs['k'] = sweep_input['permeability_mD']  # formation permeability [mD]
+
+    # machinery polytropic index
+    inputs['n_cmp1'] = sweep_input['n_cmp1']
+    inputs['n_exp1'] = sweep_input['n_exp1']
+    return inputs
+
+
+# =====================
+# function to size a group of neighbouring entries, each warm-started from the nearest entry already sized
+# =====================
+def sites_sweep(sweep_inputs, debug=True):
+    results = size_sites(sweep_inputs, site_inputs, cls=ICAES2, debug=debug)
+    print(results['RTE'].tolist())
+
+    # combine inputs and results
+    return pd.concat([sweep_inputs, results], axis=1)
+
+
 # =====================
 # function to enable sizing for each entry in input file (XLSX_filename)
 # =====================
@@ -33,76 +61,13 @@ def parameter_sweep(sweep_input, debug=True):
         print("Porosity (-)     : " + str(sweep_input['porosity']))
         print("Permeability (mD): " + str(sweep_input['permeability_mD']))
 
-    # allowable calculation error
-    error = 1e-6
-
-    # maximum number of iterations
-    count_max = 200
-
-    # initial guesses
-    m_dot = 10.0
-    r_f = 10.0
-
-    # initial results
-    kW_out_actual = 0.0
-    kWh_out_actual = 0.0
-
-    count = 0
-    while abs(kW_out_actual - kW_out) / kW_out + abs(kWh_out_actual - kWh_out) / kWh_out > error:
-        if debug:
-            print("\nIteration : " + str(count))
-            print("m_dot       : " + str(round(m_dot, 3)))
-            print("r_f         : " + str(round(r_f, 3)))
-
-        # create system
-        inputs = ICAES2.get_default_inputs()
-        # user inputs
-        inputs['depth'] = sweep_input['depth_m']  # porosity depth [m]
-        inputs['h'] = sweep_input['thickness_m']  # porosity thickness [m]
-        inputs['phi'] = sweep_input['porosity']  # formation porosity [-]
-        inputs['k'] = sweep_input['permeability_mD']  # formation permeability [mD]
-
-        # machinery polytropic index
-        inputs['n_cmp1'] = sweep_input['n_cmp1']
-        inputs['n_exp1'] = sweep_input['n_exp1']
-
-        # current guess/iteration
-        inputs['m_dot'] = m_dot  # [kg/s]
-        inputs['r_f'] = r_f  # [m]
-        system = ICAES2(inputs=inputs)
-
-        # run single cycle and analyze
-        try:
-            system.single_cycle()
-            results = system.analyze_performance()
-        except:
-            results = pd.Series()
-            results['RTE'] = 0.0
-            break
-
-        # extract results of interest
-        kW_out_actual = results['kW_out_avg']
-        kWh_out_actual = results['kWh_out']
-
-        # update guesses
-        tau = 0.5  # solver time constant
-        m_dot = m_dot * (1.0 + tau * (kW_out - kW_out_actual) / kW_out)  # m_dot linearly linked to kW
-        r_f = r_f * (1.0 + tau ** 2 * (kWh_out - kWh_out_actual) / kWh_out_actual)  # r_f exponentially linked to kWh
-
-        count = count + 1
-        if count > count_max:  # sizing unsuccessful
-            results['errors'] = True
-            break
-
-        if debug:
-            print("MW_out_avg   : " + str(round(kW_out_actual / 1e3, 3)))
-            print("MWh_out      : " + str(round(kWh_out_actual / 1e3, 3)))
+    # size m_dot and r_f, each iteration is a single cycle
+    inputs = site_inputs(sweep_input)
+    results = size_system(sweep_input['capacity_MW'], sweep_input['duration_hr'], inputs, cls=ICAES2,
+                          debug=debug)
 
     end = time.time()
     results['solve_time'] = end - start
-    results['iterations'] = count
-    results['m_dot'] = m_dot
-    results['r_f'] = r_f
 
     # print out RTE
     print(results['RTE'])
@@ -128,6 +93,7 @@ if __name__ == '__main__':
     durations = [24]  # [hr]
     debug = False
     polytropic_index = 1.1
+    warm_start = True  # True - seed each sizing from the nearest site already sized, False - size each independently
 
     # ------------------
     # create sweep_inputs dataframe
@@ -158,18 +124,22 @@ if __name__ == '__main__':
     # save inputs
     sweep_inputs.to_csv('study_inputs.csv')
 
-    try:
-        ncpus = int(os.getenv('NUM_PROCS'))  # try to use variable defined in sbatch script
-    except:
-        ncpus = ncpus  # otherwise default to this number of cores
-
-    # run each case using parallelization
-    with parallel_backend('multiprocessing', n_jobs=ncpus):
-        output = Parallel(n_jobs=ncpus, verbose=5)(
-            delayed(parameter_sweep)(sweep_inputs.loc[index], debug=debug)
-            for index in
-            range(n_cases))
-    df = pd.DataFrame(output)
+    ncpus = sweep.get_n_jobs(default=ncpus)  # NUM_PROCS if defined in sbatch script, otherwise default
+
+    if warm_start:
+        # split cases into groups of neighbouring sites, one group per cpu
+        order = locality_order(sweep_inputs)
+        groups = [sweep_inputs.iloc[positions] for positions in np.array_split(order, ncpus)]
+
+        # run each group using parallelization
+        with parallel_backend('multiprocessing', n_jobs=ncpus):
+            output = Parallel(n_jobs=ncpus, verbose=5)(
+                delayed(sites_sweep)(group, debug=debug)
+                for group in groups)
+        df = pd.concat(output).sort_index()
+    else:
+        # run each case using parallelization
+        df = sweep.run(parameter_sweep, sweep_inputs, n_jobs=ncpus, verbose=True, debug=debug)
 
     # save results
     df.to_csv('study_results.csv')
@@ -1,7 +1,6 @@
-from caes import ICAES2, monteCarloInputs
+from caes import ICAES2, ICAES2Batch, monteCarloInputs, sweep, train_surrogate
 import pandas as pd
 import numpy as np
-from joblib import Parallel, delayed, parallel_backend
 import time
 import os
 from math import log
@@ -39,6 +38,9 @@ def parameter_sweep(sweep_input, debug=True):
         inputs['m_dot'] = sweep_input['m_dot']  # [kg/s]
         inputs['r_f'] = sweep_input['r_f']  # [m]
 
+        # only performance results are used, do not store time series
+        inputs['record'] = 'summary'
+
         # all other parameters - taken as default
         system = ICAES2(inputs=inputs)
 
@@ -62,6 +64,158 @@ def parameter_sweep(sweep_input, debug=True):
     return single_output
 
 
+# =====================
+# function to evaluate every entry of the Monte Carlo inputs at once with the batch engine
+# =====================
+def batch_sweep(sweep_inputs):
+    start = time.time()
+
+    # only entries with a sized system are evaluated
+    valid = (sweep_inputs['m_dot'] > 0.0) & (sweep_inputs['r_f'] > 0.0)
+
+    # uncertainty parameters, design inputs and machinery polytropic index (all other parameters taken as default)
+    inputs = pd.DataFrame(index=sweep_inputs.index[valid])
+    for key in ['T_grad_m', 'p_hydro_grad', 'p_frac_grad', 'loss_m_air', 'n_cmp1', 'n_exp1', 'm_dot', 'r_f']:
+        inputs[key] = sweep_inputs.loc[valid, key]
+    inputs['depth'] = sweep_inputs.loc[valid, 'depth_m']  # [m]
+    inputs['h'] = sweep_inputs.loc[valid, 'thickness_m']  # [m]
+    inputs['phi'] = sweep_inputs.loc[valid, 'porosity']  # [-]
+    inputs['k'] = sweep_inputs.loc[valid, 'permeability_mD']  # [mD]
+
+    # run single cycle and analyze
+    system = ICAES2Batch(inputs)
+    system.single_cycle()
+    results = system.analyze_performance()
+    results['solve_time'] = (time.time() - start) / max(len(inputs), 1)
+
+    # combine inputs and results
+    return pd.concat([sweep_inputs, results], axis=1)
+
+
+# =====================
+# function to evaluate the Monte Carlo inputs with a surrogate model trained on batch_sweep runs
+# =====================
+def surrogate_sweep(sweep_inputs, n_train=1024, degree=3, seed=None):
+    # uncertainty parameters and design inputs (n_exp1 is sampled equal to n_cmp1)
+    variables = ['T_grad_m', 'p_hydro_grad', 'p_frac_grad', 'loss_m_air', 'depth_m', 'thickness_m', 'porosity',
+                 'permeability_mD', 'n_cmp1', 'm_dot', 'r_f']
+
+    def model(inputs):
+        inputs = inputs.copy()
+        inputs['n_exp1'] = inputs['n_cmp1']
+        return batch_sweep(inputs)
+
+    # train over the range of the entries with a sized system
+    valid = (sweep_inputs['m_dot'] > 0.0) & (sweep_inputs['r_f'] > 0.0)
+    bounds = {name: (sweep_inputs.loc[valid, name].min(), sweep_inputs.loc[valid, name].max()) for name in variables}
+    surrogate = train_surrogate(model, bounds, n=n_train, outputs=['RTE', 'kWh_in', 'kWh_out'], seed=seed,
+                                degree=degree, log_inputs=['permeability_mD'])
+    print('Surrogate cross-validation error:')
+    print(surrogate.cv)
+
+    # combine inputs and results
+    results = surrogate.evaluate(sweep_inputs.loc[valid, variables])
+    return pd.concat([sweep_inputs, results], axis=1)
+
+
+# =====================
+# function to create Monte Carlo inputs for a site (row of sites)
+# =====================
+def site_sample(row, iterations, rng):
+    # create dataframe to hold distributions for this row
+    df_row = pd.DataFrame(index=range(iterations))
+
+    # ------------------------
+    # apply distributions
+    # ------------------------
+
+    # temperature gradient (deg C /km) - Triangle
+    left = 16.0 / 1000.0  # convert to deg C / ,
+    mode = 23.0 / 1000.0
+    right = 24.0 / 1000.0
+    df_row.loc[:, 'T_grad_m'] = rng.triangular(left, mode, right, size=iterations)
+
+    # aquifer pressure gradient (MPa / km) - Triangle
+    left = 9.42
+    mode = 10.0
+    right = 11.1
+    df_row.loc[:, 'p_hydro_grad'] = rng.triangular(left, mode, right, size=iterations)
+
+    # fracture pressure gradient (MPa / km) - Uniform
+    low = 13.6
+    high = 15.8
+    df_row.loc[:, 'p_frac_grad'] = rng.uniform(low=low, high=high, size=iterations)
+
+    # air leakage - Triangle
+    left = 0.0 / 100.0  # convert from % to fraction
+    mode = 3.5 / 100.0
+    right = 20.0 / 100.0
+    df_row.loc[:, 'loss_m_air'] = rng.triangular(left, mode, right, size=iterations)
+
+    # depth
+    variation = 0.1
+    low = (1.0 - variation) * row['depth_m']
+    high = (1.0 + variation) * row['depth_m']
+    df_row.loc[:, 'depth_m'] = rng.uniform(low=low, high=high, size=iterations)
+
+    # thickness
+    variation = 0.2
+    low = (1.0 - variation) * row['thickness_m']
+    high = (1.0 + variation) * row['thickness_m']
+    df_row.loc[:, 'thickness_m'] = rng.uniform(low=low, high=high, size=iterations)
+
+    # porosity
+    mean = row['porosity']
+    sigma = 0.05 / 100.0  # convert from % to fraction
+    df_row.loc[:, 'porosity'] = rng.normal(loc=mean, scale=sigma, size=iterations)
+
+    # permeability
+    mean = log(row['permeability_mD'])
+    sigma = 2.448
+    df_row.loc[:, 'permeability_mD'] = rng.lognormal(mean=mean, sigma=sigma, size=iterations)
+
+    # ------------------------
+    # keep these parameters constant
+    # ------------------------
+    df_row.loc[:, 'm_dot'] = row['m_dot']
+    df_row.loc[:, 'r_f'] = row['r_f']
+    df_row.loc[:, 'X (m)'] = row['X (m)']
+    df_row.loc[:, 'Y (m)'] = row['Y (m)']
+    df_row.loc[:, 'sheet_name'] = row['sheet_name']
+    df_row.loc[:, 'duration_hr'] = row['duration_hr']
+    df_row.loc[:, 'capacity_MW'] = row['capacity_MW']
+
+    # ------------------------
+    # machinery polytropic index
+    # ------------------------
+    # air leakage - Triangle
+    left = 1.04
+    mode = 1.1
+    right = 1.21
+    polytropic_index = rng.triangular(left, mode, right, size=iterations)
+
+    df_row.loc[:, 'n_cmp1'] = polytropic_index
+    df_row.loc[:, 'n_exp1'] = polytropic_index
+    return df_row
+
+
+# =====================
+# function to create Monte Carlo inputs for each site (row) of sites
+# =====================
+def mc_sample(df2, iterations, seed=None):
+    rng = np.random.default_rng(seed)
+
+    # create Monte Carlo simulation for each row in df2
+    mc_inputs = pd.DataFrame()
+    for ind in df2.index:
+        # store distributions
+        mc_inputs = mc_inputs.append(site_sample(df2.loc[ind, :], iterations, rng))
+
+    # reset index (appending messes up indices)
+    mc_inputs = mc_inputs.reset_index()
+    return mc_inputs
+
+
 # =====================
 # main program
 # =====================
@@ -77,15 +231,20 @@ if __name__ == '__main__':
     iterations = 100  # number of runs per location
     ncpus = 3  # default number of cpus to use
     polytropic_index = 1.1
+    use_batch = True  # True - evaluate all entries at once with ICAES2Batch, False - one ICAES2 per entry
+    use_surrogate = False  # True - evaluate all entries with a surrogate model trained on ICAES2Batch runs
+    resume = True  # True - reuse inputs and completed cases of a previous (stopped) run, False - start over
+    adaptive = False  # True - run each location in batches until the RTE and kWh_out statistics converge
+    tol = 0.01  # adaptive only, relative half-width of the 95% confidence intervals (mean, 5th and 95th percentiles)
+    batch_size = 20  # adaptive only, runs per location per batch
+    max_iterations = 1000  # adaptive only, most runs per location
+    seed = None  # seed of the random number generator, None - not repeatable
 
     # ==============
     # begin program
     # ==============
     # determine number of processors to use
-    try:
-        ncpus = int(os.getenv('NUM_PROCS'))  # try to use variable defined in sbatch script
-    except:
-        ncpus = ncpus  # otherwise default to this number of cores
+    ncpus = sweep.get_n_jobs(default=ncpus)  # NUM_PROCS if defined in sbatch script, otherwise default
 
     # read-in data
     df = pd.read_csv(sizing_results)
@@ -105,108 +264,42 @@ if __name__ == '__main__':
                  (df.loc[:, 'duration_hr'] == duration_hr) &
                  (df.loc[:, 'capacity_MW'] == capacity_MW)]
 
-        # create Monte Carlo simulation for each row in df2
-        mc_inputs = pd.DataFrame()
-        for ind in df2.index:
-            # access data for this row
-            row = df2.loc[ind, :]
-
-            # create dataframe to hold distributions for each row
-            df_row = pd.DataFrame(index=range(iterations))
-
-            # ------------------------
-            # apply distributions
-            # ------------------------
-
-            # temperature gradient (deg C /km) - Triangle
-            left = 16.0 / 1000.0  # convert to deg C / ,
-            mode = 23.0 / 1000.0
-            right = 24.0 / 1000.0
-            df_row.loc[:, 'T_grad_m'] = np.random.triangular(left, mode, right, size=iterations)
-
-            # aquifer pressure gradient (MPa / km) - Triangle
-            left = 9.42
-            mode = 10.0
-            right = 11.1
-            df_row.loc[:, 'p_hydro_grad'] = np.random.triangular(left, mode, right, size=iterations)
-
-            # fracture pressure gradient (MPa / km) - Uniform
-            low = 13.6
-            high = 15.8
-            df_row.loc[:, 'p_frac_grad'] = np.random.uniform(low=low, high=high, size=iterations)
-
-            # air leakage - Triangle
-            left = 0.0 / 100.0  # convert from % to fraction
-            mode = 3.5 / 100.0
-            right = 20.0 / 100.0
-            df_row.loc[:, 'loss_m_air'] = np.random.triangular(left, mode, right, size=iterations)
-
-            # depth
-            variation = 0.1
-            low = (1.0 - variation) * row['depth_m']
-            high = (1.0 + variation) * row['depth_m']
-            df_row.loc[:, 'depth_m'] = np.random.uniform(low=low, high=high, size=iterations)
-
-            # thickness
-            variation = 0.2
-            low = (1.0 - variation) * row['thickness_m']
-            high = (1.0 + variation) * row['thickness_m']
-            df_row.loc[:, 'thickness_m'] = np.random.uniform(low=low, high=high, size=iterations)
-
-            # porosity
-            mean = row['porosity']
-            sigma = 0.05 / 100.0  # convert from % to fraction
-            df_row.loc[:, 'porosity'] = np.random.normal(loc=mean, scale=sigma, size=iterations)
-
-            # permeability
-            mean = log(row['permeability_mD'])
-            sigma = 2.448
-            df_row.loc[:, 'permeability_mD'] = np.random.lognormal(mean=mean, sigma=sigma, size=iterations)
-
-            # ------------------------
-            # keep these parameters constant
-            # ------------------------
-            df_row.loc[:, 'm_dot'] = row['m_dot']
-            df_row.loc[:, 'r_f'] = row['r_f']
-            df_row.loc[:, 'X (m)'] = row['X (m)']
-            df_row.loc[:, 'Y (m)'] = row['Y (m)']
-            df_row.loc[:, 'sheet_name'] = row['sheet_name']
-            df_row.loc[:, 'duration_hr'] = row['duration_hr']
-            df_row.loc[:, 'capacity_MW'] = row['capacity_MW']
-
-            # ------------------------
-            # machinery polytropic index
-            # ------------------------
-            # air leakage - Triangle
-            left = 1.04
-            mode = 1.1
-            right = 1.21
-            polytropic_index = np.random.triangular(left, mode, right, size=iterations)
-
-            df_row.loc[:, 'n_cmp1'] = polytropic_index
-            df_row.loc[:, 'n_exp1'] = polytropic_index
-
-            # ------------------------
-            # store distributions
-            # ------------------------
-            mc_inputs = mc_inputs.append(df_row)
-
-        # reset index (appending messes up indices)
-        mc_inputs = mc_inputs.reset_index()
-
-        # count number of cases
-        n_cases = mc_inputs.shape[0]
-
-        # save model inputs
-        savename = 'uncertainty_inputs' + str(count) + '.csv'
-        mc_inputs.to_csv(savename)
-
-        # run using parallelization
-        with parallel_backend('multiprocessing', n_jobs=ncpus):
-            output = Parallel(n_jobs=ncpus, verbose=5)(
-                delayed(parameter_sweep)(mc_inputs.loc[index], debug=False)
-                for index in range(n_cases))
-        mc_outputs = pd.DataFrame(output)
+        if adaptive:
+            # run batches of every unconverged location until the statistics converge
+            fn = batch_sweep if use_batch else parameter_sweep
+            kwargs = {} if use_batch else {'debug': False}
+            checkpoint = 'uncertainty_checkpoint' + str(count) + '.sqlite' if resume and not use_batch else None
+            mc_outputs, convergence = sweep.run_adaptive(fn, site_sample, df2, tol=tol, batch_size=batch_size,
+                                                         min_samples=2 * batch_size, max_samples=max_iterations,
+                                                         seed=seed, batched=use_batch, n_jobs=ncpus,
+                                                         checkpoint=checkpoint, verbose=True, **kwargs)
+            convergence.to_csv('uncertainty_convergence' + str(count) + '.csv')
+        else:
+            # create Monte Carlo simulation for each row in df2, inputs of a previous run are reused when resuming
+            savename = 'uncertainty_inputs' + str(count) + '.csv'
+            if resume and os.path.isfile(savename):
+                mc_inputs = pd.read_csv(savename, index_col=0)
+            else:
+                mc_inputs = mc_sample(df2, iterations, seed)
+
+                # save model inputs
+                mc_inputs.to_csv(savename)
+
+            # count number of cases
+            n_cases = mc_inputs.shape[0]
+
+            if use_surrogate:
+                # emulate all cases, model run outside the training range
+                mc_outputs = surrogate_sweep(mc_inputs, seed=seed)
+            elif use_batch:
+                # run all cases together
+                mc_outputs = batch_sweep(mc_inputs)
+            else:
+                # run using parallelization
+                # completed cases are stored as they finish, a stopped run restarts from where it left off
+                checkpoint = 'uncertainty_checkpoint' + str(count) + '.sqlite' if resume else None
+                mc_outputs = sweep.run(parameter_sweep, mc_inputs, n_jobs=ncpus, checkpoint=checkpoint, verbose=True,
+                                       debug=False)
 
         # save intermediate results
         savename = 'uncertainty_results' + str(count) + '.csv'
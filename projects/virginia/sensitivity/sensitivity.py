@@ -1,8 +1,6 @@
-from caes import ICAES
+from caes import ICAES, sweep, sensitivity
 import pandas as pd
-from joblib import Parallel, delayed, parallel_backend
 import time
-import os
 from datetime import datetime
 
 
@@ -42,6 +40,10 @@ if __name__ == '__main__':
     ncpus = 6  # number of cpus to use
     float_perm = 0.1  # permutation of float inputs (0.1 = +/-10%)
     int_perm = 1  # permutation of integer inputs ( 1 = +/-1)
+    method = 'oat'  # 'oat' - one-at-a-time low/high cases, 'morris' - elementary effects, 'sobol' - Sobol indices
+    trajectories = 10  # morris only, (number of variables + 1) cases per trajectory
+    n_sobol = 64  # sobol only, power of 2, n_sobol * (number of variables + 2) cases
+    seed = None  # morris and sobol only, seed of the random number generator, None - not repeatable
 
     # ------------------
     # create sensitivity_inputs dataframe
@@ -54,65 +56,84 @@ if __name__ == '__main__':
     variables = user_input.Variable.loc[ind].values
     n_cases = 1 + 2 * len(variables)
 
-    # create dataframe
-    inputs = pd.DataFrame(index=range(n_cases), columns=variables)
-    inputs.loc[:, 'sensitivity_var'] = 'baseline'
-    inputs.loc[:, 'permutation'] = 0.0
-
-    # populate with baseline values
-    for variable in variables:
-        ind = user_input.Variable == variable
-        inputs.loc[:, variable] = float(user_input.loc[ind, 'Baseline'].values)
-
-    # apply permutations
-    n = 1
-    for variable in variables:
-        ind = user_input.Variable == variable
-
-        # store variable name
-        inputs.loc[n, 'sensitivity_var'] = variable
-        inputs.loc[n + 1, 'sensitivity_var'] = variable
-        # ----------
-        # float#
-        # ----------
-        if user_input.loc[ind, 'Type'].values == 'float':
-            inputs.loc[n, variable] = inputs.loc[n, variable] * (1.0 + float_perm)
-            inputs.loc[n + 1, variable] = inputs.loc[n+1, variable] * (1.0 - float_perm)
-            inputs.loc[n, 'permutation'] = (1.0 + float_perm)
-            inputs.loc[n + 1, 'permutation'] = (1.0 - float_perm)
-        # ----------
-        # integer
-        # ----------
-        if user_input.loc[ind, 'Type'].values == 'integer':
-            inputs.loc[n, variable] = inputs.loc[n, variable] + int_perm
-            inputs.loc[n + 1, variable] = inputs.loc[n+1, variable] - int_perm
-            inputs.loc[n, 'permutation'] = int_perm
-            inputs.loc[n + 1, 'permutation'] = - int_perm
-
-        # increase counter
-        n = n + 2
-
-    # count number of cases
-    n_cases = inputs.shape[0]
-
-    # save inputs
-    inputs.to_csv('sensitivity_inputs.csv')
-
-    try:
-        ncpus = int(os.getenv('NUM_PROCS'))  # try to use variable defined in sbatch script
-    except:
-        ncpus = ncpus  # otherwise default to this number of cores
-
-    # run each case using parallelization
-    with parallel_backend('multiprocessing', n_jobs=ncpus):
-        output = Parallel(n_jobs=ncpus, verbose=5)(
-            delayed(parameter_sweep)(inputs.loc[index])
-            for index in
-            range(n_cases))
-    df = pd.DataFrame(output)
-
-    # save results
-    df.to_csv('sensitivity_results.csv')
+    ncpus = sweep.get_n_jobs(default=ncpus)  # NUM_PROCS if defined in sbatch script, otherwise default
+
+    if method == 'morris' or method == 'sobol':
+        # ------------------
+        # global sensitivity, variables sampled between the low and high permutations
+        # ------------------
+        bounds = {}
+        integers = []
+        for variable in variables:
+            ind = user_input.Variable == variable
+            baseline = float(user_input.loc[ind, 'Baseline'].values)
+            if user_input.loc[ind, 'Type'].values == 'integer':
+                bounds[variable] = (baseline - int_perm, baseline + int_perm)
+                integers.append(variable)
+            else:
+                bounds[variable] = (baseline * (1.0 - float_perm), baseline * (1.0 + float_perm))
+
+        # run all cases using parallelization
+        if method == 'morris':
+            indices, df = sensitivity.morris(bounds, trajectories=trajectories, seed=seed, cls=ICAES,
+                                             integers=integers, engine='sweep', n_jobs=ncpus, verbose=True)
+        else:
+            indices, df = sensitivity.sobol(bounds, n=n_sobol, seed=seed, cls=ICAES, integers=integers,
+                                            engine='sweep', n_jobs=ncpus, verbose=True)
+
+        # save results
+        df.to_csv('sensitivity_results.csv')
+        indices.to_csv('sensitivity_indices.csv')
+    else:
+        # create dataframe
+        inputs = pd.DataFrame(index=range(n_cases), columns=variables)
+        inputs.loc[:, 'sensitivity_var'] = 'baseline'
+        inputs.loc[:, 'permutation'] = 0.0
+
+        # populate with baseline values
+        for variable in variables:
+            ind = user_input.Variable == variable
+            inputs.loc[:, variable] = float(user_input.loc[ind, 'Baseline'].values)
+
+        # apply permutations
+        n = 1
+        for variable in variables:
+            ind = user_input.Variable == variable
+
+            # store variable name
+            inputs.loc[n, 'sensitivity_var'] = variable
+            inputs.loc[n + 1, 'sensitivity_var'] = variable
+            # ----------
+            # float#
+            # ----------
+            if user_input.loc[ind, 'Type'].values == 'float':
+                inputs.loc[n, variable] = inputs.loc[n, variable] * (1.0 + float_perm)
+                inputs.loc[n + 1, variable] = inputs.loc[n+1, variable] * (1.0 - float_perm)
+                inputs.loc[n, 'permutation'] = (1.0 + float_perm)
+                inputs.loc[n + 1, 'permutation'] = (1.0 - float_perm)
+            # ----------
+            # integer
+            # ----------
+            if user_input.loc[ind, 'Type'].values == 'integer':
+                inputs.loc[n, variable] = inputs.loc[n, variable] + int_perm
+                inputs.loc[n + 1, variable] = inputs.loc[n+1, variable] - int_perm
+                inputs.loc[n, 'permutation'] = int_perm
+                inputs.loc[n + 1, 'permutation'] = - int_perm
+
+            # increase counter
+            n = n + 2
+
+        # count number of cases
+        n_cases = inputs.shape[0]
+
+        # save inputs
+        inputs.to_csv('sensitivity_inputs.csv')
+
+        # run each case using parallelization
+        df = sweep.run(parameter_sweep, inputs, n_jobs=ncpus, verbose=True)
+
+        # save results
+        df.to_csv('sensitivity_results.csv')
 
     # save total study time
     end = time.time()